@@ -5,8 +5,7 @@
 
 import bip39
 import ce
-import ripemd_hashing
-import sha2_hashing
+import hashing
 import utils
 
 # Variables globales ***************************************************************************************************
@@ -58,7 +57,7 @@ class Nodo:
         else:
             K_serializada = b"\x02" + self.K["x"].to_bytes(32, "big")
         # Ahora aplicamos el Hash160 = RIPEMD160(SHA-256):
-        fingerprint = ripemd_hashing.ripemd160(sha2_hashing.sha256(K_serializada, "bytes"), "bytes")
+        fingerprint = hashing.hash160(K_serializada)
         self.fp = fingerprint[:4]
 
     def info(self):
@@ -118,13 +117,8 @@ class Nodo:
         depth = self.depth.to_bytes(1, "big")
         childnum = self.i.to_bytes(4, "big")
         serializacion = prefijo + depth + self.parent_fp + childnum + self.c + clave_bytes
-        # Antes de codificar en base-58, aplicaremos el checksum (doble hash), y tomaremos los primeros 4 bytes:
-        checksum = sha2_hashing.sha256(sha2_hashing.sha256(serializacion, "bytes"), "bytes")[:4]
-        # Añadimos el checksum:
-        serializacion += checksum
-        # Y aplicamos la codificación base-58:
-        serializacion_int = int.from_bytes(serializacion, "big")
-        return str(utils.to_base58(serializacion_int), "utf-8")
+        # Aplicamos la codificación Base58Check, que añade antes el checksum (los primeros 4 bytes del doble hash):
+        return utils.to_base58(serializacion, "str", check=True)
 
     def deriva(self, i, hardened):
         """Crea un hijo, derivando la clave privada extendida del nodo actual
@@ -5,7 +5,7 @@
 
 import json
 import random
-import sha2_hashing
+import hashing
 import utils
 import time
 
@@ -32,11 +32,35 @@ def check_phrase(phrase):
     # Ahora pasamos entropía a bytes para pasar a SHA256:
     bytes_entropy = int_entropy.to_bytes(n_bits_entropy // 8, "big")
     # Vamos a comprobar si los bits de checksum son correctos:
-    check_calc = sha2_hashing.sha256(bytes_entropy, "int")  # digest de la entropía como número entero
+    check_calc = hashing.sha256(bytes_entropy, "int")  # digest de la entropía como número entero
     check_calc >>= (256 - n_bits_check)  # entero con solo los primeros bits del checksum
     # Comparamos:
     return int_check == check_calc
 
+def ultimas_palabras(phrase):
+    """Retorna todas las palabras que completan correctamente una frase a la que le falta la última
+
+    Los 2048 candidatos se comprueban a la vez, con hashing.sha256_many().
+
+    :param phrase: Lista de enteros representando la frase sin la última palabra
+    :return: Lista de índices (enteros) de las palabras válidas como última palabra
+    """
+    # Explicaciones en check_phrase().
+    nwords = len(phrase) + 1
+    n_bits_entropy = 32 * nwords // 3
+    n_bits_check = n_bits_entropy // 32
+    prefijo = 0
+    for word in phrase:
+        prefijo <<= 11
+        prefijo |= word
+    prefijo <<= 11
+    # Entropía de cada candidato, en bytes (la última palabra aporta 11 - n_bits_check bits de entropía):
+    entropias = [((prefijo | word) >> n_bits_check).to_bytes(n_bits_entropy // 8, "big") for word in range(2048)]
+    digests = hashing.sha256_many(entropias)
+    # El checksum (como mucho 8 bits) son los primeros bits del digest:
+    mascara = 2 ** n_bits_check - 1
+    return [word for word in range(2048) if digests[word][0] >> (8 - n_bits_check) == word & mascara]
+
 def input_frase(full=True):
     """Solicita y retorna una seed phrase personalizada
 
@@ -110,24 +134,40 @@ def string2list(cadena):
         resul.append(i)
     return resul
 
-def hmac_sha512(k, ms):
-    """Es la función pseudoaleatoria utilizada por pbkdf2()
+def hmac_sha512_estados(k):
+    """Prepara los estados de HMAC-SHA512 para una clave, para reutilizarlos con varios mensajes
 
-    :param k: contraseña secreta; recibe la seedphrase del PBKDF2 (bytes)
-    :param ms: mensaje a validar; recibe la sal (bytes)
-    :return: clave derivada; el digest resultante que combina clave y mensaje (bytes)
+    HMAC calcula H((k xor opad) + H((k xor ipad) + ms)). Los bloques (k xor ipad) y (k xor opad) solo dependen de la
+    clave, así que se pueden procesar una sola vez; cada mensaje parte de una copia de esos estados.
+
+    :param k: clave (bytes)
+    :return: tupla (interior, exterior): objetos de hashing SHA-512 que ya han procesado k xor ipad y k xor opad
     """
     # Cuando HMAC usa SHA-512, block size es 128 bytes; la salida es de 64 bytes.
     # Si la clave excede el tamaño del bloque, aplicamos su hash:
     if len(k) > 128:
-        k = sha2_hashing.sha512(k, "bytes")
+        k = hashing.sha512(k, "bytes")
     # Sea como sea, la clave tiene que ocupar 128 bytes (rellenar con bytes 0 por la derecha):
     k += (128 - len(k)) * b'\x00'
     # Paddings:
     opad = b'\x5c' * 128
     ipad = b'\x36' * 128
-    # Resto de cálculos:
-    return sha2_hashing.sha512(utils.xor(k, opad) + sha2_hashing.sha512(utils.xor(k, ipad) + ms, "bytes"), "bytes")
+    return hashing.new("sha512", utils.xor(k, ipad)), hashing.new("sha512", utils.xor(k, opad))
+
+def hmac_sha512(k, ms, estados=None):
+    """Es la función pseudoaleatoria utilizada por pbkdf2()
+
+    :param k: contraseña secreta; recibe la seedphrase del PBKDF2 (bytes)
+    :param ms: mensaje a validar; recibe la sal (bytes)
+    :param estados: estados ya preparados para la clave k, con hmac_sha512_estados() (opcional)
+    :return: clave derivada; el digest resultante que combina clave y mensaje (bytes)
+    """
+    interior, exterior = estados or hmac_sha512_estados(k)
+    interior = interior.copy()
+    interior.update(ms)
+    exterior = exterior.copy()
+    exterior.update(interior.digest())
+    return exterior.digest()
 
 def pbkdf2(seedphrase, passphrase, niter=2048):
     """Calcula la seed mediante la Password-Based Key Derivation Function 2
@@ -142,17 +182,18 @@ def pbkdf2(seedphrase, passphrase, niter=2048):
     """
     # Sal: "mnemonic" + passphrase (la passphrase puede estar vacía)
     sal = b'mnemonic' + passphrase
+    # La clave (seedphrase) es la misma en todas las iteraciones; preparamos sus estados HMAC una sola vez:
+    estados = hmac_sha512_estados(seedphrase)
     # dklen = hlen, por lo que la DK es igual a T1, es decir, DK = F(Password, Salt, 2048, 1).
     # Vamos a calcular U1, U2,... U2048, y los iremos añadiendo mediante xor al resultado
-    resul = hmac_sha512(seedphrase, sal + b'\x00\x00\x00\x01')
-    # resul contiene U1; falta añadir (con xor) U2,...U2048:
-    u_anterior = resul
+    u_anterior = hmac_sha512(seedphrase, sal + b'\x00\x00\x00\x01', estados)
+    resul = bytearray(u_anterior)
+    # resul contiene U1; falta añadir (con xor) U2,...U2048.
     # Quedan niter-1 iteraciones, porque la primera (U1) ya está hecha:
     for _ in range(niter - 1):
-        u_next = hmac_sha512(seedphrase, u_anterior)  # u_anterior hace de sal
-        resul = utils.xor(resul, u_next)
-        u_anterior = u_next
-    return resul
+        u_anterior = hmac_sha512(seedphrase, u_anterior, estados)  # u_anterior hace de sal
+        utils.xor_inplace(resul, u_anterior)
+    return bytes(resul)
 
 def random_phrase(nwords, formato="num"):
     """Genera y retorna una seed phrase aleatoria correcta
@@ -169,10 +210,7 @@ def random_phrase(nwords, formato="num"):
         num = random.randint(0, 2047)  # no hay problema con repetir palabras
         phrase.append(num)
     # Ahora vamos a ver todas las candidatas a última palabra:
-    ultimas = []
-    for word in range(2048):
-        if check_phrase(phrase + [word]):
-            ultimas.append(word)
+    ultimas = ultimas_palabras(phrase)
     # Ahora, de entre las candidatas, elegiremos una:
     phrase.append(random.choice(ultimas))
     if formato == "num":
@@ -326,10 +364,7 @@ def menu_ultima():
         print("Cancelado.")
         return
     # Ahora vamos a mostrar todas las posibilidades para la última palabra:
-    ultimas = []
-    for word in range(2048):
-        if check_phrase(lista + [word]):
-            ultimas.append(word)
+    ultimas = ultimas_palabras(lista)
     print("Posibilidades:")
     for word in ultimas:
         print(wordlist[word], end=' ')
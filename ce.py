@@ -4,8 +4,10 @@
 
 import random
 import json
+import multiprocessing
 import utils
-import sha2_hashing
+import hashing
+import teoria_numeros
 
 # Clase Curva **********************************************************************************************************
 
@@ -40,11 +42,57 @@ class Curva:
         # Calculemos el valor de y^2: y^2 = x^3 + ax + b, módulo p:
         y2 = (x ** 3 + self.a * x + self.b) % self.p
         # Ahora, la raíz cuadrada de y2:
-        y = utils.sqrt_mod(y2, self.p)
+        y = teoria_numeros.sqrt_mod(y2, self.p)
         # Hay que tener en cuenta que si el cofactor de este juego de parámetros no es 1,
         # este punto puede no ser uno de los puntos generados por G...
         return y
 
+    def descomprime(self, clave):
+        """Obtiene un punto (clave pública) a partir de su serialización comprimida
+
+        :param clave: serialización comprimida (33 bytes: prefijo 02 o 03, según la paridad de y, y la coordenada x)
+        :return: el punto, o None si la serialización no corresponde a un punto de la curva
+        """
+        return self.descomprime_lote([clave])[0]
+
+    def descomprime_lote(self, claves, procesos=1):
+        """Obtiene los puntos correspondientes a una lista de claves públicas comprimidas
+
+        Si p ≡ 3 (mod 4) (como en secp256k1), cada raíz cuadrada es una sola exponenciación, que se calcula aquí
+        directamente; si no, se usa teoria_numeros.sqrt_mod(). Con procesos > 1, la lista se reparte entre varios
+        procesos.
+
+        :param claves: lista de serializaciones comprimidas (ver descomprime())
+        :param procesos: número de procesos a utilizar (1 para calcular todo en el proceso actual)
+        :return: lista de puntos (None para las claves inválidas), en el mismo orden
+        """
+        if procesos > 1 and len(claves) > 1:
+            tam = -(-len(claves) // procesos)
+            trozos = [claves[i:i + tam] for i in range(0, len(claves), tam)]
+            with multiprocessing.Pool(len(trozos)) as pool:
+                return [punto for trozo in pool.map(self.descomprime_lote, trozos) for punto in trozo]
+        p, a, b = self.p, self.a, self.b
+        exponente = (p + 1) // 4 if p & 3 == 3 else None
+        resul = []
+        for clave in claves:
+            x = int.from_bytes(clave[1:], "big")
+            if len(clave) != 33 or clave[0] not in (2, 3) or x >= p:
+                resul.append(None)
+                continue
+            # y^2 = x^3 + ax + b, módulo p:
+            y2 = (x * x * x + a * x + b) % p
+            if exponente:
+                y = pow(y2, exponente, p)
+                if y * y % p != y2:
+                    y = None
+            else:
+                y = teoria_numeros.sqrt_mod(y2, p)[0]
+            # De las dos raíces (y, p - y), el prefijo indica cuál: 02 si y es par, 03 si es impar:
+            if y is not None and y & 1 != clave[0] & 1:
+                y = p - y if y else None
+            resul.append(None if y is None else { "x": x, "y": y })
+        return resul
+
     def k_punto(self, k, punto):
         """Calcula un múltiplo del punto indicado (entero x punto)
 
@@ -94,11 +142,10 @@ class Curva:
         x = punto["x"]
         if x == float("inf"):  # el punto 0 es válido
             return True
-        if x != x % self.p:
+        if x != x % self.p or punto["y"] != punto["y"] % self.p:
             return False
-        if punto["y"] in self.calcula_y(x):
-            return True
-        return False
+        # Basta comprobar la ecuación de la curva (y es una de las raíces que retornaría calcula_y(x)):
+        return (punto["y"] ** 2 - (x ** 3 + self.a * x + self.b)) % self.p == 0
 
     def punto_random_g(self):
         """Retorna un punto aleatorio, generado por G (incluye punto 0)
@@ -142,11 +189,39 @@ class Curva:
             else:  # P+(-P), retornaremos punto en el infinito
                 return { "x": float("inf"), "y": float("inf") }
         # Suma normal:
-        pendiente = (y2 - y1) * utils.inverso_modn(x2 - x1, self.p)
+        pendiente = (y2 - y1) * teoria_numeros.inverso_modn(x2 - x1, self.p)
         x3 = (pendiente ** 2 - x1 - x2) % self.p
         y3 = (pendiente * (x1 - x3) - y1) % self.p
         return { "x": x3, "y": y3 }
 
+    def suma_puntos_lote(self, puntos1, puntos2):
+        """Suma dos listas de puntos, par a par, con una sola inversión modular para todas las sumas
+
+        Las pendientes de todas las sumas necesitan el inverso de (x2 - x1); se calculan todos a la vez con
+        teoria_numeros.inversos_modn(). Los casos especiales (punto en el infinito, P+P, P+(-P)) se resuelven con
+        suma_puntos().
+
+        :param puntos1: lista de primeros sumandos
+        :param puntos2: lista de segundos sumandos (de la misma longitud)
+        :return: lista de resultados, en el mismo orden (None en las sumas con algún punto inválido)
+        """
+        resul = [None] * len(puntos1)
+        normales = []  # índices de las sumas de dos puntos finitos con distinta x
+        for i, (punto1, punto2) in enumerate(zip(puntos1, puntos2)):
+            if punto1["x"] == float("inf") or punto2["x"] == float("inf") or punto1["x"] == punto2["x"]:
+                resul[i] = self.suma_puntos(punto1, punto2)
+            elif self.valida_punto(punto1) and self.valida_punto(punto2):
+                normales.append(i)
+        inversos = teoria_numeros.inversos_modn([puntos2[i]["x"] - puntos1[i]["x"] for i in normales], self.p)
+        for i, inverso in zip(normales, inversos):
+            x1, y1 = puntos1[i]["x"], puntos1[i]["y"]
+            x2, y2 = puntos2[i]["x"], puntos2[i]["y"]
+            pendiente = (y2 - y1) * inverso
+            x3 = (pendiente ** 2 - x1 - x2) % self.p
+            y3 = (pendiente * (x1 - x3) - y1) % self.p
+            resul[i] = { "x": x3, "y": y3 }
+        return resul
+
     def duplica_punto(self, punto):
         """Aplica la duplicación de un punto (point doubling)
 
@@ -165,7 +240,7 @@ class Curva:
         # Punto finito:
         x1, y1 = punto["x"], punto["y"]
         # Duplicación:
-        pendiente = (3 * x1 ** 2 + self.a) * utils.inverso_modn(2 * y1, self.p)
+        pendiente = (3 * x1 ** 2 + self.a) * teoria_numeros.inverso_modn(2 * y1, self.p)
         x3 = (pendiente ** 2 - 2 * x1) % self.p
         y3 = (pendiente * (x1 - x3) - y1) % self.p
         return { "x": x3, "y": y3 }
@@ -223,7 +298,7 @@ def menu_ecdsa():
 
     # Firma del mensaje:
     m = b"Luke, yo soy tu padre"  # mensaje
-    digest = sha2_hashing.sha512(m, "int")
+    digest = hashing.sha512(m, "int")
     # Como la longitud en bits del digest no puede sobrepasar la del orden n de la curva, eliminamos bits innecesarios:
     if 512 > Ln:
         digest >>= 512 - Ln
@@ -234,7 +309,7 @@ def menu_ecdsa():
         r = Pk["x"] % curva.n
         if r == 0:
             continue
-        k_inverso = utils.inverso_modn(k, curva.n)
+        k_inverso = teoria_numeros.inverso_modn(k, curva.n)
         s = (k_inverso * (digest + dA * r)) % curva.n
     # La firma es (r, s).
     print("Envío del firmante:")
@@ -248,8 +323,8 @@ def menu_ecdsa():
     # dispone de dA.
     # Comprobaciones:
     assert 0 < r < curva.n and 0 < s < curva.n
-    w = utils.inverso_modn(s, curva.n)
-    digest = sha2_hashing.sha512(m, "int")  # calcula el digest por su cuenta
+    w = teoria_numeros.inverso_modn(s, curva.n)
+    digest = hashing.sha512(m, "int")  # calcula el digest por su cuenta
     # Como la longitud en bits del digest no puede sobrepasar la del orden n de la curva, eliminamos bits necesarios:
     if 512 > Ln:
         digest >>= 512 - Ln
@@ -5,8 +5,7 @@
 
 import ce
 import bip32
-import sha2_hashing
-import ripemd_hashing
+import hashing
 import utils
 from Cryptodome.Hash import keccak
 
@@ -92,12 +91,23 @@ def bitcoin_publica(clave, prefijo=b"\x00", compressed=True):
     else:
         clave = b"\x04" + clave
     # Primera tanda de hashes:
-    clave = ripemd_hashing.ripemd160(sha2_hashing.sha256(clave, "bytes"), "bytes")
+    clave = hashing.hash160(clave)
     # Añadimos prefijo de la moneda:
     clave = prefijo + clave
     # Ahora le aplicamos un Base58Check:
     return utils.to_base58(clave, formato="str", check=True)
 
+def bitcoin_publicas(claves, prefijo=b"\x00", compressed=True):
+    """Genera las direcciones públicas de un lote de claves, con todos los Hash160 calculados a la vez
+
+    :param claves: claves públicas (lista de int)
+    :param prefijo: depende de la moneda (bytes): bitcoin 0x00, litecoin 0x30, etc.
+    :param compressed: si es True, generará las direcciones compressed; si no, las uncompressed (bool)
+    :return: lista de direcciones, en el mismo orden que las claves (str)
+    """
+    digests = hashing.hash160_many(claves, compressed)
+    return utils.to_base58_many([prefijo + digests[i:i + 20] for i in range(0, len(digests), 20)], "str", check=True)
+
 def genera_dirs(k):
     """Genera las direcciones a partir de la clave privada indicada
 
@@ -4,8 +4,9 @@
 
 import random
 
-import sha2_hashing
+import hashing
 import utils
+import teoria_numeros
 import primos
 import ce
 
@@ -18,7 +19,7 @@ def menu_dsa():
     n = 160  # módulo; n<l, y n debe ser menor o igual que la longitud del hash (en este caso 512)
     # Ahora buscaremos un número primo q de n bits:
     q = 0
-    while not primos.es_primo_mr(q, 25):
+    while not primos.es_primo_bpsw(q):
         q = random.randint(2 ** (n - 1), 2 ** n - 1) | 1
     # Ahora un número primo p de l bits tal que (p-1) es múltiplo de q:
     # Si p tiene l bits, estará entre 2^(l-1) y 2^l-1, y si tiene que ser múltiplo de q, es decir k*q, entonces
@@ -26,7 +27,7 @@ def menu_dsa():
     p = 0
     minimo = 1 + 2 ** (l-1) // q
     maximo = (2 ** l - 1) // q
-    while not primos.es_primo_mr(p, 25):
+    while not primos.es_primo_bpsw(p):
         p_menos1 = random.randint(minimo, maximo) * q
         p = p_menos1 + 1
     g = 1
@@ -49,7 +50,7 @@ def menu_dsa():
 
     # Firma del mensaje:
     m = b"Luke, yo soy tu padre"  # mensaje
-    digest = sha2_hashing.sha224(m, "int")
+    digest = hashing.sha224(m, "int")
     # Como n=160, solo usaremos los 160 primeros bits, con lo que eliminamos los 64 menos significativos:
     digest >>= 64
     r = s = 0
@@ -58,7 +59,7 @@ def menu_dsa():
         r = pow(g, k, p) % q
         if r == 0:
             continue
-        k_inverso = utils.inverso_modn(k, q)
+        k_inverso = teoria_numeros.inverso_modn(k, q)
         s = (k_inverso * (digest + x * r)) % q
     # La firma es (r, s).
     print("Envío del firmante:")
@@ -72,8 +73,8 @@ def menu_dsa():
     # dispone de x.
     # Comprobaciones:
     assert 0 < r < q and 0 < s < q
-    w = utils.inverso_modn(s, q)
-    digest = sha2_hashing.sha224(m, "int")  # calcula el digest por su cuenta
+    w = teoria_numeros.inverso_modn(s, q)
+    digest = hashing.sha224(m, "int")  # calcula el digest por su cuenta
     digest >>= 64  # nuevamente usa solo los primeros 160 bits
     u1 = (digest * w) % q
     u2 = (r * w) % q
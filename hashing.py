@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+
+# Utilidades comunes a todos los algoritmos de hashing (SHA-2 y RIPEMD-160).
+#
+# Los demás scripts calculan sus hashes a través de este módulo, que delega en un "backend": por defecto, las
+# implementaciones propias (sha2_hashing y ripemd_hashing), que sirven de referencia; pero se puede elegir hashlib,
+# mucho más rápido, con usa_backend() o con la variable de entorno HASH_BACKEND. El modo de verificación cruzada
+# (activa_verificacion()) calcula una muestra de los hashes con ambos, comparando resultados y velocidad: tanto de las
+# llamadas a digest() como de los objetos incrementales creados con new().
+
+import os
+import time
+import random
+import warnings
+import hashlib
+import multiprocessing
+import utils
+import sha2_hashing
+import ripemd_hashing
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él, los lotes se calculan mensaje a mensaje
+    np = None
+
+# Variables globales ***************************************************************************************************
+
+# Algoritmos disponibles (nombres como en hashlib):
+ALGORITMOS = ("sha224", "sha256", "sha384", "sha512", "ripemd160")
+
+# Tamaño de los trozos en que se leen los archivos (bytes):
+TAM_TROZO = 2 ** 16
+
+# Backends registrados: nombre -> función que crea un objeto de hashing, a partir del algoritmo y los datos:
+_backends = {}
+
+# Backend activo:
+_activo = "python"
+
+# Estado del modo de verificación cruzada (muestreo 0: desactivado):
+_verificacion = {"muestreo": 0.0, "referencia": "python"}
+
+# Backends *************************************************************************************************************
+
+def _new_python(algoritmo, datos=b""):
+    """Crea un objeto de hashing de las implementaciones propias (backend "python", el de referencia)
+
+    :param algoritmo: nombre del algoritmo (ver ALGORITMOS)
+    :param datos: primer trozo del mensaje (bytes)
+    :return: el objeto creado (HashSHA2 o HashRIPEMD160)
+    """
+    if algoritmo == "ripemd160":
+        return ripemd_hashing.HashRIPEMD160(datos)
+    if algoritmo not in ALGORITMOS:
+        raise ValueError(f"Algoritmo desconocido: {algoritmo}")
+    return sha2_hashing.new(algoritmo, datos)
+
+def _new_hashlib(algoritmo, datos=b""):
+    """Crea un objeto de hashing de hashlib (backend "hashlib")
+
+    Si la versión de OpenSSL no incluye el algoritmo (ocurre con ripemd160), se usa la implementación propia.
+
+    :param algoritmo: nombre del algoritmo (ver ALGORITMOS)
+    :param datos: primer trozo del mensaje (bytes)
+    :return: el objeto creado
+    """
+    if algoritmo in _HASHLIB:
+        return hashlib.new(algoritmo, datos)
+    return _new_python(algoritmo, datos)
+
+def _disponible_hashlib(algoritmo):
+    """Comprueba si hashlib dispone del algoritmo
+
+    :param algoritmo: nombre del algoritmo
+    :return: True si está disponible
+    """
+    try:
+        hashlib.new(algoritmo)
+    except ValueError:
+        return False
+    return True
+
+# Algoritmos de ALGORITMOS disponibles en hashlib:
+_HASHLIB = {algoritmo for algoritmo in ALGORITMOS if _disponible_hashlib(algoritmo)}
+
+def registra_backend(nombre, constructor):
+    """Registra un backend de hashing
+
+    :param nombre: nombre del backend (string)
+    :param constructor: función (algoritmo, datos) que retorna un objeto de hashing con update(), copy(), digest() y
+        hexdigest(), como los de hashlib
+    """
+    _backends[nombre] = constructor
+
+def usa_backend(nombre):
+    """Selecciona el backend con el que se calcularán los hashes a partir de ahora
+
+    :param nombre: nombre de un backend registrado ("python", "hashlib", ...)
+    """
+    global _activo
+    if nombre not in _backends:
+        raise ValueError(f"Backend desconocido: {nombre}")
+    _activo = nombre
+
+def backend():
+    """Retorna el nombre del backend activo
+
+    :return: nombre del backend (string)
+    """
+    return _activo
+
+registra_backend("python", _new_python)
+registra_backend("hashlib", _new_hashlib)
+try:
+    usa_backend(os.environ.get("HASH_BACKEND", "python"))
+except ValueError as excepcion:
+    warnings.warn(f"{excepcion} (variable de entorno HASH_BACKEND); se usa el backend python")
+
+# Verificación cruzada *************************************************************************************************
+
+def activa_verificacion(muestreo=0.01, referencia="python"):
+    """Activa (o desactiva) el modo de verificación cruzada, y reinicia sus estadísticas
+
+    En este modo, una muestra aleatoria de las llamadas a digest() y de los objetos creados con new() se calcula también
+    con el backend de referencia, comparando los resultados y midiendo los tiempos de ambos. Ver
+    informe_verificacion().
+
+    :param muestreo: proporción de llamadas a comprobar, entre 0 (desactivado) y 1 (todas)
+    :param referencia: nombre del backend de referencia
+    """
+    if referencia not in _backends:
+        raise ValueError(f"Backend desconocido: {referencia}")
+    _verificacion.update({
+        "muestreo": muestreo,
+        "referencia": referencia,
+        "llamadas": 0,           # llamadas a digest() y new() desde la activación
+        "comprobadas": 0,        # digests comprobados con el backend de referencia
+        "discrepancias": [],     # tuplas (algoritmo, longitud del mensaje, mensaje en hexadecimal, truncado)
+        "t_backend": 0.0,        # tiempo total del backend activo en las llamadas comprobadas (segundos)
+        "t_referencia": 0.0      # tiempo total del backend de referencia en las llamadas comprobadas (segundos)
+    })
+
+def informe_verificacion():
+    """Retorna las estadísticas del modo de verificación cruzada
+
+    :return: diccionario con las estadísticas, incluyendo "ratio": cuántas veces es más rápido el backend activo que
+        el de referencia (None si no hay datos)
+    """
+    informe = dict(_verificacion)
+    informe["backend"] = _activo
+    informe["ratio"] = None
+    if informe.get("t_backend"):
+        informe["ratio"] = informe["t_referencia"] / informe["t_backend"]
+    return informe
+
+def _verifica(algoritmo, ms):
+    """Calcula un digest con el backend activo y con el de referencia, y anota el resultado de la comparación
+
+    :param algoritmo: nombre del algoritmo
+    :param ms: mensaje (bytes)
+    :return: el digest del backend activo (bytes)
+    """
+    inicio = time.perf_counter()
+    resul = _backends[_activo](algoritmo, ms).digest()
+    medio = time.perf_counter()
+    esperado = _backends[_verificacion["referencia"]](algoritmo, ms).digest()
+    fin = time.perf_counter()
+    _verificacion["comprobadas"] += 1
+    _verificacion["t_backend"] += medio - inicio
+    _verificacion["t_referencia"] += fin - medio
+    if resul != esperado:
+        _verificacion["discrepancias"].append((algoritmo, len(ms), bytes(ms[:64]).hex()))
+    return resul
+
+class _HashVerificado:
+    """Objeto de hashing incremental del modo de verificación cruzada: pasa los datos a un objeto del backend activo y
+    a otro del de referencia, y compara sus digests cada vez que se pide uno
+    """
+
+    def __init__(self, algoritmo, activo, referencia):
+        """Inicializa el objeto
+
+        :param algoritmo: nombre del algoritmo
+        :param activo: objeto de hashing del backend activo
+        :param referencia: objeto de hashing del backend de referencia, con el mismo estado
+        """
+        self._activo = activo
+        self._referencia = referencia
+        self._inicio = bytearray()  # primeros bytes del mensaje, para anotar las discrepancias
+        self._longitud = 0
+        self.name = algoritmo
+        self.digest_size = activo.digest_size
+        self.block_size = activo.block_size
+
+    def update(self, datos):
+        """Añade un trozo al mensaje, en ambos objetos
+
+        :param datos: trozo del mensaje (bytes)
+        """
+        if len(self._inicio) < 64:
+            self._inicio += bytes(datos[:64 - len(self._inicio)])
+        self._longitud += len(datos)
+        inicio = time.perf_counter()
+        self._activo.update(datos)
+        medio = time.perf_counter()
+        self._referencia.update(datos)
+        _verificacion["t_backend"] += medio - inicio
+        _verificacion["t_referencia"] += time.perf_counter() - medio
+
+    def copy(self):
+        """Retorna una copia independiente del objeto, con el mismo estado
+
+        :return: la copia (_HashVerificado)
+        """
+        copia = _HashVerificado(self.name, self._activo.copy(), self._referencia.copy())
+        copia._inicio = bytearray(self._inicio)
+        copia._longitud = self._longitud
+        return copia
+
+    def digest(self):
+        """Retorna el digest del backend activo, y anota el resultado de la comparación con el de referencia
+
+        :return: el digest (bytes)
+        """
+        resul = self._activo.digest()
+        _verificacion["comprobadas"] += 1
+        if resul != self._referencia.digest():
+            _verificacion["discrepancias"].append((self.name, self._longitud, self._inicio.hex()))
+        return resul
+
+    def hexdigest(self):
+        """Retorna el digest del backend activo, en hexadecimal
+
+        :return: el digest (string)
+        """
+        return self.digest().hex()
+
+# Funciones auxiliares *************************************************************************************************
+
+def new(algoritmo, datos=b""):
+    """Crea un objeto de hashing incremental del algoritmo indicado (como hashlib.new()), con el backend activo
+
+    :param algoritmo: nombre del algoritmo (ver ALGORITMOS)
+    :param datos: primer trozo del mensaje (bytes)
+    :return: el objeto creado
+    """
+    muestreo = _verificacion["muestreo"]
+    if muestreo:
+        _verificacion["llamadas"] += 1
+        if random.random() < muestreo:
+            referencia = _backends[_verificacion["referencia"]](algoritmo)
+            resul = _HashVerificado(algoritmo, _backends[_activo](algoritmo), referencia)
+            if datos:
+                resul.update(datos)
+            return resul
+    return _backends[_activo](algoritmo, datos)
+
+def formatea(digest, formato):
+    """Formatea un digest
+
+    :param digest: el digest (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest formateado
+    """
+    if formato == "hex":
+        return digest.hex()
+    if formato == "bin":
+        return utils.int2bin(int.from_bytes(digest, "big"), len(digest) * 8, "")
+    if formato == "bytes":
+        return digest
+    if formato == "int":
+        return int.from_bytes(digest, "big")
+    return None
+
+def digest(algoritmo, ms, formato="bytes"):
+    """Retorna el digest del mensaje, calculado con el backend activo
+
+    :param algoritmo: nombre del algoritmo (ver ALGORITMOS)
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    muestreo = _verificacion["muestreo"]
+    if muestreo:
+        _verificacion["llamadas"] += 1
+        if random.random() < muestreo:
+            return formatea(_verifica(algoritmo, ms), formato)
+    return formatea(_backends[_activo](algoritmo, ms).digest(), formato)
+
+def sha224(ms, formato="hex"):
+    """Retorna el digest del mensaje de entrada, aplicando SHA-224 con el backend activo
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    return digest("sha224", ms, formato)
+
+def sha256(ms, formato="hex"):
+    """Retorna el digest del mensaje de entrada, aplicando SHA-256 con el backend activo
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    return digest("sha256", ms, formato)
+
+def sha384(ms, formato="hex"):
+    """Retorna el digest del mensaje de entrada, aplicando SHA-384 con el backend activo
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    return digest("sha384", ms, formato)
+
+def sha512(ms, formato="hex"):
+    """Retorna el digest del mensaje de entrada, aplicando SHA-512 con el backend activo
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    return digest("sha512", ms, formato)
+
+def sha256_many(mensajes):
+    """Retorna los digests SHA-256 (bytes) de una lista de mensajes, calculados con el backend activo
+
+    Con el backend de referencia se usa sha2_hashing.sha256_many(), que calcula a la vez los mensajes de la misma
+    longitud (con NumPy, si está disponible).
+
+    :param mensajes: lista de mensajes (bytes)
+    :return: lista de digests (bytes), en el mismo orden que los mensajes
+    """
+    if _activo == "python" and not _verificacion["muestreo"]:
+        return sha2_hashing.sha256_many(mensajes)
+    return [digest("sha256", ms) for ms in mensajes]
+
+def hash256(ms, formato="bytes"):
+    """Retorna el doble SHA-256 del mensaje, SHA-256(SHA-256(ms)), usado en los checksums de Base58Check
+
+    Con el backend de referencia se usa sha2_hashing.hash256(), que aprovecha que el segundo mensaje es siempre de
+    32 bytes.
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    if _activo == "python" and not _verificacion["muestreo"]:
+        return sha2_hashing.hash256(ms, formato)
+    return digest("sha256", digest("sha256", ms), formato)
+
+def hash160(ms, formato="bytes"):
+    """Retorna el Hash160 del mensaje, RIPEMD-160(SHA-256(ms)), usado en fingerprints y direcciones Bitcoin
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    if _activo == "python" and not _verificacion["muestreo"]:
+        return ripemd_hashing.ripemd160(sha2_hashing.sha256(ms, "bytes"), formato)
+    return digest("ripemd160", digest("sha256", ms), formato)
+
+def serializa_publica(clave, compressed=True):
+    """Serializa una clave pública de curva elíptica (formato SEC: prefijo 02/03 y x, o prefijo 04, x e y)
+
+    :param clave: clave pública: entero (x << 256) | y, diccionario {"x": x, "y": y} (como ce.Curva.k_g()), o bytes
+        ya serializados (se retornan tal cual)
+    :param compressed: si es True, serialización comprimida (33 bytes); si no, sin comprimir (65 bytes)
+    :return: la clave serializada (bytes)
+    """
+    if isinstance(clave, (bytes, bytearray)):
+        return bytes(clave)
+    if isinstance(clave, dict):
+        x, y = clave["x"], clave["y"]
+    else:
+        x, y = clave >> 256, clave & (2 ** 256 - 1)
+    if compressed:
+        return (b"\x03" if y & 1 else b"\x02") + x.to_bytes(32, "big")
+    return b"\x04" + x.to_bytes(32, "big") + y.to_bytes(32, "big")
+
+def _serializa_lote(claves, compressed):
+    """Serializa un lote de claves públicas (enteros o diccionarios) en un array de NumPy, con una clave por fila
+
+    :param claves: lista de claves públicas (ver serializa_publica())
+    :param compressed: si es True, serialización comprimida; si no, sin comprimir
+    :return: array uint8 de forma (número de claves, 33 o 65)
+    """
+    if isinstance(claves[0], dict):
+        crudas = b"".join(K["x"].to_bytes(32, "big") + K["y"].to_bytes(32, "big") for K in claves)
+    else:
+        crudas = b"".join(K.to_bytes(64, "big") for K in claves)
+    xy = np.frombuffer(crudas, dtype=np.uint8).reshape(len(claves), 64)
+    if compressed:
+        serializadas = np.empty((len(claves), 33), dtype=np.uint8)
+        serializadas[:, 0] = 2 + (xy[:, 63] & 1)  # paridad de y (último byte)
+        serializadas[:, 1:] = xy[:, :32]
+    else:
+        serializadas = np.empty((len(claves), 65), dtype=np.uint8)
+        serializadas[:, 0] = 4
+        serializadas[:, 1:] = xy
+    return serializadas
+
+def hash160_many(claves, compressed=True, procesos=1):
+    """Retorna los Hash160 de un lote de claves públicas, serializándolas y calculándolos todos a la vez
+
+    Con el backend de referencia y NumPy, las claves se serializan en un array y se calculan SHA-256 y RIPEMD-160
+    vectorizados, con una clave por "lane". Si procesos > 1, el lote se reparte además entre varios procesos.
+
+    :param claves: lista de claves públicas (ver serializa_publica(); todas del mismo tipo)
+    :param compressed: si es True, serialización comprimida; si no, sin comprimir (no afecta a las ya serializadas)
+    :param procesos: número de procesos a utilizar (1 para calcular todo en el proceso actual)
+    :return: buffer contiguo (bytes) con los digests de 20 bytes, en el mismo orden: el i-ésimo es resul[20*i:20*i+20]
+    """
+    if procesos > 1 and len(claves) > 1:
+        tam = -(-len(claves) // procesos)
+        trozos = [(claves[i:i + tam], compressed) for i in range(0, len(claves), tam)]
+        with multiprocessing.Pool(len(trozos)) as pool:
+            return b"".join(pool.starmap(hash160_many, trozos))
+    if _activo != "python" or _verificacion["muestreo"] or np is None or len(claves) < sha2_hashing.MIN_LOTE:
+        return b"".join(hash160(serializa_publica(K, compressed)) for K in claves)
+    if isinstance(claves[0], (bytes, bytearray)):
+        # Ya serializadas; las agrupamos por longitud (33 o 65 bytes):
+        grupos = {}
+        for i, K in enumerate(claves):
+            grupos.setdefault(len(K), []).append(i)
+        resul = np.empty((len(claves), 20), dtype=np.uint8)
+        for longitud, indices in grupos.items():
+            datos = np.frombuffer(b"".join(bytes(claves[i]) for i in indices), dtype=np.uint8)
+            resul[indices] = ripemd_hashing.ripemd160_lote(sha2_hashing.sha256_lote(datos.reshape(-1, longitud)))
+        return resul.tobytes()
+    return ripemd_hashing.ripemd160_lote(sha2_hashing.sha256_lote(_serializa_lote(claves, compressed))).tobytes()
+
+def ripemd160(ms, formato="hex"):
+    """Retorna el digest del mensaje de entrada, aplicando RIPEMD-160 con el backend activo
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    return digest("ripemd160", ms, formato)
+
+def _trabajador(conexion, algoritmos):
+    """Proceso que recibe los trozos de un archivo por una conexión y calcula sus digests
+
+    Un trozo vacío indica el final del archivo; entonces retorna por la misma conexión un diccionario con los digests.
+    Si la conexión se cierra antes (p.e. por un error de lectura en el proceso principal), termina sin más.
+
+    :param conexion: extremo de un multiprocessing.Pipe()
+    :param algoritmos: lista de nombres de algoritmo a calcular en este proceso
+    """
+    hashes = [new(algoritmo) for algoritmo in algoritmos]
+    try:
+        while trozo := conexion.recv_bytes():
+            for h in hashes:
+                h.update(trozo)
+        conexion.send({algoritmo: h.hexdigest() for algoritmo, h in zip(algoritmos, hashes)})
+    except (EOFError, BrokenPipeError):
+        pass
+    finally:
+        conexion.close()
+
+def digests_archivo(ruta, algoritmos=ALGORITMOS, procesos=1):
+    """Calcula varios digests de un archivo leyéndolo una sola vez, por trozos
+
+    Cada trozo leído se pasa a todos los algoritmos a la vez. Si procesos > 1, los algoritmos se reparten entre
+    varios procesos, de forma que el tiempo total se acerque al del algoritmo más lento, en lugar de a la suma de todos.
+
+    :param ruta: ruta del archivo
+    :param algoritmos: nombres de los algoritmos a calcular (ver ALGORITMOS)
+    :param procesos: número máximo de procesos a utilizar (1 para calcular todo en el proceso actual)
+    :return: diccionario {algoritmo: digest en hexadecimal}
+    """
+    buffer = bytearray(TAM_TROZO)
+    vista = memoryview(buffer)
+    procesos = min(procesos, len(algoritmos))
+    if procesos <= 1:
+        hashes = [new(algoritmo) for algoritmo in algoritmos]
+        with open(ruta, "rb") as f:
+            while n := f.readinto(buffer):
+                for h in hashes:
+                    h.update(vista[:n])
+        return {algoritmo: h.hexdigest() for algoritmo, h in zip(algoritmos, hashes)}
+    # Abrimos el archivo antes de arrancar los procesos (si no existe, no llegan a arrancarse). Repartimos los
+    # algoritmos entre los procesos, y abrimos una conexión con cada uno:
+    with open(ruta, "rb") as f:
+        conexiones = []
+        trabajadores = []
+        try:
+            for i in range(procesos):
+                local, remota = multiprocessing.Pipe()
+                trabajador = multiprocessing.Process(target=_trabajador, args=(remota, algoritmos[i::procesos]),
+                                                     daemon=True)
+                conexiones.append(local)
+                trabajador.start()
+                remota.close()
+                trabajadores.append(trabajador)
+            while n := f.readinto(buffer):
+                for conexion in conexiones:
+                    conexion.send_bytes(vista[:n])
+            resul = {}
+            for conexion in conexiones:
+                conexion.send_bytes(b"")  # fin del archivo
+                resul.update(conexion.recv())
+        finally:
+            for conexion in conexiones:
+                conexion.close()
+            for trabajador in trabajadores:
+                trabajador.join()
+    # Retornamos los digests en el mismo orden en que se solicitaron:
+    return {algoritmo: resul[algoritmo] for algoritmo in algoritmos}
+
+def input_archivo():
+    """Muestra los archivos del directorio actual y solicita uno
+
+    :return: la ruta introducida (string)
+    """
+    print("Archivos del directorio actual:")
+    for archivo in os.listdir("."):
+        if os.path.isfile(archivo):
+            print(archivo)
+    return input("Archivo (ruta relativa o absoluta): ")
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_digests_archivo():
+    """Solicita un archivo y calcula todos sus digests (SHA-2 y RIPEMD-160) en una sola lectura"""
+    arch = input_archivo()
+    procesos = utils.input_int(f"Número de procesos (1-{len(ALGORITMOS)}, por defecto 1)",
+                               range(1, len(ALGORITMOS) + 1), 1)
+    try:
+        digests = digests_archivo(arch, ALGORITMOS, procesos)
+    except FileNotFoundError:
+        print("Archivo no encontrado.")
+        return
+    for algoritmo, digest in digests.items():
+        print(f"{algoritmo}:\n   ", digest)
+
+def menu_backend():
+    """Muestra los backends disponibles y permite elegir el activo"""
+    nombres = list(_backends)
+    for i, nombre in enumerate(nombres):
+        print(f"{i + 1}. {nombre}" + (" (activo)" if nombre == _activo else ""))
+    print(f"hashlib dispone de: {', '.join(sorted(_HASHLIB))}")
+    i = utils.input_int("Backend a utilizar (Intro para no cambiar)", range(1, len(nombres) + 1))
+    if i:
+        usa_backend(nombres[i - 1])
+
+def menu_verificacion():
+    """Compara el backend activo con el de referencia sobre mensajes aleatorios, y muestra el informe"""
+    nmensajes = utils.input_int("Número de mensajes por algoritmo (1-1000, por defecto 50)", range(1, 1001), 50)
+    activa_verificacion(1.0)
+    for _ in range(nmensajes):
+        ms = os.urandom(random.randint(0, 1000))
+        for algoritmo in ALGORITMOS:
+            digest(algoritmo, ms)
+    informe = informe_verificacion()
+    activa_verificacion(0.0)
+    print(f"Backend {informe['backend']} frente a {informe['referencia']}:")
+    print(f"Digests comprobados: {informe['comprobadas']}; discrepancias: {len(informe['discrepancias'])}")
+    for algoritmo, longitud, ms in informe["discrepancias"]:
+        print(f"    {algoritmo}, mensaje de {longitud} bytes: {ms}")
+    if informe["ratio"]:
+        print(f"El backend {informe['backend']} es {informe['ratio']:.1f} veces más rápido.")
+
+def menu_benchmark_hash160():
+    """Mide el coste por clave de hash160_many() frente a hash160() clave a clave, con claves públicas aleatorias"""
+    for n in (100, 10000, 100000):
+        claves = [int.from_bytes(os.urandom(64), "big") for _ in range(n)]
+        inicio = time.perf_counter()
+        for K in claves[:1000]:
+            hash160(serializa_publica(K))
+        t_uno = (time.perf_counter() - inicio) / min(n, 1000)
+        inicio = time.perf_counter()
+        hash160_many(claves)
+        t_lote = (time.perf_counter() - inicio) / n
+        print(f"Lote de {n} claves: {t_uno * 1e6:.1f} µs por clave de una en una; {t_lote * 1e6:.1f} µs en lote")
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Hashes de un archivo (todos los algoritmos)", menu_digests_archivo),
+    ("Elegir backend", menu_backend),
+    ("Verificación cruzada de backends", menu_verificacion),
+    ("Medir Hash160 por lotes", menu_benchmark_hash160)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    # Bucle principal:
+    utils.menu(opciones_menu)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+# Manifiestos de hashes de un árbol de directorios (compatibles con el formato de sha256sum y similares).
+#
+# Se puede usar con el menú habitual, o sin interacción, desde la línea de comandos:
+#     manifiesto.py crear DIRECTORIO [-a sha256] [-o MANIFIESTO] [-p PROCESOS] [--sin-cache]
+#     manifiesto.py verificar DIRECTORIO [-m MANIFIESTO] [-p PROCESOS]
+# La caché de tamaños y fechas solo se usa al crear el manifiesto; al verificar se leen siempre todos los archivos.
+
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+import utils
+import hashing
+
+# Variables globales ***************************************************************************************************
+
+# Nombre por defecto del manifiesto y de la caché (dentro del directorio a procesar):
+MANIFIESTO = "MANIFIESTO"
+CACHE = ".cache-manifiesto.json"
+
+# Funciones auxiliares *************************************************************************************************
+
+def recorre(directorio, excluir=()):
+    """Retorna las rutas relativas de todos los archivos del árbol de directorios, ordenadas
+
+    :param directorio: directorio raíz
+    :param excluir: rutas relativas a excluir (p.e. el propio manifiesto)
+    :return: lista de rutas relativas, con separador "/" (strings)
+    """
+    rutas = []
+    for raiz, directorios, archivos in os.walk(directorio):
+        directorios.sort()
+        for archivo in archivos:
+            ruta = os.path.relpath(os.path.join(raiz, archivo), directorio).replace(os.sep, "/")
+            if ruta not in excluir:
+                rutas.append(ruta)
+    return sorted(rutas)
+
+def _digest(tarea):
+    """Calcula el digest de un archivo (función ejecutada por los procesos del pool)
+
+    :param tarea: tupla (ruta absoluta, ruta relativa, algoritmo)
+    :return: tupla (ruta relativa, digest en hexadecimal)
+    """
+    ruta, relativa, algoritmo = tarea
+    return relativa, hashing.digests_archivo(ruta, (algoritmo,))[algoritmo]
+
+def _lee_cache(ruta):
+    """Lee la caché de digests; si no existe o no es válida, retorna una vacía
+
+    :param ruta: ruta del archivo de caché (o None, sin caché)
+    :return: diccionario {ruta relativa: [mtime_ns, tamaño, algoritmo, digest]}
+    """
+    if not ruta:
+        return {}
+    try:
+        with open(ruta, "rt") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def calcula_digests(directorio, rutas, algoritmo, procesos=None, cache=None):
+    """Calcula los digests de los archivos indicados, repartiéndolos entre un pool de procesos
+
+    Si se indica una caché, los archivos cuyo tamaño y fecha de modificación no hayan cambiado no se vuelven a leer.
+
+    :param directorio: directorio raíz
+    :param rutas: rutas relativas de los archivos
+    :param algoritmo: nombre del algoritmo (ver hashing.ALGORITMOS)
+    :param procesos: número de procesos (None: tantos como CPUs)
+    :param cache: ruta del archivo de caché (o None, sin caché)
+    :return: diccionario {ruta relativa: digest en hexadecimal}
+    """
+    anterior = _lee_cache(cache)
+    nueva = {}
+    digests = {}
+    tareas = []
+    for relativa in rutas:
+        ruta = os.path.join(directorio, relativa)
+        estado = os.stat(ruta)
+        clave = [estado.st_mtime_ns, estado.st_size, algoritmo]
+        if anterior.get(relativa, [None])[:3] == clave:
+            digests[relativa] = anterior[relativa][3]
+            nueva[relativa] = anterior[relativa]
+        else:
+            tareas.append((ruta, relativa, algoritmo))
+            nueva[relativa] = clave
+    if tareas:
+        with multiprocessing.Pool(procesos) as pool:
+            for relativa, digest in pool.imap_unordered(_digest, tareas):
+                digests[relativa] = digest
+                nueva[relativa].append(digest)
+    if cache:
+        with open(cache, "wt") as f:
+            json.dump(nueva, f)
+    return digests
+
+def crea_manifiesto(directorio, algoritmo="sha256", manifiesto=None, procesos=None, cache=True):
+    """Calcula los digests de todos los archivos del árbol y escribe el manifiesto
+
+    Cada línea del manifiesto tiene el formato de sha256sum: digest, dos espacios y ruta relativa.
+
+    :param directorio: directorio raíz
+    :param algoritmo: nombre del algoritmo (ver hashing.ALGORITMOS)
+    :param manifiesto: ruta del manifiesto (None: MANIFIESTO dentro del directorio)
+    :param procesos: número de procesos (None: tantos como CPUs)
+    :param cache: si es True, usa la caché (CACHE dentro del directorio)
+    :return: número de archivos incluidos en el manifiesto
+    """
+    if algoritmo not in hashing.ALGORITMOS:
+        raise ValueError(f"Algoritmo desconocido: {algoritmo}")
+    manifiesto = manifiesto or os.path.join(directorio, MANIFIESTO)
+    cache = os.path.join(directorio, CACHE) if cache else None
+    excluir = {os.path.relpath(manifiesto, directorio).replace(os.sep, "/"), CACHE}
+    rutas = recorre(directorio, excluir)
+    digests = calcula_digests(directorio, rutas, algoritmo, procesos, cache)
+    with open(manifiesto, "wt") as f:
+        for ruta in rutas:
+            f.write(f"{digests[ruta]}  {ruta}\n")
+    return len(rutas)
+
+def _ruta_segura(ruta):
+    """Comprueba que una ruta del manifiesto es relativa y no sale del directorio (sin componentes "..")
+
+    :param ruta: ruta relativa, con separador "/"
+    :return: True si es segura, False si no
+    """
+    if not ruta or os.path.isabs(ruta) or os.path.splitdrive(ruta)[0] or ruta.startswith(("/", "\\")):
+        return False
+    return ".." not in ruta.replace("\\", "/").split("/")
+
+def verifica_manifiesto(directorio, manifiesto=None, procesos=None):
+    """Comprueba los archivos del árbol contra un manifiesto
+
+    El algoritmo se deduce de la longitud de los digests del manifiesto (todos los algoritmos tienen longitudes
+    distintas). Se calculan los digests de todos los archivos, sin usar la caché: la caché está dentro del propio
+    directorio, y un árbol manipulado podría incluir una caché con los digests esperados.
+
+    :param directorio: directorio raíz
+    :param manifiesto: ruta del manifiesto (None: MANIFIESTO dentro del directorio)
+    :param procesos: número de procesos (None: tantos como CPUs)
+    :return: lista de tuplas (ruta relativa, resultado), donde resultado es "OK", "FALLO", "NO ENCONTRADO",
+        "RUTA NO VÁLIDA" (absoluta o con "..") o "LÍNEA INCORRECTA" (en este caso, la ruta es "línea N")
+    """
+    longitudes = {len(hashing.new(algoritmo).hexdigest()): algoritmo for algoritmo in hashing.ALGORITMOS}
+    manifiesto = manifiesto or os.path.join(directorio, MANIFIESTO)
+    esperados = {}
+    resul = []
+    algoritmo = None
+    with open(manifiesto, "rt") as f:
+        for i, linea in enumerate(f, 1):
+            linea = linea.rstrip("\r\n")
+            if not linea.strip():
+                continue
+            # Formato: digest, un espacio, y ' ' o '*' (sha256sum marca así los archivos leídos en modo binario):
+            digest, _, ruta = linea.partition(" ")
+            digest = digest.lower()
+            correcta = ruta[:1] in (" ", "*") and len(ruta) > 1 and all(c in "0123456789abcdef" for c in digest)
+            if correcta and algoritmo is None:
+                algoritmo = longitudes.get(len(digest))
+            if not correcta or not algoritmo or len(digest) != len(hashing.new(algoritmo).hexdigest()):
+                resul.append((f"línea {i}", "LÍNEA INCORRECTA"))
+            elif not _ruta_segura(ruta[1:]):
+                resul.append((ruta[1:], "RUTA NO VÁLIDA"))
+            else:
+                esperados[ruta[1:]] = digest
+    existentes = [ruta for ruta in esperados if os.path.isfile(os.path.join(directorio, ruta))]
+    digests = calcula_digests(directorio, existentes, algoritmo, procesos) if existentes else {}
+    for ruta, digest in esperados.items():
+        if ruta not in digests:
+            resul.append((ruta, "NO ENCONTRADO"))
+        elif digests[ruta] == digest:
+            resul.append((ruta, "OK"))
+        else:
+            resul.append((ruta, "FALLO"))
+    return resul
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_crear():
+    """Solicita directorio y algoritmo, y crea el manifiesto del árbol"""
+    directorio = input("Directorio (por defecto el actual): ") or "."
+    algoritmo = input(f"Algoritmo ({', '.join(hashing.ALGORITMOS)}; por defecto sha256): ") or "sha256"
+    try:
+        n = crea_manifiesto(directorio, algoritmo)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        return
+    print(f"Manifiesto creado con {n} archivos.")
+
+def menu_verificar():
+    """Solicita directorio y comprueba sus archivos contra el manifiesto"""
+    directorio = input("Directorio (por defecto el actual): ") or "."
+    try:
+        resul = verifica_manifiesto(directorio)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        return
+    for ruta, estado in resul:
+        print(f"{ruta}: {estado}")
+
+# Línea de comandos ****************************************************************************************************
+
+def main(argumentos):
+    """Ejecuta la herramienta sin interacción, según los argumentos de la línea de comandos
+
+    :param argumentos: lista de argumentos (sin el nombre del script)
+    :return: código de salida (0 si todo es correcto)
+    """
+    parser = argparse.ArgumentParser(prog="manifiesto.py", description="Manifiestos de hashes de un directorio")
+    subparsers = parser.add_subparsers(dest="accion", required=True)
+    crear = subparsers.add_parser("crear", help="crea el manifiesto")
+    crear.add_argument("directorio")
+    crear.add_argument("-a", "--algoritmo", choices=hashing.ALGORITMOS, default="sha256")
+    crear.add_argument("-o", "--manifiesto", help=f"ruta del manifiesto (por defecto DIRECTORIO/{MANIFIESTO})")
+    verificar = subparsers.add_parser("verificar", help="comprueba el directorio contra el manifiesto")
+    verificar.add_argument("directorio")
+    verificar.add_argument("-m", "--manifiesto", help=f"ruta del manifiesto (por defecto DIRECTORIO/{MANIFIESTO})")
+    for subparser in (crear, verificar):
+        subparser.add_argument("-p", "--procesos", type=int, help="número de procesos (por defecto, uno por CPU)")
+    crear.add_argument("--sin-cache", action="store_true", help="no usa la caché de tamaños y fechas")
+    args = parser.parse_args(argumentos)
+    if args.accion == "crear":
+        n = crea_manifiesto(args.directorio, args.algoritmo, args.manifiesto, args.procesos, not args.sin_cache)
+        print(f"Manifiesto creado con {n} archivos.")
+        return 0
+    resul = verifica_manifiesto(args.directorio, args.manifiesto, args.procesos)
+    for ruta, estado in resul:
+        print(f"{ruta}: {estado}")
+    fallos = sum(estado != "OK" for _, estado in resul)
+    if fallos:
+        print(f"AVISO: {fallos} de {len(resul)} archivos no coinciden.", file=sys.stderr)
+        return 1
+    return 0
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Crear manifiesto de un directorio", menu_crear),
+    ("Verificar directorio contra su manifiesto", menu_verificar)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    if len(sys.argv) > 1:
+        # Con argumentos, sin interacción:
+        sys.exit(main(sys.argv[1:]))
+    # Bucle principal:
+    utils.menu(opciones_menu)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+
+# Mapa de bits de los primos impares hasta un límite, guardado en disco y abierto con mmap, para comprobar la
+# primalidad de números "pequeños" (p.e. de 32 bits) en tiempo constante, sin cargar el archivo en memoria.
+#
+# Formato del archivo:
+#     - Cabecera de 16 bytes: FIRMA (8 bytes) y el límite (entero little endian de 8 bytes, múltiplo de 16).
+#     - Mapa de bits: el bit j del byte k (empezando por el bit menos significativo) representa el número impar
+#       2 * (8k + j) + 1, y vale 1 si es primo. Son límite / 16 bytes (2^32 ocupa 256 MB).
+#     - Índice: por cada bloque de TAM_BLOQUE bytes del mapa, cuántos primos (incluido el 2) hay antes del bloque
+#       (enteros little endian de 8 bytes). Permite calcular pi(n) contando bits de un solo bloque.
+
+import os
+import mmap
+import time
+import struct
+import warnings
+import multiprocessing
+import utils
+import primos
+
+# Variables globales ***************************************************************************************************
+
+# Archivo por defecto (si existe, primos.es_primo_mr() y primos.es_primo_bpsw() lo usan automáticamente):
+ARCHIVO_MAPA = "datos/primos.bin"
+
+# Firma de la cabecera del archivo:
+FIRMA = b"PRIMOS01"
+
+# Bytes del mapa por cada entrada del índice:
+TAM_BLOQUE = 4096
+
+# Tablas de traducción para empaquetar los bits: _DESPLAZA[j] convierte el byte 1 en el bit j (1 << j):
+_DESPLAZA = [bytes((i << j) & 0xff for i in range(256)) for j in range(8)]
+
+# Mapa abierto por defecto (ver mapa()): None si aún no se ha buscado, False si no existe el archivo:
+_mapa = None
+
+# Clase MapaPrimos *****************************************************************************************************
+
+class MapaPrimos:
+    """Mapa de bits de los primos impares, abierto con mmap (solo lectura)"""
+
+    def __init__(self, ruta=ARCHIVO_MAPA):
+        """Abre el archivo del mapa
+
+        :param ruta: ruta del archivo, generado con genera_mapa()
+        :raises ValueError: si el archivo no es un mapa de primos, o está incompleto
+        """
+        with open(ruta, "rb") as f:
+            if os.fstat(f.fileno()).st_size < 16:
+                raise ValueError(f"{ruta} no es un mapa de primos")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        firma, self.limite = struct.unpack_from("<8sQ", self._mm, 0)
+        if firma != FIRMA:
+            self._mm.close()
+            raise ValueError(f"{ruta} no es un mapa de primos")
+        # Cabecera, mapa de bits e índice (una entrada por bloque, incluido el último aunque esté incompleto):
+        if len(self._mm) != 16 + self.limite // 16 + 8 * -(-(self.limite // 16) // TAM_BLOQUE):
+            self._mm.close()
+            raise ValueError(f"{ruta} está incompleto (tamaño incorrecto para el límite {self.limite})")
+        self._inicio_indice = 16 + self.limite // 16
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cierra()
+
+    def cierra(self):
+        """Cierra el archivo"""
+        self._mm.close()
+
+    def es_primo(self, n):
+        """Comprueba si un número es primo, consultando su bit
+
+        :param n: entero (0 <= n < limite)
+        :return: True si es primo, False si no
+        """
+        if n < 3 or not n & 1:
+            return n == 2
+        assert n < self.limite, "Número fuera del mapa"
+        i = n >> 1
+        return bool(self._mm[16 + (i >> 3)] >> (i & 7) & 1)
+
+    def siguiente_primo(self, n):
+        """Retorna el menor primo mayor que n
+
+        :param n: entero
+        :return: el primo, o None si no hay ninguno en el mapa
+        """
+        if n < 2:
+            return 2
+        # Empezamos por el impar siguiente a n, y recorremos el mapa byte a byte:
+        i = (n + 1) >> 1
+        k = i >> 3
+        byte = self._mm[16 + k] >> (i & 7) << (i & 7) if 16 + k < self._inicio_indice else 0
+        while not byte:
+            k += 1
+            if 16 + k >= self._inicio_indice:
+                return None
+            byte = self._mm[16 + k]
+        j = (byte & -byte).bit_length() - 1  # bit más bajo a 1
+        return 2 * (8 * k + j) + 1
+
+    def pi(self, n):
+        """Retorna cuántos primos hay menores o iguales que n (función π)
+
+        :param n: entero (n < limite)
+        :return: número de primos (int)
+        """
+        if n < 2:
+            return 0
+        assert n < self.limite, "Número fuera del mapa"
+        # Bits (impares) a contar: los de índice 0..i, es decir, los impares hasta n:
+        i = (n - 1) >> 1
+        k = i >> 3
+        bloque = k // TAM_BLOQUE
+        resul = struct.unpack_from("<Q", self._mm, self._inicio_indice + 8 * bloque)[0]
+        # Bytes completos desde el principio del bloque, y bits del último byte:
+        resul += int.from_bytes(self._mm[16 + bloque * TAM_BLOQUE:16 + k], "little").bit_count()
+        resul += (self._mm[16 + k] & ((2 << (i & 7)) - 1)).bit_count()
+        return resul
+
+# Funciones auxiliares *************************************************************************************************
+
+def _empaqueta(marcas):
+    """Empaqueta un bytearray de 0s y 1s (de longitud múltiplo de 8) en bits
+
+    Se separan los bytes de cada posición j (0..7) dentro de cada grupo de 8 con slices, se convierten en el bit j con
+    una tabla de traducción y se combinan con un OR de enteros grandes: todo en tiempo lineal.
+
+    :param marcas: bytearray con un 0 o un 1 por número
+    :return: bytes empaquetados (un bit por número, el primero en el bit menos significativo)
+    """
+    resul = 0
+    for j in range(8):
+        resul |= int.from_bytes(marcas[j::8].translate(_DESPLAZA[j]), "big")
+    return resul.to_bytes(len(marcas) // 8, "big")
+
+def _bits_segmento(tramo):
+    """Criba un tramo y retorna su parte del mapa de bits
+
+    :param tramo: tupla (inicio, fin), con inicio y fin múltiplos de 16
+    :return: bytes del mapa
+    """
+    return _empaqueta(primos.criba_segmento(tramo)[1])
+
+def genera_mapa(limite, ruta=ARCHIVO_MAPA, procesos=1):
+    """Genera el archivo del mapa de bits de los primos menores que limite, con la criba segmentada de primos
+
+    La memoria usada no depende del límite: los segmentos se escriben a medida que se criban, y solo se guarda en
+    memoria el índice. El archivo se escribe con otro nombre (ruta + ".tmp"), que solo se renombra a ruta cuando está
+    completo: si la generación se interrumpe, no queda un mapa a medias.
+
+    :param limite: límite (se redondea al múltiplo de 16 superior)
+    :param ruta: ruta del archivo a generar
+    :param procesos: número de procesos entre los que repartir los segmentos
+    :return: el límite usado
+    """
+    global _mapa
+    limite = -(-limite // 16) * 16
+    indice = []
+    cuenta = 1  # el 2, que no está en el mapa
+    pendiente = b""  # bytes que aún no completan un bloque del índice
+    temporal = ruta + ".tmp"
+    try:
+        with open(temporal, "wb") as f:
+            f.write(struct.pack("<8sQ", FIRMA, limite))
+            for bits in utils.procesa_ordenado(_bits_segmento, primos.divide_tramos(0, limite), procesos):
+                f.write(bits)
+                pendiente += bits
+                fin = len(pendiente) - len(pendiente) % TAM_BLOQUE
+                for inicio in range(0, fin, TAM_BLOQUE):
+                    indice.append(cuenta)
+                    cuenta += int.from_bytes(pendiente[inicio:inicio + TAM_BLOQUE], "little").bit_count()
+                pendiente = pendiente[fin:]
+            if pendiente:
+                indice.append(cuenta)
+            f.write(struct.pack(f"<{len(indice)}Q", *indice))
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+    _mapa = None  # si era el mapa por defecto, se volverá a abrir
+    return limite
+
+def mapa():
+    """Retorna el mapa por defecto (ARCHIVO_MAPA), abriéndolo la primera vez
+
+    :return: el mapa (MapaPrimos), o None si el archivo no existe o no es válido
+    """
+    global _mapa
+    if _mapa is None:
+        _mapa = False
+        if os.path.exists(ARCHIVO_MAPA):
+            try:
+                _mapa = MapaPrimos(ARCHIVO_MAPA)
+            except ValueError as excepcion:
+                # Sin mapa, las pruebas de primalidad siguen funcionando (sin consultarlo):
+                warnings.warn(f"No se usa el mapa de primos: {excepcion}")
+    return _mapa or None
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_genera():
+    """Genera el mapa de bits por defecto, hasta el límite indicado"""
+    exponente = utils.input_int("Límite 2^e; e (16-36, por defecto 32)", range(16, 37), 32)
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    global _mapa
+    if mapa():
+        mapa().cierra()
+    _mapa = None  # si la generación falla, se volverá a abrir el archivo anterior (que se conserva)
+    t = time.perf_counter()
+    limite = genera_mapa(2 ** exponente, ARCHIVO_MAPA, procesos)
+    print(f"Mapa hasta {limite} generado en {time.perf_counter() - t:.1f} s ({os.path.getsize(ARCHIVO_MAPA)} bytes).")
+
+def menu_consulta():
+    """Consulta un número en el mapa de bits por defecto"""
+    if not mapa():
+        print("No existe el mapa; hay que generarlo primero.")
+        return
+    n = utils.input_int(f"Número (0-{mapa().limite - 1})", range(mapa().limite), 0)
+    print(f"{n} {'ES' if mapa().es_primo(n) else 'NO ES'} primo.")
+    print(f"Siguiente primo: {mapa().siguiente_primo(n)}")
+    print(f"Primos menores o iguales que {n}: {mapa().pi(n)}")
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Generar mapa de bits", menu_genera),
+    ("Consultar un número", menu_consulta)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    # Bucle principal:
+    utils.menu(opciones_menu)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+
+# Auditoría de módulos RSA que comparten un primo, mediante el mcd por lotes de Bernstein (árbol de productos y árbol de
+# restos). Para cada módulo n_i, se calcula mcd(n_i, P / n_i), siendo P el producto de todos los módulos: si es mayor
+# que 1, n_i comparte un factor con algún otro módulo (y queda factorizado). Comparar los N módulos dos a dos requiere
+# N^2 / 2 mcd; con los árboles, el coste es casi lineal.
+#
+# Para limitar la memoria, los módulos se procesan por trozos: de cada trozo solo se guarda el producto, y luego, para
+# cada trozo, se reduce el producto de todos los trozos módulo el cuadrado del suyo y se baja por su árbol de restos.
+#
+# Se puede usar con el menú habitual, o sin interacción, desde la línea de comandos:
+#     mcd_lotes.py ARCHIVO [-p PROCESOS] [-t TAM_TROZO]
+# El archivo contiene un módulo por línea, en decimal o en hexadecimal (con el prefijo 0x).
+
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import itertools
+import multiprocessing
+import utils
+import rsa
+
+# Variables globales ***************************************************************************************************
+
+# Módulos por trozo (cada trozo tiene su árbol de productos en memoria):
+TAM_TROZO = 4096
+
+# Número mínimo de nodos de un nivel de los árboles para repartirlo entre los procesos (si no, no compensa enviarlos):
+MIN_PARALELO = 8
+
+# La división de enteros de Python es cuadrática, mientras que la multiplicación usa Karatsuba. A partir de estos bits
+# del módulo, los restos se calculan con multiplicaciones (ver _modulo()): sin inverso precalculado, y con él:
+MIN_BARRETT = 2 ** 17
+MIN_BARRETT_PRECALCULADO = 2 ** 15
+
+# Bits de precisión del inverso a partir de los cuales se calcula por el método de Newton (ver _reciproco()):
+MIN_NEWTON = 2000
+
+# Funciones auxiliares *************************************************************************************************
+
+def _reciproco(m, n):
+    """Calcula aproximadamente 2^(b+n) / m, siendo b los bits de m, mediante el método de Newton
+
+    Se calcula el inverso con la mitad de precisión (recursivamente) y se aplica una iteración de Newton, que dobla la
+    precisión: y' = y + y * (2^(b+n) - m*y) / 2^(b+n). Solo influyen los n bits más altos de m (más unos de guarda).
+
+    :param m: entero positivo
+    :param n: bits de precisión
+    :return: el inverso (entero), con un error de pocas unidades
+    """
+    desplaza = max(0, m.bit_length() - n - 32)
+    m >>= desplaza
+    b = m.bit_length()
+    if n <= MIN_NEWTON:
+        return (1 << (b + n)) // m
+    h = n // 2 + 16
+    y = _reciproco(m, h) << (n - h)
+    return y + ((y * ((1 << (b + n)) - m * y)) >> (b + n))
+
+def _modulo(x, m, reciproco=None):
+    """Calcula x mod m; con módulos grandes, con multiplicaciones en lugar de divisiones (reducción de Barrett)
+
+    El cociente se aproxima como x * (2^(b+n) / m) / 2^(b+n), y se corrige con unas pocas sumas o restas.
+
+    :param x: entero no negativo
+    :param m: módulo
+    :param reciproco: tupla (inverso, n) con el inverso de m precalculado con _reciproco(m, n), o None
+    :return: x mod m
+    """
+    b = m.bit_length()
+    n = x.bit_length() - b + 1
+    if n <= 0:
+        return x
+    if b < (MIN_BARRETT if reciproco is None else MIN_BARRETT_PRECALCULADO):
+        return x % m
+    if reciproco is None or reciproco[1] < n:
+        reciproco = (_reciproco(m, n), n)
+    y, n = reciproco
+    x -= ((x >> (b - 1)) * y >> (n + 1)) * m
+    while x < 0:
+        x += m
+    while x >= m:
+        x -= m
+    return x
+
+def _multiplica(par):
+    """Multiplica dos nodos de un nivel del árbol de productos (función ejecutada por los procesos del pool)
+
+    :param par: tupla (a, b)
+    :return: a * b
+    """
+    return par[0] * par[1]
+
+def _reduce(par):
+    """Reduce el resto del nodo padre módulo el cuadrado de un nodo (función ejecutada por los procesos del pool)
+
+    :param par: tupla (resto del padre, valor del nodo)
+    :return: resto módulo el cuadrado del nodo
+    """
+    return _modulo(par[0], par[1] * par[1])
+
+def _mapea(funcion, elementos, pool):
+    """Aplica una función a los elementos de un nivel de un árbol, repartiéndolos entre los procesos si son bastantes
+
+    :param funcion: función a aplicar (a nivel de módulo)
+    :param elementos: lista de elementos
+    :param pool: pool de procesos, o None
+    :return: lista de resultados, en orden
+    """
+    if pool is None or len(elementos) < MIN_PARALELO:
+        return list(map(funcion, elementos))
+    return pool.map(funcion, elementos)
+
+def arbol_productos(valores, pool=None):
+    """Calcula el árbol de productos de una lista de enteros
+
+    :param valores: lista de enteros (hojas)
+    :param pool: pool de procesos entre los que repartir cada nivel, o None
+    :return: lista de niveles, desde las hojas hasta la raíz (el producto de todos, en una lista de un elemento)
+    """
+    niveles = [list(valores)]
+    while len(niveles[-1]) > 1:
+        nivel = niveles[-1]
+        siguiente = _mapea(_multiplica, list(zip(nivel[::2], nivel[1::2])), pool)
+        if len(nivel) & 1:  # el último nodo sin pareja sube tal cual
+            siguiente.append(nivel[-1])
+        niveles.append(siguiente)
+    return niveles
+
+def arbol_restos(entero, niveles, pool=None):
+    """Reduce un entero módulo el cuadrado de cada hoja, bajando por el árbol de productos (árbol de restos)
+
+    Cada nodo recibe el resto de su padre, y lo reduce módulo su propio cuadrado; como cada nodo divide a su padre, el
+    resultado en las hojas es el entero módulo el cuadrado de cada hoja.
+
+    :param entero: entero a reducir
+    :param niveles: árbol de productos (ver arbol_productos())
+    :param pool: pool de procesos entre los que repartir cada nivel, o None
+    :return: lista de restos, uno por hoja
+    """
+    restos = [_modulo(entero, niveles[-1][0] ** 2)]
+    for nivel in reversed(niveles[:-1]):
+        restos = _mapea(_reduce, [(restos[i // 2], valor) for i, valor in enumerate(nivel)], pool)
+    return restos
+
+def _mcds_trozos(trozos, pool=None):
+    """Calcula, para cada módulo, el mcd con el producto de todos los demás módulos (de todos los trozos)
+
+    :param trozos: función sin argumentos que retorna un iterable de trozos (listas de módulos); se llama dos veces
+    :param pool: pool de procesos entre los que repartir los niveles de los árboles, o None
+    :return: generador de listas de mcd, una por trozo
+    """
+    # Primera pasada: solo guardamos el producto de cada trozo:
+    productos = [arbol_productos(trozo, pool)[-1][0] for trozo in trozos()]
+    # Segunda pasada: para cada trozo, P mod (producto del trozo)^2, y de ahí P mod n^2 para cada módulo n del trozo:
+    for trozo in trozos():
+        niveles = arbol_productos(trozo, pool)
+        cuadrado = niveles[-1][0] ** 2
+        reciproco = (_reciproco(cuadrado, cuadrado.bit_length() + 1), cuadrado.bit_length() + 1)
+        total = 1
+        for producto in productos:
+            total = _modulo(total * _modulo(producto, cuadrado, reciproco), cuadrado, reciproco)
+        restos = arbol_restos(total, niveles, pool)
+        # P mod n^2 = n * ((P/n) mod n), con lo que mcd(n, P/n) = mcd(n, (P mod n^2) / n):
+        yield [math.gcd(n, r // n) for n, r in zip(trozo, restos)]
+
+def _resuelve(sospechosos):
+    """Busca un factor propio de los módulos cuyo mcd es el propio módulo (sus dos primos están en otros módulos, o
+    está repetido), comparándolos dos a dos (son muy pocos)
+
+    :param sospechosos: lista de tuplas (índice, módulo, mcd)
+    :return: lista de tuplas (índice, módulo, factor); el factor es el propio módulo si está repetido
+    """
+    resul = []
+    for indice, n, g in sospechosos:
+        if g == n:
+            for _, m, _ in sospechosos:
+                factor = math.gcd(n, m)
+                if 1 < factor < n:
+                    g = factor
+                    break
+        resul.append((indice, n, g))
+    return resul
+
+def audita(modulos, tam_trozo=TAM_TROZO, procesos=1):
+    """Busca los módulos que comparten algún factor con otro
+
+    :param modulos: lista de módulos (int)
+    :param tam_trozo: módulos por trozo
+    :param procesos: número de procesos entre los que repartir los niveles de los árboles
+    :return: lista de tuplas (índice, módulo, factor) de los módulos con factores comunes
+    """
+    def trozos():
+        return (modulos[i:i + tam_trozo] for i in range(0, len(modulos), tam_trozo))
+    return _audita(trozos, procesos)
+
+def lee_modulos(ruta, tam_trozo=TAM_TROZO):
+    """Lee un archivo de módulos por trozos (un módulo por línea, en decimal o hexadecimal con prefijo 0x)
+
+    :param ruta: ruta del archivo
+    :param tam_trozo: módulos por trozo
+    :return: generador de listas de módulos
+    """
+    with open(ruta, "rt") as f:
+        modulos = (int(linea, 0) for linea in f if linea.strip())
+        while trozo := list(itertools.islice(modulos, tam_trozo)):
+            yield trozo
+
+def audita_archivo(ruta, tam_trozo=TAM_TROZO, procesos=1):
+    """Busca los módulos de un archivo que comparten algún factor con otro, leyéndolo por trozos
+
+    La memoria usada es la del producto de cada trozo (en total, aproximadamente el tamaño de todos los módulos) más el
+    árbol de productos de un solo trozo.
+
+    :param ruta: ruta del archivo (ver lee_modulos())
+    :param tam_trozo: módulos por trozo
+    :param procesos: número de procesos entre los que repartir los niveles de los árboles
+    :return: lista de tuplas (índice, módulo, factor) de los módulos con factores comunes (índice desde 0, sin contar
+        las líneas vacías)
+    """
+    return _audita(lambda: lee_modulos(ruta, tam_trozo), procesos)
+
+def _audita(trozos, procesos):
+    """Busca los módulos que comparten algún factor con otro (ver audita() y audita_archivo())
+
+    :param trozos: función sin argumentos que retorna un iterable de trozos de módulos
+    :param procesos: número de procesos
+    :return: lista de tuplas (índice, módulo, factor)
+    """
+    pool = multiprocessing.Pool(procesos) if procesos > 1 else None
+    try:
+        sospechosos = []
+        indices = itertools.count()
+        for trozo, mcds in zip(trozos(), _mcds_trozos(trozos, pool)):
+            for n, g in zip(trozo, mcds):
+                indice = next(indices)
+                if g != 1:
+                    sospechosos.append((indice, n, g))
+    finally:
+        if pool:
+            pool.terminate()
+    return _resuelve(sospechosos)
+
+def genera_prueba(ruta, cantidad, nbits=256, compartidos=3):
+    """Genera un archivo de módulos RSA de prueba, algunos de ellos con un primo compartido
+
+    :param ruta: ruta del archivo
+    :param cantidad: número de módulos
+    :param nbits: bits de cada primo
+    :param compartidos: número de pares de módulos que comparten un primo
+    :return: lista ordenada de índices de los módulos afectados
+    """
+    lista = rsa.primos_rsa(nbits, 2 * cantidad)
+    modulos = [p * q for p, q in zip(lista[::2], lista[1::2])]
+    afectados = random.sample(range(cantidad), 2 * compartidos)
+    for i, j in zip(afectados[::2], afectados[1::2]):
+        # El módulo j pasa a usar el primer primo del módulo i:
+        modulos[j] = lista[2 * i] * rsa.rnd_primo(nbits)
+    with open(ruta, "wt") as f:
+        for n in modulos:
+            f.write(f"{n:#x}\n")
+    return sorted(afectados)
+
+def _muestra(resul):
+    """Imprime los módulos con factores comunes
+
+    :param resul: lista de tuplas (índice, módulo, factor)
+    """
+    for indice, n, factor in resul:
+        if factor == n:
+            print(f"Módulo {indice}: repetido")
+        else:
+            print(f"Módulo {indice}: factor común {factor:#x}")
+    print(f"{len(resul)} módulos con factores comunes.")
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_audita():
+    """Audita un archivo de módulos"""
+    ruta = input("Archivo de módulos: ")
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    inicio = time.perf_counter()
+    try:
+        resul = audita_archivo(ruta, TAM_TROZO, procesos)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        return
+    _muestra(resul)
+    print(f"Tiempo: {time.perf_counter() - inicio:.1f} s")
+
+def menu_benchmark():
+    """Genera un archivo de prueba, lo audita, y compara el tiempo con el de comparar los módulos dos a dos"""
+    cantidad = utils.input_int("Número de módulos (10-100000, por defecto 2000)", range(10, 100001), 2000)
+    tam_trozo = utils.input_int(f"Módulos por trozo (por defecto {TAM_TROZO})", range(2, 10 ** 6), TAM_TROZO)
+    ruta = "datos/modulos_prueba.txt"
+    afectados = genera_prueba(ruta, cantidad)
+    inicio = time.perf_counter()
+    resul = audita_archivo(ruta, tam_trozo)
+    t = time.perf_counter() - inicio
+    assert [indice for indice, _, _ in resul] == afectados
+    _muestra(resul)
+    print(f"mcd por lotes: {t:.2f} s")
+    if cantidad <= 5000:  # con más, comparar dos a dos tarda demasiado
+        modulos = [n for trozo in lee_modulos(ruta) for n in trozo]
+        inicio = time.perf_counter()
+        dos_a_dos = set()
+        for i, j in itertools.combinations(range(len(modulos)), 2):
+            if math.gcd(modulos[i], modulos[j]) != 1:
+                dos_a_dos |= {i, j}
+        t = time.perf_counter() - inicio
+        assert sorted(dos_a_dos) == afectados
+        print(f"Dos a dos: {t:.2f} s")
+    os.remove(ruta)
+
+# Línea de comandos ****************************************************************************************************
+
+def main(argumentos):
+    """Audita un archivo de módulos sin interacción, según los argumentos de la línea de comandos
+
+    :param argumentos: lista de argumentos (sin el nombre del script)
+    :return: código de salida (0 si no hay módulos con factores comunes, 1 si los hay)
+    """
+    parser = argparse.ArgumentParser(prog="mcd_lotes.py", description="Busca módulos RSA con factores comunes")
+    parser.add_argument("archivo", help="archivo con un módulo por línea (decimal, o hexadecimal con 0x)")
+    parser.add_argument("-p", "--procesos", type=int, default=multiprocessing.cpu_count(),
+                        help="número de procesos (por defecto, uno por CPU)")
+    parser.add_argument("-t", "--tam-trozo", type=int, default=TAM_TROZO,
+                        help=f"módulos por trozo (por defecto {TAM_TROZO})")
+    args = parser.parse_args(argumentos)
+    resul = audita_archivo(args.archivo, args.tam_trozo, args.procesos)
+    _muestra(resul)
+    return 1 if resul else 0
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Auditar archivo de módulos", menu_audita),
+    ("Medir con un archivo de prueba", menu_benchmark)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    if len(sys.argv) > 1:
+        # Con argumentos, sin interacción:
+        sys.exit(main(sys.argv[1:]))
+    # Bucle principal:
+    utils.menu(opciones_menu)
@@ -2,10 +2,55 @@
 
 # Utilidades relacionadas con el cálculo de números primos.
 
+import os
 import random
 import math
 import json
+import time
+import itertools
+import multiprocessing
 import utils
+import teoria_numeros
+import mapa_primos
+
+# Variables globales ***************************************************************************************************
+
+# Archivo con los primeros primos, y cuántos se generan si no existe:
+ARCHIVO_PRIMOS = "datos/primos.json"
+N_PRIMOS = 500
+
+# Tabla de primos pequeños, cargada la primera vez que se necesita (ver primos_pequenos()): lista ordenada, conjunto
+# (para comprobar pertenencia) y producto de todos ellos (primorial, para la división por tentativa con un solo mcd):
+_tabla = None
+
+# Números impares que abarca cada segmento de la criba (un byte por número, con lo que es también la memoria usada por
+# cada segmento):
+TAM_SEGMENTO = 2 ** 20
+
+# Primos impares usados para cribar los segmentos (los de la criba simple hasta _limite_base), calculados y ampliados
+# según se necesitan:
+_base = []
+_limite_base = 0
+
+# Impares que abarca cada ventana de la búsqueda incremental de primos (ver busca_primo()):
+TAM_VENTANA = 4096
+
+# Bases de Miller-Rabin con las que el resultado es exacto para n < límite (Jaeschke; Zhang y Tang; Sorenson y
+# Webster): lista de tuplas (límite, bases), ordenada por límite:
+BASES_DETERMINISTAS = (
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (9080191, (31, 73)),
+    (25326001, (2, 3, 5)),
+    (4759123141, (2, 7, 61)),
+    (1122004669633, (2, 13, 23, 1662803)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (318665857834031151167461, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+    (3317044064679887385961981, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41))
+)
 
 # Funciones auxiliares *************************************************************************************************
 
@@ -18,76 +63,424 @@ def es_primo(n):
     """
     if n < 2:
         return False
-    sq = int(math.sqrt(n)) + 1
+    sq = math.isqrt(n) + 1
     for i in range(2, sq):
         if n % i == 0:
             return False
     return True
 
-def es_primo_mr(n, k):
+def primos_pequenos():
+    """Retorna la tabla de primos pequeños, leyéndola de ARCHIVO_PRIMOS solo la primera vez
+
+    Si el archivo no existe (o no es válido), se generan los N_PRIMOS primeros primos y se guardan en él. Se escriben
+    en un archivo temporal propio de cada proceso, que luego se renombra: los procesos de un pool pueden estar
+    generándolo a la vez, y ninguno llega a leer un archivo a medias. Si no se puede guardar, se sigue con la tabla en
+    memoria.
+
+    :return: tupla (lista de primos, conjunto de primos, producto de todos ellos)
     """
-    Comprueba si un número es primo o no (Miller-Rabin, no determinista)
+    global _tabla
+    if _tabla is None:
+        try:
+            with open(ARCHIVO_PRIMOS, "rt") as f:
+                primos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            primos = primeros_primos(N_PRIMOS)
+            temporal = f"{ARCHIVO_PRIMOS}.{os.getpid()}.tmp"
+            try:
+                with open(temporal, "wt") as f:
+                    json.dump(primos, f, indent=4)
+                os.replace(temporal, ARCHIVO_PRIMOS)
+            except OSError:
+                if os.path.exists(temporal):
+                    os.remove(temporal)
+        _tabla = (primos, set(primos), math.prod(primos))
+    return _tabla
+
+def _filtro_pequenos(n):
+    """Decide la primalidad de n si es pequeño o tiene algún factor pequeño
+
+    Descarta que sea < 2, o uno de los primeros primos, o divisible por uno de estos (tabla de primos pequeños). Para lo
+    último basta un solo mcd con su producto. Si hay mapa de bits de primos y n está dentro, la respuesta es inmediata.
 
     :param n: El número entero a comprobar
-    :param k: El número máximo de iteraciones
-    :return: True si es primo (probablemente), False si no (seguro)
+    :return: True si es primo, False si no (exacto), o None si no se ha podido decidir
     """
-
-    # Un pequeño filtro para empezar. Primero descartaremos que sea < 2, o uno de los primeros primos,
-    # o divisible por uno de estos (leemos archivo json generado):
     if n < 2:
         return False
-    with open("datos/primos.json", "rt") as f:
-        primos = json.load(f)
-    if n in primos:
+    # Si hay mapa de bits de primos y n está dentro, la respuesta es inmediata (y exacta):
+    mapa = mapa_primos.mapa()
+    if mapa and n < mapa.limite:
+        return mapa.es_primo(n)
+    primos, conjunto, primorial = primos_pequenos()
+    if n <= primos[-1]:  # la tabla contiene todos los primos hasta el último
+        return n in conjunto
+    if math.gcd(n, primorial) != 1:
+        return False
+    return None
+
+def _prueba_fuerte(n, a, d, s):
+    """Comprueba si n es un probable primo fuerte en base a (una iteración de Miller-Rabin)
+
+    :param n: entero impar a comprobar
+    :param a: base
+    :param d: entero impar tal que n-1 = d*2^s
+    :param s: exponente de 2 en n-1
+    :return: True si es probable primo en base a, False si es compuesto (seguro)
+    """
+    # Obtenemos el primero de los valores: a^d (mod n):
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:  # 1 (mod n), o -1 (mod n)
         return True
-    for primo in primos:
-        if n % primo == 0:
+    for _ in range(s - 1):
+        x = x * x % n  # elevamos x al cuadrado
+        if x == n - 1:  # -1 (mod n)
+            return True
+        if x == 1:  # llegamos a 1 sin haber pasado por -1: número compuesto
+            return False
+    # Si no hay -1 para ninguna r con esta base, es compuesto:
+    return False
+
+def _descompone(n):
+    """Calcula s y d, tal que n-1 = d*2^s (con n impar, d será impar)
+
+    :param n: entero impar
+    :return: tupla (d, s)
+    """
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    return d >> s, s
+
+def _lucas_fuerte(n):
+    """Comprueba si n es un probable primo fuerte de Lucas, con los parámetros de Selfridge
+
+    Se busca el primer D de la serie 5, -7, 9, -11... con símbolo de Jacobi (D/n) = -1, y se usan P = 1 y
+    Q = (1 - D) / 4. Con n + 1 = d*2^s, n es probable primo si U_d ≡ 0 (mod n), o V_(d*2^r) ≡ 0 (mod n) para algún
+    0 <= r < s. Las sucesiones U y V se calculan recorriendo los bits de d (duplicando el índice, y sumando 1).
+
+    :param n: entero impar, que no sea un cuadrado perfecto (si no, no hay ningún D válido) ni tenga factores pequeños
+    :return: True si es probable primo, False si es compuesto (seguro)
+    """
+    D = 5
+    while True:
+        j = teoria_numeros.jacobi(D, n)
+        if j == -1:
+            break
+        if j == 0 and abs(D) != n:  # D y n tienen un factor común
             return False
+        D = -D - 2 if D > 0 else -D + 2
+    Q = (1 - D) // 4
+    d = n + 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    # Empezamos por el índice k = 1 (U_1 = 1, V_1 = P = 1, Q^1); el primer bit de d ya está contado:
+    U, V, Qk = 1, 1, Q % n
+    for bit in bin(d)[3:]:
+        # Índice 2k: U_2k = U_k * V_k, V_2k = V_k^2 - 2Q^k:
+        U = U * V % n
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if bit == "1":
+            # Índice k+1: U_(k+1) = (P*U_k + V_k) / 2, V_(k+1) = (D*U_k + P*V_k) / 2 (dividir entre 2 módulo n
+            # es sumar n si es impar, y desplazar):
+            U, V = (U + V) % n, (D * U + V) % n
+            U = (U + n if U & 1 else U) >> 1
+            V = (V + n if V & 1 else V) >> 1
+            Qk = Qk * Q % n
+    if U == 0 or V == 0:
+        return True
+    for _ in range(s - 1):
+        V = (V * V - 2 * Qk) % n
+        Qk = Qk * Qk % n
+        if V == 0:
+            return True
+    return False
+
+def es_primo_mr(n, k):
+    """
+    Comprueba si un número es primo o no (Miller-Rabin)
+
+    Por debajo de BASES_DETERMINISTAS[-1][0] (unos 3.3e24) se usan bases fijas, con las que el resultado es exacto y
+    k no se tiene en cuenta. Por encima, se usan k bases aleatorias (no determinista).
+
+    :param n: El número entero a comprobar
+    :param k: El número máximo de iteraciones
+    :return: True si es primo (probablemente), False si no (seguro)
+    """
+    resul = _filtro_pequenos(n)
+    if resul is not None:
+        return resul
     # Descartado esto, empecemos.
-    # Calculamos s y d, tal que n-1 = d*2^s (n es impar, d será impar)
-    d = (n - 1) // 2
-    s = 1
-    while d % 2 == 0:
-        d //= 2
-        s +=1
-    # Empezamos las k interacciones:
-    for _ in range(k):
-        # Primero elegimos una base al azar, entre 2 y n-2:
-        a = random.randint(2, n - 2)
-        # Obtenemos el primero de los valores: a^d (mod n):
-        x = pow(a, d, n)
-        if x == 1 or x == n - 1:  # 1 (mod n), o -1 (mod n)
-            continue  # probable primo, procesamos otra base
-        probable_primo = False
-        for _ in range(s):  # s veces
-            x = pow(x, 2, n)  # elevamos x al cuadrado
-            if x == 1:  # llegamos a 1 sin haber pasado por -1: número compuesto
-                return False
-            if x == n - 1:  # -1 (mod n)
-                probable_primo = True
-                break
-        if not probable_primo:  # si no hay -1 para ninguna r con esta base, es compuesto:
+    d, s = _descompone(n)
+    if n < BASES_DETERMINISTAS[-1][0]:
+        # Primer conjunto de bases fijas válido para n:
+        bases = next(bases for limite, bases in BASES_DETERMINISTAS if n < limite)
+    else:
+        # k bases al azar, entre 2 y n-2:
+        bases = (random.randint(2, n - 2) for _ in range(k))
+    for a in bases:
+        if a % n and not _prueba_fuerte(n, a, d, s):
             return False
     # Si tras todas las iteraciones no lo hemos podido descartar, es que probablemente sea primo:
     return True
 
+def es_primo_bpsw(n, k=0):
+    """
+    Comprueba si un número es primo o no (Baillie-PSW)
+
+    Una prueba fuerte en base 2 y una prueba fuerte de Lucas: no se conoce ningún compuesto que pase las dos (y está
+    comprobado que no lo hay por debajo de 2^64). Cuesta aproximadamente lo mismo que 3 iteraciones de Miller-Rabin, y
+    los compuestos casi siempre se descartan con la primera (una sola exponenciación).
+
+    :param n: El número entero a comprobar
+    :param k: Número de iteraciones Miller-Rabin adicionales, con bases aleatorias (por defecto ninguna)
+    :return: True si es primo (probablemente), False si no (seguro)
+    """
+    resul = _filtro_pequenos(n)
+    if resul is not None:
+        return resul
+    return _bpsw(n, k)
+
+def _bpsw(n, k):
+    """Prueba Baillie-PSW (ver es_primo_bpsw()), sin el filtro de números pequeños
+
+    :param n: entero impar, sin factores pequeños
+    :param k: número de iteraciones Miller-Rabin adicionales
+    :return: True si es primo (probablemente), False si no (seguro)
+    """
+    d, s = _descompone(n)
+    if not _prueba_fuerte(n, 2, d, s):
+        return False
+    r = math.isqrt(n)
+    if r * r == n or not _lucas_fuerte(n):
+        return False
+    return all(_prueba_fuerte(n, random.randint(2, n - 2), d, s) for _ in range(k))
+
+# Criba de Eratóstenes segmentada **************************************************************************************
+
+def _criba_simple(limite):
+    """Retorna los primos impares menores que limite, con una criba de Eratóstenes de solo impares
+
+    :param limite: límite superior (no incluido)
+    :return: lista de primos impares
+    """
+    # El índice i representa el número impar 2i+1:
+    marcas = bytearray(b"\x01") * (limite // 2)
+    if marcas:
+        marcas[0] = 0  # el 1 no es primo
+    for i in range(1, (math.isqrt(max(limite - 1, 0)) + 1) // 2):
+        if marcas[i]:
+            p = 2 * i + 1
+            # Tachamos los múltiplos impares de p desde p^2 (índice p^2 // 2), de p en p índices (de 2p en 2p):
+            marcas[p * p // 2::p] = bytes(len(range(p * p // 2, len(marcas), p)))
+    return list(itertools.compress(range(1, limite, 2), marcas))
+
+def _primos_base(limite):
+    """Retorna los primos impares hasta (al menos) limite, ampliando la lista _base si es necesario
+
+    :param limite: límite superior
+    :return: lista de primos impares (puede contener primos mayores que limite)
+    """
+    global _base, _limite_base
+    if limite > _limite_base:
+        _limite_base = max(limite, 2 * _limite_base)
+        _base = _criba_simple(_limite_base)
+    return _base
+
+def criba_segmento(tramo):
+    """Criba los números impares de un tramo [inicio, fin)
+
+    :param tramo: tupla (inicio, fin)
+    :return: tupla (primer impar del tramo, bytearray con un 1 por cada impar primo, a partir de ese)
+    """
+    inicio, fin = tramo
+    primero = inicio | 1
+    n = max((fin - primero + 1) // 2, 0)
+    marcas = bytearray(b"\x01") * n
+    for p in _primos_base(math.isqrt(max(fin - 1, 0)) + 1):
+        if p * p >= fin:
+            break
+        # Primer múltiplo impar de p en el tramo (como mínimo p^2, ya que los anteriores los tachan primos menores):
+        multiplo = max(p * p, (primero + p - 1) // p * p)
+        if not multiplo & 1:
+            multiplo += p
+        i = (multiplo - primero) // 2
+        if i < n:
+            marcas[i::p] = bytes((n - 1 - i) // p + 1)
+    if primero == 1 and n:
+        marcas[0] = 0  # el 1 no es primo
+    return primero, marcas
+
+def _primos_segmento(tramo):
+    """Retorna los primos de un tramo [inicio, fin)
+
+    :param tramo: tupla (inicio, fin)
+    :return: lista de primos
+    """
+    primero, marcas = criba_segmento(tramo)
+    primos = list(itertools.compress(range(primero, tramo[1], 2), marcas))
+    if tramo[0] <= 2 < tramo[1]:
+        primos.insert(0, 2)
+    return primos
+
+def _cuenta_segmento(tramo):
+    """Retorna la cantidad de primos de un tramo [inicio, fin)
+
+    :param tramo: tupla (inicio, fin)
+    :return: número de primos (int)
+    """
+    return criba_segmento(tramo)[1].count(1) + (tramo[0] <= 2 < tramo[1])
+
+def divide_tramos(inicio, fin):
+    """Divide el intervalo [inicio, fin) en los tramos de los segmentos de la criba
+
+    :param inicio: inicio del intervalo
+    :param fin: fin del intervalo (no incluido), o None para no acabar nunca
+    :return: generador de tuplas (inicio, fin)
+    """
+    inicio = max(inicio, 0)
+    while fin is None or inicio < fin:
+        siguiente = inicio + 2 * TAM_SEGMENTO
+        yield inicio, siguiente if fin is None else min(siguiente, fin)
+        inicio = siguiente
+
+def itera_primos(inicio=2, fin=None, procesos=1):
+    """Generador de los primos del intervalo [inicio, fin), en orden, mediante una criba de Eratóstenes segmentada
+
+    Solo se criban los números impares, por segmentos de TAM_SEGMENTO (un byte por número), con lo que la memoria es
+    constante aunque el intervalo sea enorme (p.e. hasta 10^10), o infinito.
+
+    :param inicio: inicio del intervalo
+    :param fin: fin del intervalo (no incluido), o None para no acabar nunca
+    :param procesos: número de procesos entre los que repartir los segmentos
+    :return: generador de primos (int)
+    """
+    for primos in utils.procesa_ordenado(_primos_segmento, divide_tramos(inicio, fin), procesos):
+        yield from primos
+
+def primos_rango(inicio, fin, procesos=1):
+    """Retorna los primos del intervalo [inicio, fin) (ver itera_primos())
+
+    :param inicio: inicio del intervalo
+    :param fin: fin del intervalo (no incluido)
+    :param procesos: número de procesos entre los que repartir los segmentos
+    :return: lista de primos
+    """
+    return list(itera_primos(inicio, fin, procesos))
+
+def primeros_primos(n, procesos=1):
+    """Retorna los n primeros números primos (ver itera_primos())
+
+    :param n: cuántos primos generar
+    :param procesos: número de procesos entre los que repartir los segmentos
+    :return: lista con los primos
+    """
+    return list(itertools.islice(itera_primos(procesos=procesos), n))
+
+def cuenta_primos(inicio, fin, procesos=1):
+    """Retorna cuántos primos hay en el intervalo [inicio, fin), sin guardarlos (ver itera_primos())
+
+    :param inicio: inicio del intervalo
+    :param fin: fin del intervalo (no incluido)
+    :param procesos: número de procesos entre los que repartir los segmentos
+    :return: número de primos (int)
+    """
+    return sum(utils.procesa_ordenado(_cuenta_segmento, divide_tramos(inicio, fin), procesos))
+
+# Búsqueda incremental de primos ***************************************************************************************
+
+def _limite_criba(n):
+    """Retorna el límite de los primos con los que cribar las ventanas de candidatos cercanos a n
+
+    Cuantos más primos, menos candidatos sobreviven, pero más cuesta cribar cada ventana. Como el coste de cada prueba
+    de primalidad crece aproximadamente con el cubo de los bits, y el de la criba solo con el límite, usamos un límite
+    proporcional al cuadrado de los bits (2^16 para 512 bits, 2^18 para 1024, 2^20 para 2048).
+
+    :param n: entero
+    :return: límite
+    """
+    return max(2 ** 12, n.bit_length() ** 2 // 4)
+
+def _supervivientes(inicio, limite):
+    """Generador de los impares a partir de inicio que no son divisibles por ningún primo impar menor que limite
+
+    Se criban ventanas de TAM_VENTANA impares consecutivos. Para cada primo p se guarda el índice de su primer múltiplo
+    en la ventana; los restos se calculan una sola vez, y al pasar a la siguiente ventana basta con restar su tamaño
+    (módulo p).
+
+    :param inicio: primer impar (mayor que limite)
+    :param limite: límite de los primos con los que cribar
+    :return: generador de enteros
+    """
+    primos = list(itertools.takewhile(lambda p: p < limite, _primos_base(limite)))
+    # El impar inicio + 2i es múltiplo de p si i ≡ -inicio/2 (mod p) (el inverso de 2 módulo p es (p+1)/2):
+    indices = [-inicio * ((p + 1) >> 1) % p for p in primos]
+    while True:
+        marcas = bytearray(b"\x01") * TAM_VENTANA
+        for j, p in enumerate(primos):
+            i = indices[j]
+            if i < TAM_VENTANA:
+                marcas[i::p] = bytes((TAM_VENTANA - 1 - i) // p + 1)
+            indices[j] = (i - TAM_VENTANA) % p
+        for i in itertools.compress(range(TAM_VENTANA), marcas):
+            yield inicio + 2 * i
+        inicio += 2 * TAM_VENTANA
+
+def busca_primo(inicio, fin=None, k=0):
+    """Retorna el menor primo (probable) mayor o igual que inicio, y menor que fin
+
+    En lugar de comprobar cada impar por separado, se criban ventanas de impares con los primos pequeños (ver
+    _supervivientes()), y solo los que sobreviven pasan la prueba Baillie-PSW. Partiendo de un impar aleatorio, sirve
+    para generar primos aleatorios (aunque no todos con la misma probabilidad: la de cada primo es proporcional a la
+    distancia al primo anterior).
+
+    :param inicio: entero a partir del cual buscar
+    :param fin: límite superior (no incluido), o None para no limitar la búsqueda
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba Baillie-PSW
+    :return: el primo, o None si no hay ninguno en el intervalo
+    """
+    limite = _limite_criba(inicio)
+    if inicio <= limite:
+        # Números pequeños: la criba los descartaría por ser uno de los primos de la criba
+        n = inicio
+        while fin is None or n < fin:
+            if es_primo_bpsw(n, k):
+                return n
+            n += 1
+            if n > limite:
+                return busca_primo(n, fin, k)
+        return None
+    for n in _supervivientes(inicio | 1, limite):
+        if fin is not None and n >= fin:
+            return None
+        if _bpsw(n, k):
+            return n
+
+def _primo_aleatorio(nbits):
+    """Retorna un primo aleatorio de nbits bits, probando impares aleatorios hasta dar con uno (para comparar con
+    busca_primo())
+
+    :param nbits: número de bits
+    :return: el primo
+    """
+    while True:
+        n = random.getrandbits(nbits) | 1 << (nbits - 1) | 1
+        if es_primo_bpsw(n):
+            return n
+
 # Funciones de las opciones de menú ************************************************************************************
 
 def menu_genera_json():
     """
     Genera los N primeros números primos, y los guarda en datos/primos.json
     """
+    global _tabla
     n = utils.input_int("¿Cuántos números primos quieres generar? (10-5000, por defecto 500)", range(10, 5001), 500)
-    primos = []
-    contador = 2
-    while len(primos) < n:
-        if es_primo(contador):
-            primos.append(contador)
-        contador += 1
+    primos = primeros_primos(n)
     # Ahora generaremos el JSON:
-    with open("datos/primos.json", "wt") as f:
+    with open(ARCHIVO_PRIMOS, "wt") as f:
         json.dump(primos, f, indent=4)
+    _tabla = None  # la próxima vez se leerá la tabla nueva
 
 def menu_comprobar_num():
     """
@@ -107,22 +500,68 @@ def menu_generar_num():
     """
     # Preguntar número de bits; 1º y último bit serán '1'
     nbits = utils.input_int("Número de bits (8-2048, por defecto 1024)", range(8, 2049), 1024)
-    ninter = utils.input_int("Número de iteraciones (1-100, por defecto 64)", range(1, 101), 64)
-    primo = False
-    while not primo:
+    ninter = utils.input_int("Iteraciones Miller-Rabin adicionales a BPSW (0-100, por defecto 0)", range(0, 101), 0)
+    primo = None
+    while primo is None:
         print(".", end="", flush=True)
-        nrand = random.randint(2 ** (nbits-1), 2 ** nbits - 1) | 1
-        primo = es_primo_mr(nrand, ninter)
+        primo = busca_primo(random.randint(2 ** (nbits-1), 2 ** nbits - 1), 2 ** nbits, ninter)
     print("\nNúmero primo:")
-    print(nrand)
-    print(f"{nbits} bits, {len(str(nrand))} cifras decimales.")
+    print(primo)
+    print(f"{nbits} bits, {len(str(primo))} cifras decimales.")
+
+def menu_cuenta_primos():
+    """
+    Cuenta los primos de un intervalo con la criba segmentada, repartiendo los segmentos entre varios procesos
+    """
+    inicio = utils.input_int("Inicio del intervalo (por defecto 0)", None, 0)
+    fin = utils.input_int("Fin del intervalo, no incluido (por defecto 10^9)", None, 10 ** 9)
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    t = time.perf_counter()
+    n = cuenta_primos(inicio, fin, procesos)
+    print(f"Hay {n} primos en [{inicio}, {fin}) ({time.perf_counter() - t:.1f} s).")
+
+def menu_benchmark():
+    """
+    Mide cuántos candidatos impares aleatorios por segundo comprueba es_primo_mr(), para varios tamaños, y cuánto
+    tarda en confirmar un primo es_primo_mr() frente a es_primo_bpsw()
+    """
+    ninter = utils.input_int("Número de iteraciones (1-100, por defecto 10)", range(1, 101), 10)
+    primos_pequenos()  # la carga de la tabla no cuenta
+    for nbits in (512, 1024, 2048, 4096):
+        candidatos = [random.getrandbits(nbits) | (1 << (nbits - 1)) | 1 for _ in range(200)]
+        inicio = time.perf_counter()
+        nprimos = sum(es_primo_mr(candidato, ninter) for candidato in candidatos)
+        t = time.perf_counter() - inicio
+        print(f"{nbits} bits: {len(candidatos) / t:.1f} candidatos/s ({nprimos} primos de {len(candidatos)})")
+    for nbits in (512, 1024, 2048):
+        primo = random.getrandbits(nbits) | (1 << (nbits - 1)) | 1
+        while not es_primo_bpsw(primo):
+            primo += 2
+        inicio = time.perf_counter()
+        es_primo_mr(primo, ninter)
+        t_mr = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        es_primo_bpsw(primo)
+        t_bpsw = time.perf_counter() - inicio
+        print(f"Primo de {nbits} bits: Miller-Rabin ({ninter} iter.) {t_mr * 1000:.1f} ms, BPSW {t_bpsw * 1000:.1f} ms")
+    # Generar primos de 1024 bits probando impares aleatorios, o buscando desde un impar aleatorio con busca_primo():
+    _primos_base(_limite_criba(2 ** 1023))  # el cálculo de los primos de la criba no cuenta
+    for nombre, genera in (("impares aleatorios", lambda: _primo_aleatorio(1024)),
+                           ("búsqueda con criba", lambda: busca_primo(random.getrandbits(1024) | 1 << 1023))):
+        inicio = time.perf_counter()
+        for _ in range(50):
+            genera()
+        print(f"Primo de 1024 bits, {nombre}: {(time.perf_counter() - inicio) * 1000 / 50:.0f} ms")
 
 # Menu *****************************************************************************************************************
 
 opciones_menu = (
     ("Generar primeros (JSON)", menu_genera_json),
     ("Comprobar un número", menu_comprobar_num),
-    ("Generar número primo", menu_generar_num)
+    ("Generar número primo", menu_generar_num),
+    ("Contar primos de un intervalo", menu_cuenta_primos),
+    ("Medir candidatos por segundo", menu_benchmark)
 )
 
 # Programa *************************************************************************************************************
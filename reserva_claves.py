@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+# Reserva de pares de claves RSA generados de antemano. Un pool de procesos mantiene, en segundo plano, un número
+# determinado de pares de claves listos para cada tamaño (bits de p y q); quien necesita un par lo toma de la reserva
+# al instante, y la reserva se vuelve a llenar sola.
+#
+# Las claves se guardan en disco (un archivo JSON por par, en un subdirectorio por tamaño), con lo que la reserva
+# sobrevive a los reinicios. Al tomar un par, se borra su archivo: un par nunca se entrega dos veces.
+
+import os
+import json
+import time
+import functools
+import threading
+import collections
+import multiprocessing
+import utils
+import rsa
+
+# Variables globales ***************************************************************************************************
+
+# Directorio por defecto de la reserva:
+DIRECTORIO_RESERVA = "datos/reserva_rsa"
+
+# Número de pares generados cuyo instante de llegada se guarda para calcular la tasa de relleno:
+VENTANA_TASA = 32
+
+# Número mínimo de bits de p y q (con menos, e = 65537 puede no ser menor que λ(n)):
+BITS_MINIMOS = 16
+
+# Fallos seguidos de un tamaño tras los que se deja de rellenar (hasta que toma() relance el error):
+MAX_FALLOS = 5
+
+# Reserva usada por el menú (se crea con menu_inicia()):
+_reserva = None
+
+# Funciones auxiliares *************************************************************************************************
+
+def _par_trabajador(nbits, k):
+    """Genera un par de claves en un proceso del pool (con números aleatorios del sistema operativo, ver
+    rsa.primos_rsa())
+
+    :param nbits: número de bits de p y q
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba de primalidad Baillie-PSW
+    :return: tupla (nbits, (n, e, d, p, q))
+    """
+    p, q = rsa.primos_rsa(nbits, 2, k)
+    return nbits, rsa.claves_rsa(p, q) + (p, q)
+
+# Clase ReservaClaves **************************************************************************************************
+
+class ReservaClaves:
+    """Reserva de pares de claves RSA, rellenada en segundo plano por un pool de procesos"""
+
+    def __init__(self, objetivos, directorio=DIRECTORIO_RESERVA, k=0, procesos=1):
+        """Carga los pares guardados en disco, y empieza a generar los que falten
+
+        :param objetivos: diccionario {bits de p y q: número de pares a mantener}
+        :param directorio: directorio donde se guardan los pares
+        :param k: número de iteraciones Miller-Rabin adicionales a la prueba de primalidad Baillie-PSW
+        :param procesos: número de procesos del pool
+        """
+        for nbits, cantidad in objetivos.items():
+            if not isinstance(nbits, int) or nbits < BITS_MINIMOS:
+                raise ValueError(f"Número de bits no válido: {nbits} (mínimo {BITS_MINIMOS})")
+            if not isinstance(cantidad, int) or cantidad < 1:
+                raise ValueError(f"Número de pares no válido para {nbits} bits: {cantidad}")
+        self.objetivos = dict(objetivos)
+        self.directorio = directorio
+        self.k = k
+        self._cerrojo = threading.Condition()
+        self._pares = {}  # nbits -> deque de tuplas (n, e, d, p, q)
+        self._en_curso = {}  # nbits -> pares encargados al pool y aún no recibidos
+        self._generados = {}  # nbits -> pares generados desde que se creó la reserva
+        self._servidos = {}  # nbits -> pares tomados
+        self._esperas = {}  # nbits -> veces que se ha tomado un par con la reserva vacía
+        self._llegadas = {}  # nbits -> deque con los instantes de llegada de los últimos VENTANA_TASA pares
+        self._cerrada = False
+        self._fallos = {}  # nbits -> fallos seguidos (se pone a 0 con cada par recibido)
+        self._errores = {}  # nbits -> última excepción, pendiente de relanzar en toma() (o None)
+        for nbits in self.objetivos:
+            self._pares[nbits] = collections.deque(self._carga(nbits))
+            self._en_curso[nbits] = self._generados[nbits] = self._servidos[nbits] = self._esperas[nbits] = 0
+            self._fallos[nbits] = 0
+            self._errores[nbits] = None
+            self._llegadas[nbits] = collections.deque(maxlen=VENTANA_TASA)
+        self._pool = multiprocessing.Pool(procesos)
+        with self._cerrojo:
+            for nbits in self.objetivos:
+                self._rellena(nbits)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cierra()
+
+    def cierra(self):
+        """Detiene el pool (los pares en curso se pierden; los guardados en disco se conservan)"""
+        with self._cerrojo:
+            self._cerrada = True  # a partir de ahora, _rellena() no encarga nada
+        self._pool.terminate()
+        self._pool.join()
+
+    def _ruta(self, nbits, n=None):
+        """Retorna la ruta del subdirectorio de un tamaño, o del archivo de un par
+
+        :param nbits: bits de p y q
+        :param n: orden del par (o None para el subdirectorio)
+        :return: ruta (string)
+        """
+        ruta = os.path.join(self.directorio, str(nbits))
+        return ruta if n is None else os.path.join(ruta, f"{n:x}"[:40] + ".json")
+
+    def _carga(self, nbits):
+        """Lee los pares de un tamaño guardados en disco, y borra los temporales que hayan quedado a medias
+
+        :param nbits: bits de p y q
+        :return: lista de tuplas (n, e, d, p, q), de la más antigua a la más reciente
+        """
+        os.makedirs(self._ruta(nbits), exist_ok=True)
+        for archivo in os.listdir(self._ruta(nbits)):
+            if archivo.endswith(".json.tmp"):
+                os.remove(os.path.join(self._ruta(nbits), archivo))
+        rutas = [os.path.join(self._ruta(nbits), archivo) for archivo in os.listdir(self._ruta(nbits))
+                 if archivo.endswith(".json")]
+        pares = []
+        for ruta in sorted(rutas, key=os.path.getmtime):
+            with open(ruta, "rt") as f:
+                par = json.load(f)
+            pares.append((par["n"], par["e"], par["d"], par["p"], par["q"]))
+        return pares
+
+    def _guarda(self, nbits, par):
+        """Guarda un par en disco (en un archivo temporal que luego se renombra, legible solo por el usuario)
+
+        :param nbits: bits de p y q
+        :param par: tupla (n, e, d, p, q)
+        """
+        ruta = self._ruta(nbits, par[0])
+        temporal = ruta + ".tmp"
+        with open(os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wt") as f:
+            json.dump(dict(zip(("n", "e", "d", "p", "q"), par)), f)
+        os.replace(temporal, ruta)
+
+    def _rellena(self, nbits):
+        """Encarga al pool los pares que faltan para llegar al objetivo (llamar con el cerrojo adquirido)
+
+        Tras MAX_FALLOS fallos seguidos no se encarga nada, hasta que toma() relance el error.
+
+        :param nbits: bits de p y q
+        """
+        if self._cerrada or self._fallos[nbits] >= MAX_FALLOS:
+            return
+        faltan = self.objetivos[nbits] - len(self._pares[nbits]) - self._en_curso[nbits]
+        for _ in range(faltan):
+            self._pool.apply_async(_par_trabajador, (nbits, self.k), callback=self._recibe,
+                                   error_callback=functools.partial(self._falla, nbits))
+            self._en_curso[nbits] += 1
+
+    def _recibe(self, resultado):
+        """Recibe un par generado por el pool (se ejecuta en un hilo del pool)
+
+        :param resultado: tupla (nbits, (n, e, d, p, q))
+        """
+        nbits, par = resultado
+        try:
+            self._guarda(nbits, par)
+        except OSError as excepcion:
+            # El par se descarta (no se puede entregar si no está en disco), y se encarga otro:
+            self._falla(nbits, excepcion)
+            return
+        with self._cerrojo:
+            self._pares[nbits].append(par)
+            self._en_curso[nbits] -= 1
+            self._fallos[nbits] = 0
+            self._generados[nbits] += 1
+            self._llegadas[nbits].append(time.monotonic())
+            self._rellena(nbits)
+            self._cerrojo.notify_all()
+
+    def _falla(self, nbits, excepcion):
+        """Recibe una excepción de un proceso del pool (o al guardar un par), y encarga otro par en su lugar
+
+        Tras MAX_FALLOS fallos seguidos del mismo tamaño, se deja de rellenar, y la excepción se relanza en toma() a
+        quien pida un par de ese tamaño con la reserva vacía.
+
+        :param nbits: bits de p y q del par que ha fallado
+        :param excepcion: la excepción
+        """
+        with self._cerrojo:
+            self._en_curso[nbits] -= 1
+            self._fallos[nbits] += 1
+            self._errores[nbits] = excepcion
+            self._rellena(nbits)
+            self._cerrojo.notify_all()
+
+    def _relanza(self, nbits):
+        """Relanza el error de un tamaño por el que se ha dejado de rellenar, y vuelve a rellenar (llamar con el
+        cerrojo adquirido)
+
+        :param nbits: bits de p y q
+        """
+        error, self._errores[nbits] = self._errores[nbits], None
+        self._fallos[nbits] = 0
+        self._rellena(nbits)
+        raise error
+
+    def toma(self, nbits, esperar=True):
+        """Toma un par de claves de la reserva, y encarga uno nuevo
+
+        Si la reserva está vacía y se ha dejado de rellenar por fallos seguidos, se relanza el último error (y se vuelve
+        a intentar rellenar).
+
+        :param nbits: bits de p y q (uno de los tamaños de objetivos)
+        :param esperar: si la reserva está vacía, esperar a que llegue un par (True) o retornar None (False)
+        :return: tupla (n, e, d, p, q), o None
+        """
+        with self._cerrojo:
+            if not self._pares[nbits]:
+                self._esperas[nbits] += 1
+                if self._fallos[nbits] >= MAX_FALLOS:
+                    self._relanza(nbits)
+                if not esperar:
+                    return None
+                while not self._pares[nbits]:
+                    if self._fallos[nbits] >= MAX_FALLOS:
+                        self._relanza(nbits)
+                    self._cerrojo.wait()
+            par = self._pares[nbits].popleft()
+            self._servidos[nbits] += 1
+            self._rellena(nbits)
+        os.remove(self._ruta(nbits, par[0]))
+        return par
+
+    def metricas(self):
+        """Retorna las métricas de la reserva, por tamaño
+
+        :return: diccionario {nbits: {"profundidad", "objetivo", "en_curso", "generados", "servidos", "esperas",
+            "tasa_relleno" (pares por segundo, según las últimas llegadas)}}
+        """
+        resul = {}
+        with self._cerrojo:
+            for nbits in self.objetivos:
+                llegadas = self._llegadas[nbits]
+                tasa = 0.0
+                if len(llegadas) > 1 and llegadas[-1] > llegadas[0]:
+                    tasa = (len(llegadas) - 1) / (llegadas[-1] - llegadas[0])
+                resul[nbits] = {"profundidad": len(self._pares[nbits]), "objetivo": self.objetivos[nbits],
+                                "en_curso": self._en_curso[nbits], "generados": self._generados[nbits],
+                                "servidos": self._servidos[nbits], "esperas": self._esperas[nbits],
+                                "tasa_relleno": tasa}
+        return resul
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_inicia():
+    """Crea la reserva (cerrando la anterior, si la había) con el objetivo indicado para un tamaño"""
+    global _reserva
+    nbits = utils.input_int("Número de bits de p y q (512-4096, por defecto 1024)", range(512, 4097), 1024)
+    cantidad = utils.input_int("Pares a mantener en reserva (1-1000, por defecto 8)", range(1, 1001), 8)
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    if _reserva:
+        _reserva.cierra()
+    _reserva = ReservaClaves({nbits: cantidad}, DIRECTORIO_RESERVA, 0, procesos)
+    print(f"Reserva iniciada; {_reserva.metricas()[nbits]['profundidad']} pares cargados de {DIRECTORIO_RESERVA}.")
+
+def menu_toma():
+    """Toma un par de claves de la reserva, y mide cuánto se ha tardado"""
+    if not _reserva:
+        print("No hay reserva; hay que iniciarla primero.")
+        return
+    nbits = next(iter(_reserva.objetivos))
+    inicio = time.perf_counter()
+    n, e, d, p, q = _reserva.toma(nbits)
+    t = time.perf_counter() - inicio
+    print(f"Par de {nbits} bits tomado en {t * 1000:.2f} ms.")
+    print("e:", e)
+    print("n:", n)
+    print("d:", d)
+
+def menu_metricas():
+    """Muestra las métricas de la reserva"""
+    if not _reserva:
+        print("No hay reserva; hay que iniciarla primero.")
+        return
+    for nbits, m in _reserva.metricas().items():
+        print(f"{nbits} bits: {m['profundidad']}/{m['objetivo']} pares en reserva, {m['en_curso']} en curso, "
+              f"{m['generados']} generados, {m['servidos']} servidos ({m['esperas']} con la reserva vacía), "
+              f"{m['tasa_relleno']:.2f} pares/s")
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Iniciar reserva", menu_inicia),
+    ("Tomar un par de claves", menu_toma),
+    ("Ver métricas", menu_metricas)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    # Bucle principal:
+    utils.menu(opciones_menu)
+    if _reserva:
+        _reserva.cierra()
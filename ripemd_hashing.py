@@ -3,7 +3,14 @@
 # Algoritmo de hashing RIPEMD-160.
 
 import os
+import time
+import struct
+import hashing
 import utils
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él, los lotes se calculan mensaje a mensaje
+    np = None
 
 # Variables globales ***************************************************************************************************
 
@@ -49,98 +56,273 @@ K = [0x00000000, 0x5a827999, 0x6ed9eba1, 0x8f1bbcdc, 0xa953fd4e]
 # K':
 Kp = [0x50a28be6, 0x5c4dd124, 0x6d703ef3, 0x7a6d76e9, 0x00000000]
 
+# Valor hash inicial:
+_H0 = (0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0)
+
+# Padding de un mensaje de 32 bytes (b'\x80', ceros y la longitud, 256 bits, little endian):
+_RELLENO_32 = b'\x80' + 23 * b'\x00' + (256).to_bytes(8, "little")
+
+# Número mínimo de mensajes de la misma longitud para calcularlos a la vez con NumPy (ripemd160_many()):
+MIN_LOTE = 16
+
+# Pasos precalculados de la compresión, agrupados en las 5 rondas de 16 pasos. Cada paso es una tupla (r[j], s[j],
+# 32 - s[j], rp[j], sp[j], 32 - sp[j]): palabra del bloque y rotación de cada una de las dos líneas.
+_PASOS = tuple(
+    tuple((r[j], s[j], 32 - s[j], rp[j], sp[j], 32 - sp[j]) for j in range(16 * ronda, 16 * ronda + 16))
+    for ronda in range(5)
+)
+
 
 # Funciones auxiliares *************************************************************************************************
 
-def func_f(j, x, y, z):
-    """Función para barajar los bits de los argumentos de entrada x, y, z
+def _comprime(h, datos, inicio):
+    """Aplica la función de compresión RIPEMD-160 a un bloque del mensaje
+
+    Las 5 rondas de 16 pasos se escriben por separado, cada una con su función de barajado de bits en línea (la línea
+    izquierda usa las funciones f1..f5 en orden y la derecha en orden inverso), de modo que en el bucle interno no hay
+    ni condiciones ni llamadas a funciones.
 
-    :param j: según j la función retornará una cosa u otra
-    :param x: primer parámetro (int)
-    :param y: segundo parámetro (int)
-    :param z: tercer parámetro (int)
-    :return: resultado a retornar (int)
+    :param h: valor hash actual (tupla de 5 enteros)
+    :param datos: bytes (o memoryview, bytearray) que contienen el bloque
+    :param inicio: posición del bloque dentro de datos
+    :return: el nuevo valor hash (tupla de 5 enteros)
     """
-    if j < 16:
-        return x ^ y ^ z
-    if j < 32:
-        return (x & y) | (~x & z)
-    if j < 48:
-        return (x | ~y) ^ z
-    if j < 64:
-        return (x & z) | (y & ~z)
-    return x ^ (y | ~z)
+    # Los enteros aquí son Little Endian de 32 bits, y las sumas, módulo 2^32 (máscara M). Las negaciones (~) dan
+    # enteros negativos, pero la máscara final de cada suma deja el resultado correcto.
+    # El bloque se divide en 16 palabras de 32 bits (4 bytes) little endian:
+    X = struct.unpack_from("<16I", datos, inicio)
+    M = 0xffffffff
+    A, B, C, D, E = Ap, Bp, Cp, Dp, Ep = h
+    # Ronda 1: f1 = x ^ y ^ z (izquierda) y f5 = x ^ (y | ~z) (derecha):
+    for i, n, m, i2, n2, m2 in _PASOS[0]:
+        T = (A + (B ^ C ^ D) + X[i]) & M
+        A, E, D, C, B = E, D, (C << 10 | C >> 22) & M, B, ((T << n | T >> m) + E) & M
+        T = (Ap + (Bp ^ (Cp | ~Dp)) + X[i2] + 0x50a28be6) & M
+        Ap, Ep, Dp, Cp, Bp = Ep, Dp, (Cp << 10 | Cp >> 22) & M, Bp, ((T << n2 | T >> m2) + Ep) & M
+    # Ronda 2: f2 = (x & y) | (~x & z) y f4 = (x & z) | (y & ~z):
+    for i, n, m, i2, n2, m2 in _PASOS[1]:
+        T = (A + ((B & C) | (~B & D)) + X[i] + 0x5a827999) & M
+        A, E, D, C, B = E, D, (C << 10 | C >> 22) & M, B, ((T << n | T >> m) + E) & M
+        T = (Ap + ((Bp & Dp) | (Cp & ~Dp)) + X[i2] + 0x5c4dd124) & M
+        Ap, Ep, Dp, Cp, Bp = Ep, Dp, (Cp << 10 | Cp >> 22) & M, Bp, ((T << n2 | T >> m2) + Ep) & M
+    # Ronda 3: f3 = (x | ~y) ^ z en ambas líneas:
+    for i, n, m, i2, n2, m2 in _PASOS[2]:
+        T = (A + ((B | ~C) ^ D) + X[i] + 0x6ed9eba1) & M
+        A, E, D, C, B = E, D, (C << 10 | C >> 22) & M, B, ((T << n | T >> m) + E) & M
+        T = (Ap + ((Bp | ~Cp) ^ Dp) + X[i2] + 0x6d703ef3) & M
+        Ap, Ep, Dp, Cp, Bp = Ep, Dp, (Cp << 10 | Cp >> 22) & M, Bp, ((T << n2 | T >> m2) + Ep) & M
+    # Ronda 4: f4 y f2:
+    for i, n, m, i2, n2, m2 in _PASOS[3]:
+        T = (A + ((B & D) | (C & ~D)) + X[i] + 0x8f1bbcdc) & M
+        A, E, D, C, B = E, D, (C << 10 | C >> 22) & M, B, ((T << n | T >> m) + E) & M
+        T = (Ap + ((Bp & Cp) | (~Bp & Dp)) + X[i2] + 0x7a6d76e9) & M
+        Ap, Ep, Dp, Cp, Bp = Ep, Dp, (Cp << 10 | Cp >> 22) & M, Bp, ((T << n2 | T >> m2) + Ep) & M
+    # Ronda 5: f5 y f1:
+    for i, n, m, i2, n2, m2 in _PASOS[4]:
+        T = (A + (B ^ (C | ~D)) + X[i] + 0xa953fd4e) & M
+        A, E, D, C, B = E, D, (C << 10 | C >> 22) & M, B, ((T << n | T >> m) + E) & M
+        T = (Ap + (Bp ^ Cp ^ Dp) + X[i2]) & M
+        Ap, Ep, Dp, Cp, Bp = Ep, Dp, (Cp << 10 | Cp >> 22) & M, Bp, ((T << n2 | T >> m2) + Ep) & M
+    return (
+        (h[1] + C + Dp) & M,
+        (h[2] + D + Ep) & M,
+        (h[3] + E + Ap) & M,
+        (h[4] + A + Bp) & M,
+        (h[0] + B + Cp) & M
+    )
+
+def new(datos=b""):
+    """Crea un objeto de hashing RIPEMD-160 incremental (como hashlib.new("ripemd160"))
+
+    :param datos: primer trozo del mensaje (bytes)
+    :return: el objeto creado (HashRIPEMD160)
+    """
+    return HashRIPEMD160(datos)
 
 def ripemd160(ms, formato="hex"):
     """Retorna el digest del mensaje de entrada, aplicando RIPEMD-160
 
+    Los mensajes que tras el padding caben en un solo bloque (hasta 55 bytes, como los digests SHA-256 de Hash160) se
+    rellenan y comprimen directamente, sin pasar por un objeto HashRIPEMD160.
+
     :param ms: Mensaje de entrada (bytes)
     :param formato: Formato de la salida: "hex" (string), "bin" (string), "bytes" (bytes) o "int" (entero)
     :return: El digest resultante
     """
-    # Se asume que el mensaje tiene una longitud en bits múltiplo de 8 (porque la entrada es en bytes).
-    # Los enteros aquí son Little Endian de 32 bits, y las sumas, módulo 2^32.
-    global s, sp, r, rp, K, Kp
-    longitud = len(ms) * 8  # longitud en bits del mensaje inicial
-    # La longitud de bits tras el padding debe ser de 448 bits módulo 512 (56 bytes módulo 64)
-    ms += b'\x80'  # es obligatorio 1 bit '1', con lo que también los 7 '0' correspondientes
-    if len(ms) % 64 == 56:
-        bytes0_padding = 0
-    elif len(ms) % 64 < 56:
-        bytes0_padding = 56 - (len(ms) % 64)
+    if len(ms) == 32:
+        resultado = struct.pack("<5I", *_comprime(_H0, bytes(ms) + _RELLENO_32, 0))
+    elif len(ms) < 56:
+        datos = bytes(ms) + b'\x80' + (55 - len(ms)) * b'\x00' + (len(ms) * 8).to_bytes(8, "little")
+        resultado = struct.pack("<5I", *_comprime(_H0, datos, 0))
     else:
-        bytes0_padding = 120 - (len(ms) % 64)  # 64 - (len(ms) % 64) + 56: los que faltan para 64, más otros 56
-    ms += bytes0_padding * b'\x00'
-    # El entero con la longitud del mensaje inicial es un big endian de 64 bits (8 bytes):
-    long64 = longitud.to_bytes(8, "little")
-    ms += long64
-    # El mensaje se divide en bloques de 512 bits (64 bytes)
-    bloques = [ms[i:i+64] for i in range(0, len(ms), 64)]
-    # Inicializamos h:
-    h = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476, 0xc3d2e1f0]
-    for bloque in bloques:
-        # El bloque se divide en 16 palabras de 32 bits (4 bytes) little indian:
-        words = [int.from_bytes(bloque[i:i + 4], "little") for i in range(0, 64, 4)]
-        A, B, C, D, E = Ap, Bp, Cp, Dp, Ep = h
-        for j in range(80):   # 5 rondas de 16 iteraciones
-            nronda = j // 16
-            # A - E:
-            T = (A + func_f(j, B, C, D) + words[r[j]] + K[nronda]) % 0x100000000
-            T = (utils.lr(T, s[j], 32) + E) % 0x100000000
-            A = E
-            E = D
-            D = utils.lr(C, 10, 32)
-            C = B
-            B = T
-            # A' - E':
-            T = (Ap + func_f(79 - j, Bp, Cp, Dp) + words[rp[j]] + Kp[nronda]) % 0x100000000
-            T = (utils.lr(T, sp[j], 32) + Ep) % 0x100000000
-            Ap = Ep
-            Ep = Dp
-            Dp = utils.lr(Cp, 10, 32)
-            Cp = Bp
-            Bp = T
-        T = (h[1] + C + Dp) % 0x100000000
-        h[1] = (h[2] + D + Ep) % 0x100000000
-        h[2] = (h[3] + E + Ap) % 0x100000000
-        h[3] = (h[4] + A + Bp) % 0x100000000
-        h[4] = (h[0] + B + Cp) % 0x100000000
-        h[0] = T
-    # Listo. El resultado está en h[0..4]; recordemos que los enteros deben representarse en little endian:
-    resultado = b""
-    for elemento in h:
-        resultado += elemento.to_bytes(4, "little")
-    if formato == "bytes":
-        return resultado
-    # Lo pasaremos a entero, manteniendo el orden de bytes little indian:
-    resultado = int.from_bytes(resultado, "big")
-    if formato == "hex":
-        return utils.int2hex(resultado, 40, "")
-    if formato == "bin":
-        return utils.int2bin(resultado, 160, "")
-    if formato == "int":
-        return resultado
-    return None
+        resultado = HashRIPEMD160(ms).digest()
+    return hashing.formatea(resultado, formato)
+
+# Clase HashRIPEMD160 **************************************************************************************************
+
+class HashRIPEMD160:
+    """Objeto de hashing RIPEMD-160 incremental, al estilo de hashlib
+
+    El mensaje se puede ir pasando por trozos, mediante update(). Los bloques completos se procesan al vuelo, directamente
+    sobre los datos recibidos, con lo que solo se guarda en memoria el último bloque incompleto.
+    """
+
+    name = "ripemd160"
+    block_size = 64
+    digest_size = 20
+
+    def __init__(self, datos=b""):
+        """Inicializa el objeto con el valor hash inicial
+
+        :param datos: primer trozo del mensaje (bytes o cualquier objeto que admita memoryview)
+        """
+        self._h = _H0
+        self._pendiente = bytearray()  # último bloque incompleto recibido
+        self._longitud = 0  # longitud total del mensaje recibido (bytes)
+        if datos:
+            self.update(datos)
+
+    def update(self, datos):
+        """Añade un trozo al mensaje
+
+        :param datos: trozo del mensaje (bytes o cualquier objeto que admita memoryview)
+        """
+        vista = memoryview(datos).cast("B")
+        self._longitud += len(vista)
+        h = self._h
+        inicio = 0
+        # Si quedaba un bloque a medias, lo completamos primero:
+        if self._pendiente:
+            inicio = 64 - len(self._pendiente)
+            self._pendiente += vista[:inicio]
+            if len(self._pendiente) < 64:
+                return
+            h = _comprime(h, self._pendiente, 0)
+            self._pendiente.clear()
+        # Los bloques completos (64 bytes) se procesan directamente sobre los datos, sin copiarlos:
+        fin = inicio + (len(vista) - inicio) // 64 * 64
+        for i in range(inicio, fin, 64):
+            h = _comprime(h, vista, i)
+        self._pendiente += vista[fin:]
+        self._h = h
+
+    def copy(self):
+        """Retorna una copia independiente del objeto, con el mismo estado
+
+        :return: la copia (HashRIPEMD160)
+        """
+        copia = object.__new__(HashRIPEMD160)
+        copia.__dict__.update(self.__dict__)
+        copia._pendiente = bytearray(self._pendiente)
+        return copia
+
+    def digest(self):
+        """Retorna el digest del mensaje recibido hasta ahora (no modifica el estado del objeto)
+
+        :return: el digest (bytes)
+        """
+        # Se asume que el mensaje tiene una longitud en bits múltiplo de 8 (porque la entrada es en bytes).
+        # La longitud de bits tras el padding debe ser de 448 bits módulo 512 (56 bytes módulo 64). Es obligatorio
+        # 1 bit '1', con lo que también los 7 '0' correspondientes; luego los bytes b'\x00' que falten:
+        cola = self._pendiente + b'\x80'
+        cola += (56 - len(cola)) % 64 * b'\x00'
+        # El entero con la longitud del mensaje inicial es un little endian de 64 bits (8 bytes):
+        cola += (self._longitud * 8).to_bytes(8, "little")
+        h = self._h
+        for inicio in range(0, len(cola), 64):
+            h = _comprime(h, cola, inicio)
+        # Listo. El resultado está en h[0..4]; recordemos que los enteros deben representarse en little endian:
+        return struct.pack("<5I", *h)
+
+    def hexdigest(self):
+        """Retorna el digest del mensaje recibido hasta ahora, en hexadecimal
+
+        :return: el digest (string)
+        """
+        return self.digest().hex()
+
+# Lotes de mensajes (NumPy) ********************************************************************************************
+
+# Funciones de barajado de bits de cada ronda (f1..f5), para los arrays de NumPy:
+_F_LANES = (
+    lambda x, y, z: x ^ y ^ z,
+    lambda x, y, z: (x & y) | (~x & z),
+    lambda x, y, z: (x | ~y) ^ z,
+    lambda x, y, z: (x & z) | (y & ~z),
+    lambda x, y, z: x ^ (y | ~z)
+)
+
+def _comprime_lanes(h, X):
+    """Aplica la función de compresión RIPEMD-160 a un bloque de muchos mensajes a la vez (uno por "lane")
+
+    Es el mismo cálculo que _comprime(), pero cada variable es un array uint32 de NumPy con un valor por mensaje (las
+    sumas son automáticamente módulo 2^32).
+
+    :param h: valor hash actual (lista de 5 arrays)
+    :param X: palabras del bloque, array de forma (16, número de mensajes)
+    :return: el nuevo valor hash (lista de 5 arrays)
+    """
+    u32 = np.uint32
+    diez, veintidos = u32(10), u32(22)
+    A, B, C, D, E = Ap, Bp, Cp, Dp, Ep = h
+    for ronda in range(5):
+        f, fp = _F_LANES[ronda], _F_LANES[4 - ronda]
+        k, kp = u32(K[ronda]), u32(Kp[ronda])
+        for i, n, m, i2, n2, m2 in _PASOS[ronda]:
+            T = A + f(B, C, D) + X[i] + k
+            A, E, D, C, B = E, D, C << diez | C >> veintidos, B, (T << u32(n) | T >> u32(m)) + E
+            T = Ap + fp(Bp, Cp, Dp) + X[i2] + kp
+            Ap, Ep, Dp, Cp, Bp = Ep, Dp, Cp << diez | Cp >> veintidos, Bp, (T << u32(n2) | T >> u32(m2)) + Ep
+    return [h[1] + C + Dp, h[2] + D + Ep, h[3] + E + Ap, h[4] + A + Bp, h[0] + B + Cp]
+
+def ripemd160_lote(datos):
+    """Calcula los digests RIPEMD-160 de un lote de mensajes de la misma longitud, todos a la vez
+
+    Tanto la entrada como la salida son arrays de NumPy, con un mensaje por fila, para poder encadenar el cálculo con
+    otros vectorizados (p.e. sha2_hashing.sha256_lote(), en hashing.hash160_many()). Requiere NumPy.
+
+    :param datos: array uint8 de forma (número de mensajes, longitud)
+    :return: array uint8 de forma (número de mensajes, 20) con los digests
+    """
+    n, longitud = datos.shape
+    # Todos los mensajes tienen la misma longitud, y por tanto el mismo padding:
+    relleno = b'\x80' + (55 - longitud) % 64 * b'\x00' + (longitud * 8).to_bytes(8, "little")
+    bloques = np.empty((n, longitud + len(relleno)), dtype=np.uint8)
+    bloques[:, :longitud] = datos
+    bloques[:, longitud:] = np.frombuffer(relleno, dtype=np.uint8)
+    # Palabras little endian; cada fila de 'palabras' es una palabra de todos los mensajes (un "lane" por mensaje):
+    palabras = bloques.view("<u4").astype(np.uint32).T.copy()
+    h = [np.full(n, x, dtype=np.uint32) for x in _H0]
+    for inicio in range(0, len(palabras), 16):
+        h = _comprime_lanes(h, palabras[inicio:inicio + 16])
+    return np.stack(h, axis=1).astype("<u4").view(np.uint8)
+
+def ripemd160_many(mensajes):
+    """Retorna los digests RIPEMD-160 de una lista de mensajes, calculados a la vez con NumPy (si está disponible)
+
+    Los mensajes de la misma longitud se procesan juntos, cada uno en un "lane" de los arrays de NumPy. El resultado es
+    idéntico al de ripemd160(ms, "bytes") para cada mensaje.
+
+    :param mensajes: lista de mensajes (bytes)
+    :return: lista de digests (bytes), en el mismo orden que los mensajes
+    """
+    if np is None:
+        return [ripemd160(ms, "bytes") for ms in mensajes]
+    # Agrupamos los mensajes por longitud:
+    grupos = {}
+    for i, ms in enumerate(mensajes):
+        grupos.setdefault(len(ms), []).append(i)
+    resul = [None] * len(mensajes)
+    for longitud, indices in grupos.items():
+        if len(indices) < MIN_LOTE:  # con pocos mensajes, compensa calcularlos uno a uno
+            for i in indices:
+                resul[i] = ripemd160(mensajes[i], "bytes")
+            continue
+        datos = np.frombuffer(b"".join(bytes(mensajes[i]) for i in indices), dtype=np.uint8)
+        salida = ripemd160_lote(datos.reshape(len(indices), longitud)).tobytes()
+        for j, i in enumerate(indices):
+            resul[i] = salida[20 * j:20 * j + 20]
+    return resul
 
 # Funciones de las opciones de menú ************************************************************************************
 
@@ -152,29 +334,33 @@ def menu_ripemd_string():
 
 def menu_ripemd_file():
     """Solicita nombre de archivo y calcula su hash RIPEMD-160"""
-    archivos = os.listdir(".")
-    arfiles = []
-    for archivo in archivos:
-        if os.path.isfile(archivo):
-            arfiles.append(archivo)
-    print("Archivos del directorio actual:")
-    for arfile in arfiles:
-        print(arfile)
-    arch = input("Archivo (ruta relativa o absoluta): ")
+    arch = hashing.input_archivo()
     try:
-        with open(arch, "rb") as f:
-            ms = f.read()
+        digest = hashing.digests_archivo(arch, ("ripemd160",))["ripemd160"]
     except FileNotFoundError:
         print("Archivo no encontrado.")
         return
-    digest = ripemd160(ms, "hex")
     print("RIPEMD-160:\n   ", digest)
 
+def menu_benchmark():
+    """Mide la velocidad de RIPEMD-160 con mensajes de 32 bytes (como en Hash160) y con un mensaje de 1 MB"""
+    corto = os.urandom(32)
+    largo = os.urandom(2 ** 20)
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        ripemd160(corto, "bytes")
+    t_corto = (time.perf_counter() - inicio) / 1000
+    inicio = time.perf_counter()
+    ripemd160(largo, "bytes")
+    t_largo = time.perf_counter() - inicio
+    print(f"RIPEMD-160: {t_corto * 1e6:.1f} µs por mensaje de 32 bytes; {1 / t_largo:.3f} MB/s con 1 MB")
+
 # Menu *****************************************************************************************************************
 
 opciones_menu = (
     ("Hash RIPEMD-160 de un string", menu_ripemd_string),
-    ("Hash RIPEMD-160 de un archivo", menu_ripemd_file)
+    ("Hash RIPEMD-160 de un archivo", menu_ripemd_file),
+    ("Medir rendimiento", menu_benchmark)
 )
 
 # Programa *************************************************************************************************************
@@ -2,23 +2,38 @@
 
 # Utilidades relacionadas con el algoritmo RSA.
 
+import math
+import time
+import queue
+import functools
+import collections
 import random
+import multiprocessing
 import utils
+import teoria_numeros
 import primos
 
+# Variables globales ***************************************************************************************************
+
+# Generador aleatorio de cada proceso del pool de primos_rsa() (ver _inicia_trabajador()):
+_aleatorio = None
+
 # Funciones auxiliares *************************************************************************************************
 
-def rnd_primo(nbits=1024, k=10):
+def rnd_primo(nbits=1024, k=0, aleatorio=None):
     """Obtiene un número primo aleatorio de la cantidad de bits especificada (útil para p y q)
 
     :param nbits: número de bits del primo
-    :param k: número de iteraciones Miller-Rabin
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba Baillie-PSW
+    :param aleatorio: generador de números aleatorios (con método randint(), como el módulo random o
+        random.SystemRandom()); por defecto, random.SystemRandom(), como en primos_rsa()
     :return: el primo aleatorio
     """
-    es_primo = False
-    while not es_primo:
+    aleatorio = aleatorio or random.SystemRandom()
+    primo = None
+    while primo is None:
         # Obtendremos un número primo siguiendo recomendaciones habituales. En primer lugar, se recomiendan 1024 bits.
-        entero = random.randint(0, 2 ** nbits - 1)
+        entero = aleatorio.randint(0, 2 ** nbits - 1)
         # Colocamos el primer bit a 1 (si fuese un 0 ya no sería un entero de nbits):
         entero |= 2 ** (nbits - 1)
         # Ahora colocamos el segundo bit también a 1: es la única forma de asegurar que dos números primos de n bits
@@ -26,19 +41,32 @@ def rnd_primo(nbits=1024, k=10):
         entero |= 2 ** (nbits - 2)
         # También colocamos el último bit a 1, para asegurarnos de que es un entero impar:
         entero |= 1
-        es_primo = primos.es_primo_mr(entero, k)  # k=10 iteraciones parecen ser más que suficientes
-    return entero
+        # Buscamos el primer primo a partir de este punto de partida aleatorio (cribando ventanas de candidatos).
+        # Todo entero entre este y 2^nbits tiene también los dos primeros bits a 1; si no hay ningún primo, volvemos a
+        # empezar:
+        primo = primos.busca_primo(entero, 2 ** nbits, k)
+    return primo
 
 def genera_claves_rsa(nbits, k):
     """Genera claves pública y privada RSA y las retorna
 
     :param nbits: número de bits de cada primo (p y q)
-    :param k: número de iteraciones en el algoritmo de primalidad Miller-Rabin
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba de primalidad Baillie-PSW
+    :return: orden n (p*q), clave pública, clave privada
+    """
+    # Primero, obtenemos los números primos p y q (distintos, y aptos para e = 65537):
+    p, q = primos_rsa(nbits, 2, k)
+    return claves_rsa(p, q)
+
+def claves_rsa(p, q):
+    """Calcula las claves pública y privada RSA a partir de los primos p y q
+
+    :param p: primer primo
+    :param q: segundo primo (distinto de p)
     :return: orden n (p*q), clave pública, clave privada
+    :raises ValueError: si e no tiene inverso módulo λ(n) (p - 1 o q - 1 es múltiplo de e; ver primos_rsa())
     """
-    # Primero, obtenemos los números primos p y q (y n):
-    p = rnd_primo(nbits, k)
-    q = rnd_primo(nbits, k)
+    assert p != q
     n = p * q
     # Ahora, calculamos λ(n) (Carmichael's totient):
     car_toti = utils.mcm(p - 1, q - 1)
@@ -47,15 +75,161 @@ def genera_claves_rsa(nbits, k):
     assert(e < car_toti)
     # Ya solo queda calcular la clave privada (d), mediante el algoritmo de Euclides extendido.
     # Se debe dar e * d = 1 (mod car_toti):
-    d = utils.inverso_modn(e, car_toti)
+    d = teoria_numeros.inverso_modn(e, car_toti)
+    if d is None:
+        raise ValueError("e no tiene inverso módulo λ(n): p - 1 o q - 1 es múltiplo de e")
     return n, e, d
 
+def _inicia_trabajador():
+    """Inicializa un proceso del pool de primos_rsa(), con su propio generador aleatorio
+
+    Cada proceso usa random.SystemRandom() (números aleatorios del sistema operativo, criptográficamente seguros), con
+    lo que las secuencias de los procesos son independientes entre sí (no heredan el estado del módulo random del
+    proceso padre).
+    """
+    global _aleatorio
+    _aleatorio = random.SystemRandom()
+
+def _primo_trabajador(nbits, k):
+    """Obtiene un primo aleatorio en un proceso del pool de primos_rsa()
+
+    :param nbits: número de bits del primo
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba Baillie-PSW
+    :return: el primo aleatorio
+    """
+    return rnd_primo(nbits, k, _aleatorio)
+
+def primos_rsa(nbits, cantidad, k=0, procesos=1):
+    """Obtiene varios primos aleatorios de la cantidad de bits especificada, repartiendo la búsqueda entre procesos
+
+    Cada proceso busca un primo cada vez; en cuanto termina, se le encarga otro, hasta tener todos los necesarios. Al
+    terminar, el pool se cierra, cancelando las búsquedas que aún estén en curso. Se descartan los primos r tales que
+    r - 1 es múltiplo de e = 65537 (e no tendría inverso módulo λ(n)), con lo que todos sirven para claves RSA.
+
+    :param nbits: número de bits de cada primo
+    :param cantidad: número de primos
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba Baillie-PSW
+    :param procesos: número de procesos (1 para buscarlos todos en el proceso actual)
+    :return: lista de primos, distintos entre sí, en el orden en que se han encontrado
+    """
+    resul = []
+    if procesos <= 1:
+        aleatorio = random.SystemRandom()
+        while len(resul) < cantidad:
+            primo = rnd_primo(nbits, k, aleatorio)
+            if primo not in resul and (primo - 1) % 65537:
+                resul.append(primo)
+        return resul
+    terminados = queue.SimpleQueue()  # los callbacks del pool dejan aquí cada primo (o excepción)
+    with multiprocessing.Pool(procesos, initializer=_inicia_trabajador) as pool:
+        for _ in range(min(procesos, cantidad)):
+            pool.apply_async(_primo_trabajador, (nbits, k), callback=terminados.put, error_callback=terminados.put)
+        while len(resul) < cantidad:
+            primo = terminados.get()
+            if isinstance(primo, BaseException):
+                raise primo
+            if primo not in resul and (primo - 1) % 65537:
+                resul.append(primo)
+            # Mientras falten primos, mantenemos ocupados a todos los procesos:
+            if len(resul) < cantidad:
+                pool.apply_async(_primo_trabajador, (nbits, k), callback=terminados.put,
+                                 error_callback=terminados.put)
+    return resul
+
+def genera_claves_rsa_lote(nbits, cantidad, k=0, procesos=1):
+    """Genera varios pares de claves RSA, buscando todos los primos (p y q de cada par) en paralelo
+
+    :param nbits: número de bits de cada primo (p y q)
+    :param cantidad: número de pares de claves
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba de primalidad Baillie-PSW
+    :param procesos: número de procesos entre los que repartir la búsqueda de los primos
+    :return: lista de tuplas (orden n, clave pública, clave privada)
+    """
+    lista = primos_rsa(nbits, 2 * cantidad, k, procesos)
+    return [claves_rsa(p, q) for p, q in zip(lista[::2], lista[1::2])]
+
+# Claves privadas en forma TCR *****************************************************************************************
+
+def claves_rsa_tcr(primos):
+    """Calcula las claves pública y privada RSA a partir de dos o más primos, con la clave privada en forma TCR
+
+    La clave privada es una tupla (d, primos, exponentes, coeficientes), como en PKCS #1: para primos [p, q, r3...],
+    exponentes es [dP, dQ, d3...] (d módulo cada primo menos 1), y coeficientes es [qInv, t3...] (qInv es el inverso
+    de q módulo p, y cada ti el inverso del producto de los primos anteriores módulo ri).
+
+    :param primos: lista de primos distintos, tales que e y cada primo menos 1 son coprimos
+    :return: orden n (producto de los primos), clave pública, clave privada (tupla)
+    """
+    assert len(set(primos)) == len(primos) >= 2
+    n = math.prod(primos)
+    # λ(n) (Carmichael's totient) es el mcm de todos los primos menos 1:
+    car_toti = functools.reduce(utils.mcm, (r - 1 for r in primos))
+    e = 65537
+    assert(e < car_toti)
+    d = teoria_numeros.inverso_modn(e, car_toti)
+    exponentes = [d % (r - 1) for r in primos]
+    coeficientes = [teoria_numeros.inverso_modn(primos[1], primos[0])]
+    producto = primos[0] * primos[1]
+    for r in primos[2:]:
+        coeficientes.append(teoria_numeros.inverso_modn(producto, r))
+        producto *= r
+    return n, e, (d, list(primos), exponentes, coeficientes)
+
+def genera_claves_rsa_tcr(nbits, k=0, nprimos=2, procesos=1):
+    """Genera claves pública y privada RSA, con la clave privada en forma TCR (ver claves_rsa_tcr())
+
+    Con más de dos primos (RSA multiprimo), n tiene nprimos * nbits bits; para un mismo tamaño de n, los primos son más
+    pequeños, y las operaciones privadas más rápidas. Para un tamaño de n que no es múltiplo de nprimos, se puede
+    indicar el número de bits de cada primo (p.e. [683, 683, 682] para n de 2048 bits con 3 primos); con más de dos
+    primos, n puede tener un bit menos que la suma.
+
+    :param nbits: número de bits de cada primo (int), o lista con el de cada uno (entonces nprimos es su longitud)
+    :param k: número de iteraciones Miller-Rabin adicionales a la prueba de primalidad Baillie-PSW
+    :param nprimos: número de primos (2 a 4)
+    :param procesos: número de procesos entre los que repartir la búsqueda de los primos
+    :return: orden n, clave pública, clave privada (tupla)
+    """
+    tamanos = list(nbits) if isinstance(nbits, (list, tuple)) else [nbits] * nprimos
+    assert 2 <= len(tamanos) <= 4
+    lista = []
+    for tam, cantidad in collections.Counter(tamanos).items():
+        encontrados = 0
+        while encontrados < cantidad:
+            for r in primos_rsa(tam, cantidad - encontrados, k, procesos):
+                # e tiene que ser coprimo con cada primo menos 1 (si no, no tiene inverso módulo λ(n)):
+                if r not in lista and (r - 1) % 65537:
+                    lista.append(r)
+                    encontrados += 1
+    return claves_rsa_tcr(lista)
+
+def privada_tcr(entero, clave):
+    """Aplica la clave privada (desencriptar o firmar) mediante el teorema chino del resto
+
+    En lugar de una exponenciación módulo n, se hace una por cada primo, con exponentes y módulos de una fracción del
+    tamaño (unas 4 veces más rápido con dos primos), y los resultados se combinan con el algoritmo de Garner (PKCS #1).
+    El resultado es el mismo que pow(entero, d, n).
+
+    :param entero: entero a transformar (0 <= entero < n)
+    :param clave: clave privada en forma TCR (ver claves_rsa_tcr())
+    :return: el entero transformado
+    """
+    _, primos, exponentes, coeficientes = clave
+    restos = [pow(entero % r, dr, r) for r, dr in zip(primos, exponentes)]
+    # Garner: primero p y q (m = m2 + q * h), y luego cada primo adicional:
+    p, q = primos[0], primos[1]
+    m = restos[1] + q * ((restos[0] - restos[1]) * coeficientes[0] % p)
+    producto = p * q
+    for r, mr, t in zip(primos[2:], restos[2:], coeficientes[1:]):
+        m += producto * ((mr - m) * t % r)
+        producto *= r
+    return m
+
 # Funciones de las opciones de menú ************************************************************************************
 
 def menu_genera_claves():
     """Genera el par de claves RSA"""
     nbits = utils.input_int("Número de bits de p y q (512-4096, por defecto 1024)", range(512, 4097), 1024)
-    k = utils.input_int("Número de iteraciones para el cálculo de p y q (2-128, por defecto 10)", range(2, 129), 10)
+    k = utils.input_int("Iteraciones Miller-Rabin adicionales para p y q (0-128, por defecto 0)", range(0, 129), 0)
     n, e, d = genera_claves_rsa(nbits, k)
     print("Clave pública:")
     print("e:", e)
@@ -63,17 +237,31 @@ def menu_genera_claves():
     print("Clave privada:")
     print("d:", d)
 
+def menu_genera_lote():
+    """Genera un lote de pares de claves RSA en paralelo, y mide el tiempo"""
+    nbits = utils.input_int("Número de bits de p y q (512-4096, por defecto 1024)", range(512, 4097), 1024)
+    cantidad = utils.input_int("Número de pares de claves (1-1000, por defecto 8)", range(1, 1001), 8)
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    inicio = time.perf_counter()
+    claves = genera_claves_rsa_lote(nbits, cantidad, 0, procesos)
+    t = time.perf_counter() - inicio
+    for n, e, d in claves:
+        assert pow(pow(12345, e, n), d, n) == 12345
+    print(f"{len(claves)} pares de claves en {t:.1f} s ({len(claves) / t:.2f} pares/s).")
+
 def menu_ejemplo():
     """Una simulación de encriptación / desencriptación"""
     ms_bytes = b"Luke, yo soy tu padre" # mensaje a encriptar
     ms_int = int.from_bytes(ms_bytes, "big")
-    n, e, d = genera_claves_rsa(1024, 10)
+    n, e, privada = genera_claves_rsa_tcr(1024)
+    d = privada[0]
     print(f"Mensaje a encriptar: {ms_bytes}")
     print(f"Mensaje pasado a entero (hex): {hex(ms_int)[2:]}")
     print(f"Orden p*q (n): {hex(n)[2:]}")
     print(f"Clave pública (e): {hex(e)[2:]}")
     print(f"Clave privada (d): {hex(d)[2:]}")
-    ms_d = pow(ms_int, d, n)  # encriptamos con clave privada
+    ms_d = privada_tcr(ms_int, privada)  # encriptamos con clave privada (con el TCR; equivale a pow(ms_int, d, n))
     print(f"Mensaje encriptado con la clave privada: {hex(ms_d)[2:]}")
     ms_int = pow(ms_d, e, n)  # desencriptamos con la clave pública
     ms_bytes = utils.int2bytes(ms_int)
@@ -81,16 +269,39 @@ def menu_ejemplo():
     print(f"Mensaje desencriptiado pasado a bytes: {ms_bytes}")
     ms_e = pow(ms_int, e, n)  # encriptamos con clave pública
     print(f"Mensaje encriptado con la clave pública: {hex(ms_e)[2:]}")
-    ms_int = pow(ms_e, d, n)  # desencriptamos con la clave privada
+    ms_int = privada_tcr(ms_e, privada)  # desencriptamos con la clave privada
     print(f"Mensaje desencriptado con la clave privada: {hex(ms_int)[2:]}")
     ms_bytes = utils.int2bytes(ms_int)
     print(f"Mensaje desencriptado pasado a bytes: {ms_bytes}")
 
+def menu_benchmark():
+    """Mide las operaciones privadas por segundo con n de 2048 bits, con pow(c, d, n) y con el TCR (2 a 4 primos)"""
+    for nprimos in (2, 3, 4):
+        # Repartimos los 2048 bits entre los primos (el resto, a los primeros), y repetimos hasta que n tenga todos:
+        tamanos = [2048 // nprimos + (i < 2048 % nprimos) for i in range(nprimos)]
+        n = 0
+        while n.bit_length() != 2048:
+            n, e, privada = genera_claves_rsa_tcr(tamanos)
+        assert n.bit_length() == 2048
+        enteros = [random.randrange(n) for _ in range(20)]
+        if nprimos == 2:
+            inicio = time.perf_counter()
+            directos = [pow(c, privada[0], n) for c in enteros]
+            t = time.perf_counter() - inicio
+            print(f"pow(c, d, n): {len(enteros) / t:.1f} operaciones/s")
+        inicio = time.perf_counter()
+        resul = [privada_tcr(c, privada) for c in enteros]
+        t = time.perf_counter() - inicio
+        assert resul == [pow(c, privada[0], n) for c in enteros]
+        print(f"TCR con {nprimos} primos: {len(enteros) / t:.1f} operaciones/s")
+
 # Menu *****************************************************************************************************************
 
 opciones_menu = (
     ("Genera par de claves", menu_genera_claves),
+    ("Genera lote de claves en paralelo", menu_genera_lote),
     ("Ejemplo de funcionamiento", menu_ejemplo),
+    ("Medir operaciones privadas (TCR)", menu_benchmark),
 )
 
 # Programa *************************************************************************************************************
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+
+# Encriptación RSA de datos de cualquier longitud: los datos se dividen en bloques del tamaño del módulo, con el relleno
+# OAEP de PKCS #1 v2.2 (RSAES-OAEP, con SHA-256 y MGF1 con SHA-256, y etiqueta vacía), y los bloques se procesan por
+# lotes, opcionalmente repartidos entre varios procesos. Los archivos se leen y escriben por trozos, sin cargarlos
+# enteros en memoria.
+#
+# No se usa el relleno de PKCS #1 v1.5: si se puede distinguir un error de relleno de otros errores (o el tiempo que
+# tarda en detectarse), sirve de oráculo para desencriptar bloques (ataque de Bleichenbacher). Con OAEP, todos los
+# errores de desencriptación son el mismo ("Error de desencriptación"); aun así, Python no garantiza tiempos
+# constantes, y no conviene exponer la desencriptación a terceros que puedan medir sus tiempos.
+#
+# Formato del archivo encriptado: la sucesión de bloques encriptados, de tantos bytes como n cada uno.
+
+import os
+import hmac
+import math
+import time
+import tempfile
+import multiprocessing
+import utils
+import hashing
+import rsa
+
+# Variables globales ***************************************************************************************************
+
+# Bloques que procesa cada tarea del pool (cada lectura de un archivo es de este número de bloques):
+BLOQUES_POR_TAREA = 64
+
+# Función hash de OAEP (y de MGF1), longitud de sus digests, y digest de la etiqueta (vacía):
+HASH_OAEP = "sha256"
+LONGITUD_HASH = 32
+HASH_ETIQUETA = hashing.digest(HASH_OAEP, b"")
+
+# Bytes del relleno de OAEP: 0x00, semilla y hash de la etiqueta (LONGITUD_HASH bytes cada uno), y 0x01:
+RELLENO_MINIMO = 2 * LONGITUD_HASH + 2
+
+# Claves usadas por el menú (se generan la primera vez): tupla (n, e, clave privada en forma TCR):
+_claves = None
+
+# Funciones auxiliares *************************************************************************************************
+
+def _mgf1(semilla, longitud):
+    """Función de generación de máscaras MGF1 (PKCS #1), con HASH_OAEP
+
+    :param semilla: bytes
+    :param longitud: longitud de la máscara, en bytes
+    :return: máscara (bytes)
+    """
+    mascara = bytearray()
+    for contador in range((longitud + LONGITUD_HASH - 1) // LONGITUD_HASH):
+        mascara += hashing.digest(HASH_OAEP, semilla + contador.to_bytes(4, "big"))
+    return bytes(mascara[:longitud])
+
+def rellena(mensaje, k):
+    """Añade el relleno OAEP a un mensaje: 0x00, semilla enmascarada, y (hash de la etiqueta, ceros, 0x01, mensaje)
+    enmascarado con una máscara obtenida de la semilla, que es aleatoria
+
+    :param mensaje: bytes (como mucho k - RELLENO_MINIMO)
+    :param k: longitud en bytes del módulo n
+    :return: bloque de k bytes
+    """
+    if len(mensaje) > k - RELLENO_MINIMO:
+        raise ValueError("Mensaje demasiado largo para el módulo")
+    datos = HASH_ETIQUETA + bytes(k - len(mensaje) - RELLENO_MINIMO) + b"\x01" + mensaje
+    semilla = os.urandom(LONGITUD_HASH)
+    datos = utils.xor(datos, _mgf1(semilla, k - LONGITUD_HASH - 1))
+    semilla = utils.xor(semilla, _mgf1(datos, LONGITUD_HASH))
+    return b"\x00" + semilla + datos
+
+def quita_relleno(bloque):
+    """Quita el relleno OAEP de un bloque
+
+    Se hacen todas las comprobaciones antes de decidir si el relleno es correcto, y cualquier fallo produce el mismo
+    error, para no dar pistas sobre cuál ha fallado.
+
+    :param bloque: bytes (k bytes)
+    :return: el mensaje (bytes)
+    """
+    semilla, datos = bloque[1:LONGITUD_HASH + 1], bloque[LONGITUD_HASH + 1:]
+    semilla = utils.xor(semilla, _mgf1(datos, LONGITUD_HASH))
+    datos = utils.xor(datos, _mgf1(semilla, len(datos)))
+    resto = datos[LONGITUD_HASH:]
+    separador = len(resto) - len(resto.lstrip(b"\x00"))
+    correcto = bloque[0] == 0
+    correcto &= hmac.compare_digest(datos[:LONGITUD_HASH], HASH_ETIQUETA)
+    correcto &= resto[separador:separador + 1] == b"\x01"
+    if not correcto:
+        raise ValueError("Error de desencriptación")
+    return resto[separador + 1:]
+
+def cifra_bloques(datos, n, e):
+    """Encripta datos de cualquier longitud con la clave pública, bloque a bloque
+
+    :param datos: bytes
+    :param n: orden (módulo)
+    :param e: clave pública
+    :return: bytes encriptados (k bytes por bloque de como mucho k - RELLENO_MINIMO bytes de datos)
+    """
+    k = (n.bit_length() + 7) // 8
+    tam = k - RELLENO_MINIMO
+    resul = bytearray()
+    for i in range(0, len(datos), tam):
+        m = int.from_bytes(rellena(datos[i:i + tam], k), "big")
+        resul += pow(m, e, n).to_bytes(k, "big")
+    return bytes(resul)
+
+def descifra_bloques(datos, privada):
+    """Desencripta datos encriptados con cifra_bloques(), con la clave privada en forma TCR (ver rsa.claves_rsa_tcr())
+
+    :param datos: bytes (múltiplo de k bytes)
+    :param privada: clave privada en forma TCR
+    :return: bytes desencriptados
+    """
+    n = math.prod(privada[1])
+    k = (n.bit_length() + 7) // 8
+    # Todos los errores son el mismo (ver quita_relleno()):
+    if len(datos) % k:
+        raise ValueError("Error de desencriptación")
+    resul = bytearray()
+    for i in range(0, len(datos), k):
+        c = int.from_bytes(datos[i:i + k], "big")
+        if c >= n:
+            raise ValueError("Error de desencriptación")
+        resul += quita_relleno(rsa.privada_tcr(c, privada).to_bytes(k, "big"))
+    return bytes(resul)
+
+def _cifra_trozo(tarea):
+    """Encripta un trozo de datos (función ejecutada por los procesos del pool)
+
+    :param tarea: tupla (datos, n, e)
+    :return: bytes encriptados
+    """
+    return cifra_bloques(*tarea)
+
+def _descifra_trozo(tarea):
+    """Desencripta un trozo de datos (función ejecutada por los procesos del pool)
+
+    :param tarea: tupla (datos, clave privada)
+    :return: bytes desencriptados
+    """
+    return descifra_bloques(*tarea)
+
+def _trozos(f, tam):
+    """Generador de los trozos de un archivo
+
+    :param f: archivo abierto en modo binario
+    :param tam: tamaño de cada trozo
+    :return: generador de bytes
+    """
+    while trozo := f.read(tam):
+        yield trozo
+
+def cifra_archivo(origen, destino, n, e, procesos=1):
+    """Encripta un archivo con la clave pública, por trozos de BLOQUES_POR_TAREA bloques
+
+    Los trozos se reparten entre los procesos (ver utils.procesa_ordenado()), con un número limitado de trozos en curso,
+    de forma que la memoria no depende del tamaño del archivo.
+
+    :param origen: ruta del archivo a encriptar
+    :param destino: ruta del archivo encriptado
+    :param n: orden (módulo)
+    :param e: clave pública
+    :param procesos: número de procesos (1 para hacerlo todo en el proceso actual)
+    :return: bytes escritos
+    """
+    tam = ((n.bit_length() + 7) // 8 - RELLENO_MINIMO) * BLOQUES_POR_TAREA
+    escritos = 0
+    with open(origen, "rb") as f, open(destino, "wb") as g:
+        tareas = ((trozo, n, e) for trozo in _trozos(f, tam))
+        for cifrado in utils.procesa_ordenado(_cifra_trozo, tareas, procesos):
+            g.write(cifrado)
+            escritos += len(cifrado)
+    return escritos
+
+def descifra_archivo(origen, destino, privada, procesos=1):
+    """Desencripta un archivo encriptado con cifra_archivo(), con la clave privada en forma TCR
+
+    :param origen: ruta del archivo encriptado
+    :param destino: ruta del archivo desencriptado
+    :param privada: clave privada en forma TCR (ver rsa.claves_rsa_tcr())
+    :param procesos: número de procesos (1 para hacerlo todo en el proceso actual)
+    :return: bytes escritos
+    """
+    tam = (math.prod(privada[1]).bit_length() + 7) // 8 * BLOQUES_POR_TAREA
+    escritos = 0
+    with open(origen, "rb") as f, open(destino, "wb") as g:
+        tareas = ((trozo, privada) for trozo in _trozos(f, tam))
+        for descifrado in utils.procesa_ordenado(_descifra_trozo, tareas, procesos):
+            g.write(descifrado)
+            escritos += len(descifrado)
+    return escritos
+
+def _claves_menu():
+    """Retorna las claves del menú, generándolas la primera vez (n de 2048 bits)
+
+    :return: tupla (n, e, clave privada en forma TCR)
+    """
+    global _claves
+    if _claves is None:
+        print("Generando claves (n de 2048 bits)...")
+        _claves = rsa.genera_claves_rsa_tcr(1024)
+    return _claves
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_cifra():
+    """Encripta un archivo con la clave pública de la sesión"""
+    n, e, _ = _claves_menu()
+    origen = input("Archivo a encriptar: ")
+    destino = input("Archivo encriptado: ")
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    print(f"{destino} escrito ({cifra_archivo(origen, destino, n, e, procesos)} bytes).")
+
+def menu_descifra():
+    """Desencripta un archivo con la clave privada de la sesión"""
+    _, _, privada = _claves_menu()
+    origen = input("Archivo encriptado: ")
+    destino = input("Archivo desencriptado: ")
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    print(f"{destino} escrito ({descifra_archivo(origen, destino, privada, procesos)} bytes).")
+
+def menu_benchmark():
+    """Encripta y desencripta un archivo de datos aleatorios, y mide la velocidad"""
+    n, e, privada = _claves_menu()
+    kb = utils.input_int("Tamaño del archivo en KB (1-65536, por defecto 256)", range(1, 65537), 256)
+    procesos = utils.input_int(f"Número de procesos (por defecto {multiprocessing.cpu_count()})", range(1, 257),
+                               multiprocessing.cpu_count())
+    with tempfile.TemporaryDirectory() as directorio:
+        original, cifrado, descifrado = (os.path.join(directorio, nombre) for nombre in ("original", "cifrado",
+                                                                                         "descifrado"))
+        with open(original, "wb") as f:
+            f.write(os.urandom(kb * 1024))
+        inicio = time.perf_counter()
+        cifra_archivo(original, cifrado, n, e, procesos)
+        t_cifra = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        descifra_archivo(cifrado, descifrado, privada, procesos)
+        t_descifra = time.perf_counter() - inicio
+        with open(original, "rb") as f, open(descifrado, "rb") as g:
+            assert f.read() == g.read()
+    print(f"Encriptación (clave pública): {kb / 1024 / t_cifra:.2f} MB/s")
+    print(f"Desencriptación (clave privada, TCR): {kb / 1024 / t_descifra:.3f} MB/s")
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Encriptar archivo", menu_cifra),
+    ("Desencriptar archivo", menu_descifra),
+    ("Medir rendimiento", menu_benchmark)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    # Bucle principal:
+    utils.menu(opciones_menu)
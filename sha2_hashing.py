@@ -2,101 +2,300 @@
 
 # Algoritmos de hashing SHA-2, específicamente SHA-224, SHA-256, SHA-384 y SHA-512.
 #
-# La función correspondiente al algoritmo SHA-256, sha256(), está comentada completamente. El resto de
-# vesiones documenta las diferencias con esta.
+# Las cuatro variantes comparten el mismo motor de compresión, _comprime(), que está comentado completamente
+# (siguiendo el caso de SHA-256). Lo único que cambia entre ellas son los parámetros de _PARAMETROS y las tablas
+# de constantes H y K.
 
 import os
+import struct
+import time
+import importlib
+import hashing
+import primos
 import utils
 import json
-import decimal
+import sha2_constantes
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él, los lotes se calculan mensaje a mensaje
+    np = None
+
+# Variables globales ***************************************************************************************************
+
+# Parámetros de cada variante:
+#     ancho de palabra (bits), tamaño de bloque (bytes), número de rondas, bytes que ocupa la longitud del mensaje en
+#     el padding, bytes del digest, y desplazamientos de sigma0, sigma1, SUM0 y SUM1 (el último de las sigma es un
+#     desplazamiento simple, no una rotación)
+_PARAMETROS = {
+    "SHA-224": (32, 64, 64, 8, 28, (7, 18, 3), (17, 19, 10), (2, 13, 22), (6, 11, 25)),
+    "SHA-256": (32, 64, 64, 8, 32, (7, 18, 3), (17, 19, 10), (2, 13, 22), (6, 11, 25)),
+    "SHA-384": (64, 128, 80, 16, 48, (1, 8, 7), (19, 61, 6), (28, 34, 39), (14, 18, 41)),
+    "SHA-512": (64, 128, 80, 16, 64, (1, 8, 7), (19, 61, 6), (28, 34, 39), (14, 18, 41))
+}
+
+# Padding de un mensaje de 32 bytes en SHA-256 (b'\x80', ceros y la longitud, 256 bits):
+_RELLENO_32 = b'\x80' + 23 * b'\x00' + (256).to_bytes(8, 'big')
+
+# Número mínimo de mensajes de la misma longitud para calcularlos a la vez con NumPy (sha256_many(), etc.):
+MIN_LOTE = 16
+
+# Valores de FIPS 180-4 con los que se verifican las tablas generadas: H[0], K[0], último K, y digests de ejemplo:
+_FIPS = {
+    "SHA-224": (0xc1059ed8, 0x428a2f98, 0xc67178f2, (
+        (b"abc", "23097d223405d8228642a477bda255b32aadbce4bda0b3f7e36c9da7"),
+        (b"abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+         "75388b16512776cc5dba5da1fd890150b0c6455cb4f58b1952522525"))),
+    "SHA-256": (0x6a09e667, 0x428a2f98, 0xc67178f2, (
+        (b"abc", "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"),
+        (b"abcdbcdecdefdefgefghfghighijhijkijkljklmklmnlmnomnopnopq",
+         "248d6a61d20638b8e5c026930c3e6039a33ce45964ff2167f6ecedd419db06c1"))),
+    "SHA-384": (0xcbbb9d5dc1059ed8, 0x428a2f98d728ae22, 0x6c44198c4a475817, (
+        (b"abc", "cb00753f45a35e8bb5a03d699ac65007272c32ab0eded1631a8b605a43ff5bed"
+                 "8086072ba1e7cc2358baeca134c825a7"),
+        (b"abcdefghbcdefghicdefghijdefghijkefghijklfghijklmghijklmnhijklmnoijklmnopjklmnopqklmnopqrlmnopqrsmnopqrst"
+         b"nopqrstu",
+         "09330c33f71147e83d192fc782cd1b4753111b173b3b05d22fa08086e3b0f712fcc7c71a557e2db966c3e9fa91746039"))),
+    "SHA-512": (0x6a09e667f3bcc908, 0x428a2f98d728ae22, 0x6c44198c4a475817, (
+        (b"abc", "ddaf35a193617abacc417349ae20413112e6fa4e89a97ea20a9eeee64b55d39a"
+                 "2192992a274fc1a836ba3c23a3feebbd454d4423643ce80e2a9ac94fa54ca49f"),
+        (b"abcdefghbcdefghicdefghijdefghijkefghijklfghijklmghijklmnhijklmnoijklmnopjklmnopqklmnopqrlmnopqrsmnopqrst"
+         b"nopqrstu",
+         "8e959b75dae313da8cf4f72814fc143f8f7779c6eb9f7fa17299aeadb6889018"
+         "501d289e4900f7e4331b99dec4b5433ac7d329eeb6dd26545e96e55b874be909")))
+}
+
+# Motor de compresión **************************************************************************************************
+
+def _tablas(variante):
+    """Retorna las tablas de constantes (H, K) de la variante indicada
+
+    Las tablas están en el módulo sha2_constantes, generado por menu_generatabs(); no se lee ningún archivo.
+
+    :param variante: nombre de la variante ("SHA-224", "SHA-256", "SHA-384" o "SHA-512")
+    :return: tupla (H, K), ambas tuplas de enteros
+    """
+    return sha2_constantes.TABLAS[variante]
+
+def _rellena(ms, parametros):
+    """Retorna el mensaje con el padding añadido, listo para dividir en bloques (solo para mensajes cortos)
+
+    :param ms: Mensaje de entrada (bytes)
+    :param parametros: parámetros de la variante (ver _PARAMETROS)
+    :return: el mensaje con padding (bytes)
+    """
+    bloque, bytes_longitud = parametros[1], parametros[3]
+    return bytes(ms) + b'\x80' + (-len(ms) - 1 - bytes_longitud) % bloque * b'\x00' \
+        + (len(ms) * 8).to_bytes(bytes_longitud, 'big')
+
+def _comprime(H, K, datos, inicio, parametros):
+    """Aplica la función de compresión SHA-2 a un bloque del mensaje
+
+    :param H: valor hash actual (tupla de 8 enteros)
+    :param K: tabla de constantes K de la variante (tupla de enteros)
+    :param datos: bytes (o memoryview, bytearray) que contienen el bloque
+    :param inicio: posición del bloque dentro de datos
+    :param parametros: parámetros de la variante (ver _PARAMETROS)
+    :return: el nuevo valor hash (tupla de 8 enteros)
+    """
+    ancho, _, _, _, _, (s00, s01, s02), (s10, s11, s12), (S00, S01, S02), (S10, S11, S12) = parametros
+    # Todos los enteros, si no se dice lo contrario, son de 'ancho' bits (32 o 64), Big Endian, y toda suma es módulo
+    # 2^ancho. Para no llamar a utils.rr() cientos de veces por bloque, las rotaciones se escriben directamente:
+    # rr(x, n) = (x >> n | x << (ancho - n)), y el módulo 2^ancho se aplica con una sola máscara al final.
+    mascara = (1 << ancho) - 1
+    # El bloque se divide en 16 palabras: W[0..15] = M[0..15]. Las leemos directamente de 'datos', sin copiarlas:
+    W = list(struct.unpack_from(">16I" if ancho == 32 else ">16Q", datos, inicio))
+    # El resto de valores W[16..rondas-1] se calculan así:
+    #     W[t] = sigma0(W[t-15]) + W[t-16] + sigma1(W[t-2]) + W[t-7]
+    # donde (con los desplazamientos de SHA-256):
+    #     sigma0(x) = rr(x,7) xor rr(x,18) xor shr(x,3)
+    #     sigma1(x) = rr(x,17) xor rr(x,19) xor shr(x,10)
+    t00, t01 = ancho - s00, ancho - s01
+    t10, t11 = ancho - s10, ancho - s11
+    for t in range(16, len(K)):
+        x = W[t - 15]
+        s0 = ((x >> s00 | x << t00) ^ (x >> s01 | x << t01) ^ (x >> s02)) & mascara
+        x = W[t - 2]
+        s1 = ((x >> s10 | x << t10) ^ (x >> s11 | x << t11) ^ (x >> s12)) & mascara
+        W.append((s0 + W[t - 16] + s1 + W[t - 7]) & mascara)
+    # Inicializamos las variables a..h al valor hash actual, para aplicar la "función de compresión":
+    a, b, c, d, e, f, g, h = H
+    T00, T01, T02 = ancho - S00, ancho - S01, ancho - S02
+    T10, T11, T12 = ancho - S10, ancho - S11, ancho - S12
+    # La función de compresión consiste en una iteración por ronda. Cada iteración calcula dos enteros T1 y T2, y
+    # luego realiza algunos cambios a las variables a..h:
+    #     T1 = h + SUM1(e) + ch(e,f,g) + K[i] + W[i]
+    #     T2 = SUM0(a) + maj(a,b,c)
+    # Y tenemos que (con los desplazamientos de SHA-256):
+    #     SUM0(x) = rr(x,2) xor rr(x,13) xor rr(x,22)
+    #     SUM1(x) = rr(x,6) xor rr(x,11) xor rr(x,25)
+    #     ch(x,y,z) bitwise choice, si x=0, da z; si x=1, da y
+    #     maj(x,y,z) bitwise majority, si hay más 1's que 0's, es 1; si hay más 0's que 1's es 0
+    for k, w in zip(K, W):
+        S1 = ((e >> S10 | e << T10) ^ (e >> S11 | e << T11) ^ (e >> S12 | e << T12)) & mascara
+        T1 = h + S1 + ((e & f) ^ (~e & g)) + k + w
+        S0 = ((a >> S00 | a << T00) ^ (a >> S01 | a << T01) ^ (a >> S02 | a << T02)) & mascara
+        T2 = S0 + ((a & b) ^ (a & c) ^ (b & c))
+        # Cambiamos las variables a..h:
+        h = g
+        g = f
+        f = e
+        e = (d + T1) & mascara
+        d = c
+        c = b
+        b = a
+        a = (T1 + T2) & mascara
+    # Ya tenemos el resultado de la función de compresión, que es a..h. Sumaremos esto al valor hash actual:
+    return (
+        (H[0] + a) & mascara, (H[1] + b) & mascara, (H[2] + c) & mascara, (H[3] + d) & mascara,
+        (H[4] + e) & mascara, (H[5] + f) & mascara, (H[6] + g) & mascara, (H[7] + h) & mascara
+    )
+
+# Clase HashSHA2 *******************************************************************************************************
+
+class HashSHA2:
+    """Objeto de hashing incremental, al estilo de hashlib, para cualquiera de las variantes SHA-2
+
+    El mensaje se puede ir pasando por trozos, mediante update(), y en cualquier momento se puede obtener el digest de lo
+    recibido hasta entonces. Los bloques completos se procesan al vuelo, directamente sobre los datos recibidos, con lo
+    que solo se guarda en memoria el último bloque incompleto (el padding solo se aplica a este).
+    """
+
+    def __init__(self, variante="SHA-256", datos=b""):
+        """Inicializa el objeto con el valor hash inicial de la variante
+
+        :param variante: nombre de la variante: "SHA-224", "SHA-256", "SHA-384" o "SHA-512"
+        :param datos: primer trozo del mensaje (bytes o cualquier objeto que admita memoryview)
+        """
+        self._parametros = _PARAMETROS[variante]
+        self._H, self._K = _tablas(variante)
+        self._pendiente = bytearray()  # último bloque incompleto recibido
+        self._longitud = 0  # longitud total del mensaje recibido (bytes)
+        self.name = variante.replace("-", "").lower()  # nombre como en hashlib ("sha256", etc.)
+        self.block_size = self._parametros[1]
+        self.digest_size = self._parametros[4]
+        if datos:
+            self.update(datos)
+
+    def update(self, datos):
+        """Añade un trozo al mensaje
+
+        :param datos: trozo del mensaje (bytes o cualquier objeto que admita memoryview)
+        """
+        vista = memoryview(datos).cast("B")
+        self._longitud += len(vista)
+        bloque, parametros, H, K = self.block_size, self._parametros, self._H, self._K
+        inicio = 0
+        # Si quedaba un bloque a medias, lo completamos primero:
+        if self._pendiente:
+            inicio = bloque - len(self._pendiente)
+            self._pendiente += vista[:inicio]
+            if len(self._pendiente) < bloque:
+                return
+            H = _comprime(H, K, self._pendiente, 0, parametros)
+            self._pendiente.clear()
+        # Los bloques completos se procesan directamente sobre los datos, sin copiarlos:
+        fin = inicio + (len(vista) - inicio) // bloque * bloque
+        for i in range(inicio, fin, bloque):
+            H = _comprime(H, K, vista, i, parametros)
+        self._pendiente += vista[fin:]
+        self._H = H
+
+    def copy(self):
+        """Retorna una copia independiente del objeto, con el mismo estado
+
+        :return: la copia (HashSHA2)
+        """
+        copia = object.__new__(HashSHA2)
+        copia.__dict__.update(self.__dict__)
+        copia._pendiente = bytearray(self._pendiente)
+        return copia
+
+    def digest(self):
+        """Retorna el digest del mensaje recibido hasta ahora (no modifica el estado del objeto)
+
+        :return: el digest (bytes)
+        """
+        ancho, bloque, _, bytes_longitud, bytes_digest = self._parametros[:5]
+        # Relleno del mensaje: la longitud tiene que ser bloque - bytes_longitud tras aplicar módulo bloque (56 bytes
+        # módulo 64 en SHA-256). El relleno consiste en un bit '1' (obligatorio) seguido de todos los bits '0'
+        # necesarios, es decir un byte b'\x80' (0b10000000) seguido, opcionalmente, de los bytes b'\x00' necesarios. Al
+        # final se añade la longitud (en bits) del mensaje inicial, como entero Big Endian de bytes_longitud bytes
+        # (64 bits en SHA-256, 128 bits en SHA-512). Solo afecta al último bloque incompleto.
+        cola = self._pendiente + b'\x80'
+        cola += (-len(cola) - bytes_longitud) % bloque * b'\x00'
+        cola += (self._longitud * 8).to_bytes(bytes_longitud, 'big')
+        H = self._H
+        for inicio in range(0, len(cola), bloque):
+            H = _comprime(H, self._K, cola, inicio, self._parametros)
+        # El hash es la concatenación de los enteros H[0..7] (truncada en SHA-224 y SHA-384):
+        return struct.pack(">8I" if ancho == 32 else ">8Q", *H)[:bytes_digest]
+
+    def hexdigest(self):
+        """Retorna el digest del mensaje recibido hasta ahora, en hexadecimal
+
+        :return: el digest (string)
+        """
+        return self.digest().hex()
 
 # Funciones auxiliares *************************************************************************************************
 
+def new(variante="SHA-256", datos=b""):
+    """Crea un objeto de hashing incremental (como hashlib.new())
+
+    :param variante: "SHA-224", "SHA-256", "SHA-384" o "SHA-512" (también se aceptan "sha256", etc.)
+    :param datos: primer trozo del mensaje (bytes)
+    :return: el objeto creado (HashSHA2)
+    """
+    variante = variante.upper()
+    if "-" not in variante:
+        variante = variante[:3] + "-" + variante[3:]
+    return HashSHA2(variante, datos)
+
+def _digest(ms, variante):
+    """Retorna el digest del mensaje de entrada (bytes), aplicando la variante SHA-2 indicada
+
+    Los mensajes cortos, que tras el padding ocupan uno o dos bloques (p.e. claves públicas de 33 o 65 bytes, o
+    digests de 32 bytes), se rellenan y comprimen directamente, sin pasar por un objeto HashSHA2.
+
+    :param ms: Mensaje de entrada (bytes)
+    :param variante: nombre de la variante ("SHA-224", "SHA-256", "SHA-384" o "SHA-512")
+    :return: El digest resultante (bytes)
+    """
+    parametros = _PARAMETROS[variante]
+    ancho, bloque, _, bytes_longitud, bytes_digest = parametros[:5]
+    if len(ms) >= 2 * bloque - bytes_longitud:
+        return HashSHA2(variante, ms).digest()
+    H, K = _tablas(variante)
+    datos = _rellena(ms, parametros)
+    H = _comprime(H, K, datos, 0, parametros)
+    if len(datos) > bloque:
+        H = _comprime(H, K, datos, bloque, parametros)
+    return struct.pack(">8I" if ancho == 32 else ">8Q", *H)[:bytes_digest]
+
+def hash256(ms, formato="bytes"):
+    """Retorna el doble SHA-256 del mensaje de entrada, SHA-256(SHA-256(ms)), usado por Bitcoin (checksums, etc.)
+
+    La entrada del segundo SHA-256 es siempre de 32 bytes, con lo que ocupa un solo bloque con un padding constante.
+
+    :param ms: Mensaje de entrada (bytes)
+    :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
+    :return: El digest resultante
+    """
+    H, K = _tablas("SHA-256")
+    H = _comprime(H, K, _digest(ms, "SHA-256") + _RELLENO_32, 0, _PARAMETROS["SHA-256"])
+    return hashing.formatea(struct.pack(">8I", *H), formato)
+
 def sha224(ms, formato="hex"):
     """
     Retorna el digest del mensaje de entrada, aplicando SHA-224
 
+    Es igual que SHA-256, pero con otros valores iniciales de H, y descartando H[7] del resultado.
+
     :param ms: Mensaje de entrada (bytes)
     :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
     :return: El digest resultante
     """
-    # Leemos el archivo de constantes:
-    with open("datos/hash.json", "rt") as fjson:
-        constantes = json.load(fjson)
-    # Al ser la función prácticamente igual a sha256(), solo se comentan las diferencias. El resto, sin comentar.
-    longitud = len(ms) * 8
-    ms += b'\x80'
-    if len(ms) % 64 == 56:
-        bytes0_padding = 0
-    elif len(ms) % 64 < 56:
-        bytes0_padding = 56 - (len(ms) % 64)
-    else:
-        bytes0_padding = 120 - (len(ms) % 64)
-    ms += bytes0_padding * b'\x00'
-    long64 = longitud.to_bytes(8, 'big')
-    ms += long64
-    bloques = [ms[i:i+64] for i in range(0, len(ms), 64)]
-    H = []
-    for i in range(8):
-        hexstr = constantes['SHA-224']['h'][i]  # Estos valores son distintos que en el caso de SHA-256
-        H.append(int(hexstr[2:], 16))
-    K = []
-    for i in range(64):
-        hexstr = constantes['SHA-224']['k'][i]
-        K.append(int(hexstr[2:], 16))
-    for bloque in bloques:
-        M = [bloque[i:i + 4] for i in range(0, len(bloque), 4)]
-        W = []
-        for m in M:
-            W.append(int.from_bytes(m, 'big'))
-        for t in range(16, 64):
-            s0 = utils.rr(W[t - 15], 7, 32) ^ utils.rr(W[t - 15], 18, 32) ^ (W[t - 15] >> 3)
-            s1 = utils.rr(W[t - 2], 17, 32) ^ utils.rr(W[t - 2], 19, 32) ^ (W[t - 2] >>  10)
-            nextW = (s0 + W[t - 16] + s1 + W[t - 7]) % 0x100000000
-            W.append(nextW)
-        a = H[0]
-        b = H[1]
-        c = H[2]
-        d = H[3]
-        e = H[4]
-        f = H[5]
-        g = H[6]
-        h = H[7]
-        for i in range(64):
-            S1 = utils.rr(e, 6, 32) ^ utils.rr(e, 11, 32) ^ utils.rr(e, 25, 32)
-            ch = (e & f) ^ ((~e) & g)
-            T1 = (h + S1 + ch + K[i] + W[i]) % 0x100000000
-            S0 = utils.rr(a, 2, 32) ^ utils.rr(a, 13, 32) ^ utils.rr(a, 22, 32)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            T2 = (S0 + maj) % 0x100000000
-            h = g
-            g = f
-            f = e
-            e = (d + T1) % 0x100000000
-            d = c
-            c = b
-            b = a
-            a = (T1 + T2) % 0x100000000
-        H[0] = (H[0] + a) % 0x100000000
-        H[1] = (H[1] + b) % 0x100000000
-        H[2] = (H[2] + c) % 0x100000000
-        H[3] = (H[3] + d) % 0x100000000
-        H[4] = (H[4] + e) % 0x100000000
-        H[5] = (H[5] + f) % 0x100000000
-        H[6] = (H[6] + g) % 0x100000000
-        H[7] = (H[7] + h) % 0x100000000
-    resultado = 0
-    for i in range(7):  # A diferencia de SHA-256, H[7] se descarta, quedando solo H[0..6]
-        resultado += H[i] << (32 * (6 - i))
-    if formato == "hex":
-        return utils.int2hex(resultado, 56, "")
-    if formato == "bin":
-        return utils.int2bin(resultado, 224, "")
-    if formato == "bytes":
-        return resultado.to_bytes(28, "big")
-    if formato == "int":
-        return resultado
-    return None
+    return hashing.formatea(_digest(ms, "SHA-224"), formato)
 
 def sha256(ms, formato="hex"):
     """
@@ -106,391 +305,281 @@ def sha256(ms, formato="hex"):
     :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
     :return: El digest resultante
     """
-    # Leemos el archivo de constantes:
-    with open("datos/hash.json", "rt") as fjson:
-        constantes = json.load(fjson)
-    # Todos los enteros, si no se dice lo contrario, son de 32 bits, Big Endian, y toda suma es módulo 2^32.
-    # Se asume que la longitud en bits del mensaje de entrada es siempre múltiplo de 8 (porque la entrada es en bytes).
-    longitud = len(ms) * 8  # longitud del mensaje inicial en bits
-    # Relleno del mensaje: longitud tiene que ser 448 bits tras aplicar módulo 512, es decir, 56 bytes tras
-    # aplicar módulo 64. El relleno consiste en un bit '1' (obligatorio) seguido de todos los bits '0' necesarios, es
-    # decir un byte b'\x80' (0b10000000) seguido, opcionalmente, de los bytes b'\x00' (0b00000000) necesarios.
-    # Primero añadimos el byte b'\x80' (siempre):
-    ms += b'\x80'  # como hay que añadir un bit 1 de padding, seguro que por lo menos hay que añadir también 7 ceros
-    # Ahora calcularemos el número de bytes b'\x00' adicionales necesarios:
-    if len(ms) % 64 == 56:
-        bytes0_padding = 0
-    elif len(ms) % 64 < 56:
-        bytes0_padding = 56 - (len(ms) % 64)  # los que faltan para 56
-    else:  # len(ms) % 64 > 56
-        bytes0_padding = 120 - (len(ms) % 64)  # 64 - (len(ms) % 64) + 56: los que faltan para 64, más otros 56
-    # Ahora los añadimos:
-    ms += bytes0_padding * b'\x00'
-    # Ahora hay que añadirle un entero de 64 bits (8 bytes) Big Endian con la longitud (en bits) del mensaje inicial.
-    # Tranquilos, 64 bits son suficientes para expresar una longitud de más de 2 millones de terabytes.
-    long64 = longitud.to_bytes(8, 'big')
-    ms += long64
-    # Ya está preparado el mensaje en 'ms'. Ahora dividimos el mensaje en bloques de 512 bits (64 bytes), y realizamos
-    # la misma operación sobre cada uno de estos bloques.
-    bloques = [ms[i:i+64] for i in range(0, len(ms), 64)]
-    # En cada iteración (una por bloque de 512 bits), los valores de H[0..7] irán cambiando. Al final el digest será
-    # la concatenación de estos H[0..7]. Los llamaremos "el valor hash".
-    # Los inicializamos primero, antes de empezar las iteraciones:
-    H = []
-    for i in range(8):
-        hexstr = constantes['SHA-256']['h'][i]
-        H.append(int(hexstr[2:], 16))
-    # También inicializaremos las constantes K[0..63]:
-    K = []
-    for i in range(64):
-        hexstr = constantes['SHA-256']['k'][i]
-        K.append(int(hexstr[2:], 16))
-    # Empezamos ya las iteraciones (1 por cada 512 bits del mensaje):
-    for bloque in bloques:
-        # El bloque de 512 bits se divide en 16 partes de 32 bits (4 bytes)
-        M = [bloque[i:i + 4] for i in range(0, len(bloque), 4)]  # M[0..15] -> el bloque en 16 partes de 4 bytes
-        # Vamos a crear ahora 64 valores W[0..63], de manera que:
-        #     W[0..15] = M[0..15]
-        #     Para t>15:
-        #     W[t] = sigma0(W[t-15]) + W[t-16] + sigma1(W[t-2]) + W[t-7]
-        # Recordemos que las sumas son módulo 2^32, definamos sigma0() y sigma1():
-        #     sigma0(x) = rr(x,7) xor rr(x,18) xor shr(x,3)
-        #     sigma1(x) = rr(x,17) xor rr(x,19) xor shr(x,10)
-        W = []
-        for m in M:  # primeros 16, convertidos de bytes a int
-            W.append(int.from_bytes(m, 'big'))
-        for t in range(16, 64):  # resto
-            s0 = utils.rr(W[t - 15], 7, 32) ^ utils.rr(W[t - 15], 18, 32) ^ (W[t - 15] >> 3)
-            s1 = utils.rr(W[t - 2], 17, 32) ^ utils.rr(W[t - 2], 19, 32) ^ (W[t - 2] >>  10)
-            nextW = (s0 + W[t - 16] + s1 + W[t - 7]) % 0x100000000
-            W.append(nextW)
-        # Ya tenemos los W[0..63]
-        # Ahora inicializamos las variables a..h al valor hash actual, para aplicar la "función de compresión":
-        a = H[0]
-        b = H[1]
-        c = H[2]
-        d = H[3]
-        e = H[4]
-        f = H[5]
-        g = H[6]
-        h = H[7]
-        # Ahora aplicaremos la función de compresión, que consiste en 64 iteraciones. Cada iteración, lo que
-        # hace es calcular dos enteros T1 y T2, y luego realizar algunos cambios a las variables a..h:
-        for i in range(64):
-            # Como siempre, las sumas son módulo 2^32:
-            #     T1 = h + SUM1(e) + ch(e,f,g) + K[i] + W[i]
-            #     T2 = SUM0(a) + maj(a,b,c)
-            # Y tenemos que:
-            #     SUM0(x) = rr(x,2) xor rr(x,13) xor rr(x,22)
-            #     SUM1(x) = rr(x,6) xor rr(x,11) xor rr(x,25)
-            #     ch(x,y,z) bitwise choice, si x=0, da z; si x=1, da y
-            #     maj(x,y,z) bitwise majority, si hay más 1's que 0's, es 1; si hay más 0's que 1's es 0
-            S1 = utils.rr(e, 6, 32) ^ utils.rr(e, 11, 32) ^ utils.rr(e, 25, 32)
-            ch = (e & f) ^ ((~e) & g)
-            T1 = (h + S1 + ch + K[i] + W[i]) % 0x100000000
-            S0 = utils.rr(a, 2, 32) ^ utils.rr(a, 13, 32) ^ utils.rr(a, 22, 32)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            T2 = (S0 + maj) % 0x100000000
-            # Cambiamos las variables a..h:
-            h = g
-            g = f
-            f = e
-            e = (d + T1) % 0x100000000
-            d = c
-            c = b
-            b = a
-            a = (T1 + T2) % 0x100000000
-        # Ya tenemos el resultado de la función de compresión, que es a..h. Sumaremos esto al valor hash actual:
-        H[0] = (H[0] + a) % 0x100000000
-        H[1] = (H[1] + b) % 0x100000000
-        H[2] = (H[2] + c) % 0x100000000
-        H[3] = (H[3] + d) % 0x100000000
-        H[4] = (H[4] + e) % 0x100000000
-        H[5] = (H[5] + f) % 0x100000000
-        H[6] = (H[6] + g) % 0x100000000
-        H[7] = (H[7] + h) % 0x100000000
-    # Hemos terminado. El hash es la concatenación de los enteros H[0..7]:
-    resultado = 0
-    for i in range(8):
-        resultado += H[i] << (32 * (7 - i))
-    # Formateamos el resultado y lo retornamos:
-    if formato == "hex":
-        return utils.int2hex(resultado, 64, "")
-    if formato == "bin":
-        return utils.int2bin(resultado, 256, "")
-    if formato == "bytes":
-        return resultado.to_bytes(32, "big")
-    if formato == "int":
-        return resultado
-    return None
+    return hashing.formatea(_digest(ms, "SHA-256"), formato)
 
 def sha384(ms, formato="hex"):
     """
     Retorna el digest del mensaje de entrada, aplicando SHA-384
 
+    Es igual que SHA-512, pero con otros valores iniciales de H, y descartando H[6] y H[7] del resultado.
+
     :param ms: Mensaje de entrada (bytes)
     :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
     :return: El digest resultante
     """
-    # Leemos el archivo de constantes:
-    with open("datos/hash.json", "rt") as fjson:
-        constantes = json.load(fjson)
-    # Al ser la función prácticamente igual a sha512(), solo se comentan las diferencias con esta.
-    # El resto, sin comentar.
-    longitud = len(ms) * 8
-    ms += b'\x80'
-    if len(ms) % 128 == 112:
-        bytes0_padding = 0
-    elif len(ms) % 128 < 112:
-        bytes0_padding = 112 - (len(ms) % 128)
-    else:
-        bytes0_padding = 240 - (len(ms) % 128)
-    ms += bytes0_padding * b'\x00'
-    long128 = longitud.to_bytes(16, 'big')
-    ms += long128
-    bloques = [ms[i:i+128] for i in range(0, len(ms), 128)]
-    H = []
-    for i in range(8):
-        hexstr = constantes['SHA-384']['h'][i]  # La tabla h propia de SHA-384
-        H.append(int(hexstr[2:], 16))
-    K = []
-    for i in range(80):
-        hexstr = constantes['SHA-384']['k'][i]
-        K.append(int(hexstr[2:], 16))
-    for bloque in bloques:
-        M = [bloque[i:i + 8] for i in range(0, len(bloque), 8)]
-        W = []
-        for m in M:
-            W.append(int.from_bytes(m, 'big'))
-        for t in range(16, 80):
-            s0 = utils.rr(W[t - 15], 1, 64) ^ utils.rr(W[t - 15], 8, 64) ^ (W[t - 15] >> 7)
-            s1 = utils.rr(W[t - 2], 19, 64) ^ utils.rr(W[t - 2], 61, 64) ^ (W[t - 2] >>  6)
-            nextW = (s0 + W[t - 16] + s1 + W[t - 7]) % 0x10000000000000000
-            W.append(nextW)
-        a = H[0]
-        b = H[1]
-        c = H[2]
-        d = H[3]
-        e = H[4]
-        f = H[5]
-        g = H[6]
-        h = H[7]
-        for i in range(80):
-            S1 = utils.rr(e, 14, 64) ^ utils.rr(e, 18, 64) ^ utils.rr(e, 41, 64)
-            ch = (e & f) ^ ((~e) & g)
-            T1 = (h + S1 + ch + K[i] + W[i]) % 0x10000000000000000
-            S0 = utils.rr(a, 28, 64) ^ utils.rr(a, 34, 64) ^ utils.rr(a, 39, 64)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            T2 = (S0 + maj) % 0x10000000000000000
-            h = g
-            g = f
-            f = e
-            e = (d + T1) % 0x10000000000000000
-            d = c
-            c = b
-            b = a
-            a = (T1 + T2) % 0x10000000000000000
-        H[0] = (H[0] + a) % 0x10000000000000000
-        H[1] = (H[1] + b) % 0x10000000000000000
-        H[2] = (H[2] + c) % 0x10000000000000000
-        H[3] = (H[3] + d) % 0x10000000000000000
-        H[4] = (H[4] + e) % 0x10000000000000000
-        H[5] = (H[5] + f) % 0x10000000000000000
-        H[6] = (H[6] + g) % 0x10000000000000000
-        H[7] = (H[7] + h) % 0x10000000000000000
-    resultado = 0
-    for i in range(6):  # En este caso se descartan H[6] y H[7], resultando H[0..5]
-        resultado += H[i] << (64 * (5 - i))
-    if formato == "hex":
-        return utils.int2hex(resultado, 96, "")
-    if formato == "bin":
-        return utils.int2bin(resultado, 384, "")
-    if formato == "bytes":
-        return resultado.to_bytes(48, "big")
-    if formato == "int":
-        return resultado
-    return None
+    return hashing.formatea(_digest(ms, "SHA-384"), formato)
 
 def sha512(ms, formato="hex"):
     """
     Retorna el digest del mensaje de entrada, aplicando SHA-512
 
+    Los enteros son de 64 bits, los bloques de 1024 bits (128 bytes), hay 80 rondas (y 80 constantes K), y la
+    longitud del mensaje en el padding es un entero de 128 bits.
+
     :param ms: Mensaje de entrada (bytes)
     :param formato: Formato de la salida: 'hex' (string), 'bin' (string), 'bytes' (bytes) o 'int' (entero)
     :return: El digest resultante
     """
-    # Leemos el archivo de constantes:
-    with open("datos/hash.json", "rt") as fjson:
-        constantes = json.load(fjson)
-    # Al ser la función prácticamente igual a sha256(), solo se comentan las diferencias con esta.
-    # El resto, sin comentar.
-    # De entrada, los enteros aquí son Big Endian de 64 bits, y las sumas módulo 2^64.
-    longitud = len(ms) * 8
-    # La longitud de padding debe ser 896 bits módulo 1024 (112 bytes módulo 128)
-    ms += b'\x80'
-    if len(ms) % 128 == 112:
-        bytes0_padding = 0
-    elif len(ms) % 128 < 112:
-        bytes0_padding = 112 - (len(ms) % 128)
-    else:
-        bytes0_padding = 240 - (len(ms) % 128)  # 128 - (len(ms) % 128) + 112: los que faltan para 128, más otros 112
-    ms += bytes0_padding * b'\x00'
-    # El entero con la longitud del mensaje inicial es un big endian de 128 bits (16 bytes):
-    long128 = longitud.to_bytes(16, 'big')
-    ms += long128
-    # El mensaje se divide en bloques de 1024 bits (128 bytes)
-    bloques = [ms[i:i+128] for i in range(0, len(ms), 128)]
-    H = []
-    for i in range(8):
-        hexstr = constantes['SHA-512']['h'][i]  # La tabla h propia de SHA-512
-        H.append(int(hexstr[2:], 16))
-    K = []
-    for i in range(80):  # En este caso, son 80 constantes
-        hexstr = constantes['SHA-512']['k'][i]  # La tabla k propia de SHA-512
-        K.append(int(hexstr[2:], 16))
-    for bloque in bloques:
-        M = [bloque[i:i + 8] for i in range(0, len(bloque), 8)]  # se divide el bloque en 16 trozos de 64 bits
-        W = []
-        for m in M:
-            W.append(int.from_bytes(m, 'big'))
-        for t in range(16, 80):  # En este caso, son 80 W's
-            # sigma0(x) = rr(x,1) xor rr(x,8) xor shr(x,7)
-            # sigma1(x) = rr(x,19) xor rr(x,61) xor shr(x,6)
-            s0 = utils.rr(W[t - 15], 1, 64) ^ utils.rr(W[t - 15], 8, 64) ^ (W[t - 15] >> 7)
-            s1 = utils.rr(W[t - 2], 19, 64) ^ utils.rr(W[t - 2], 61, 64) ^ (W[t - 2] >>  6)
-            nextW = (s0 + W[t - 16] + s1 + W[t - 7]) % 0x10000000000000000
-            W.append(nextW)
-        a = H[0]
-        b = H[1]
-        c = H[2]
-        d = H[3]
-        e = H[4]
-        f = H[5]
-        g = H[6]
-        h = H[7]
-        for i in range(80):  # En este caso son 80 rounds
-            # SUM0(x) = rr(x,28) xor rr(x,34) xor rr(x,39)
-            # SUM1(x) = rr(x,14) xor rr(x,18) xor rr(x,41)
-            S1 = utils.rr(e, 14, 64) ^ utils.rr(e, 18, 64) ^ utils.rr(e, 41, 64)
-            ch = (e & f) ^ ((~e) & g)
-            T1 = (h + S1 + ch + K[i] + W[i]) % 0x10000000000000000
-            S0 = utils.rr(a, 28, 64) ^ utils.rr(a, 34, 64) ^ utils.rr(a, 39, 64)
-            maj = (a & b) ^ (a & c) ^ (b & c)
-            T2 = (S0 + maj) % 0x10000000000000000
-            h = g
-            g = f
-            f = e
-            e = (d + T1) % 0x10000000000000000
-            d = c
-            c = b
-            b = a
-            a = (T1 + T2) % 0x10000000000000000
-        H[0] = (H[0] + a) % 0x10000000000000000
-        H[1] = (H[1] + b) % 0x10000000000000000
-        H[2] = (H[2] + c) % 0x10000000000000000
-        H[3] = (H[3] + d) % 0x10000000000000000
-        H[4] = (H[4] + e) % 0x10000000000000000
-        H[5] = (H[5] + f) % 0x10000000000000000
-        H[6] = (H[6] + g) % 0x10000000000000000
-        H[7] = (H[7] + h) % 0x10000000000000000
-    resultado = 0
-    for i in range(8):
-        resultado += H[i] << (64 * (7 - i))
-    if formato == "hex":
-        return utils.int2hex(resultado, 128, "")
-    if formato == "bin":
-        return utils.int2bin(resultado, 512, "")
-    if formato == "bytes":
-        return resultado.to_bytes(64, "big")
-    if formato == "int":
-        return resultado
-    return None
+    return hashing.formatea(_digest(ms, "SHA-512"), formato)
+
+# Lotes de mensajes (NumPy) ********************************************************************************************
+
+def _comprime_lanes(H, K, W, parametros):
+    """Aplica la función de compresión SHA-2 a un bloque de muchos mensajes a la vez (uno por "lane")
+
+    Es el mismo cálculo que _comprime(), pero cada variable es un array de NumPy con un valor por mensaje, de forma que
+    cada operación se aplica a todos los mensajes a la vez. Los arrays son uint32 o uint64, con lo que las sumas son
+    automáticamente módulo 2^32 o 2^64.
+
+    :param H: valor hash actual (lista de 8 arrays)
+    :param K: tabla de constantes K (array del mismo tipo)
+    :param W: palabras del bloque, array de forma (16, número de mensajes)
+    :param parametros: parámetros de la variante (ver _PARAMETROS)
+    :return: el nuevo valor hash (lista de 8 arrays)
+    """
+    ancho, _, rondas = parametros[:3]
+    tipo = K.dtype.type
+    (s00, s01, s02), (s10, s11, s12), (S00, S01, S02), (S10, S11, S12) = (
+        [tipo(n) for n in desplazamientos] for desplazamientos in parametros[5:])
+    t00, t01, t10, t11 = tipo(ancho - s00), tipo(ancho - s01), tipo(ancho - s10), tipo(ancho - s11)
+    T00, T01, T02 = tipo(ancho - S00), tipo(ancho - S01), tipo(ancho - S02)
+    T10, T11, T12 = tipo(ancho - S10), tipo(ancho - S11), tipo(ancho - S12)
+    W = list(W)
+    for t in range(16, rondas):
+        x = W[t - 15]
+        s0 = (x >> s00 | x << t00) ^ (x >> s01 | x << t01) ^ (x >> s02)
+        x = W[t - 2]
+        s1 = (x >> s10 | x << t10) ^ (x >> s11 | x << t11) ^ (x >> s12)
+        W.append(s0 + W[t - 16] + s1 + W[t - 7])
+    a, b, c, d, e, f, g, h = H
+    for i in range(rondas):
+        S1 = (e >> S10 | e << T10) ^ (e >> S11 | e << T11) ^ (e >> S12 | e << T12)
+        T1 = h + S1 + ((e & f) ^ (~e & g)) + K[i] + W[i]
+        S0 = (a >> S00 | a << T00) ^ (a >> S01 | a << T01) ^ (a >> S02 | a << T02)
+        T2 = S0 + ((a & b) ^ (a & c) ^ (b & c))
+        h = g
+        g = f
+        f = e
+        e = d + T1
+        d = c
+        c = b
+        b = a
+        a = T1 + T2
+    return [H[0] + a, H[1] + b, H[2] + c, H[3] + d, H[4] + e, H[5] + f, H[6] + g, H[7] + h]
+
+def _lanes(mensajes, variante):
+    """Calcula el valor hash final de un lote de mensajes de la misma longitud, todos a la vez
+
+    :param mensajes: lista de mensajes (bytes) de la misma longitud, o array uint8 de NumPy con un mensaje por fila
+    :param variante: nombre de la variante ("SHA-224", "SHA-256", "SHA-384" o "SHA-512")
+    :return: array de forma (número de mensajes, 8) con el valor hash H[0..7] de cada mensaje
+    """
+    parametros = _PARAMETROS[variante]
+    ancho, bloque, _, bytes_longitud = parametros[:4]
+    H, K = _tablas(variante)
+    tipo = np.uint32 if ancho == 32 else np.uint64
+    if not isinstance(mensajes, np.ndarray):
+        mensajes = np.frombuffer(b"".join(mensajes), dtype=np.uint8).reshape(len(mensajes), len(mensajes[0]))
+    # Todos los mensajes tienen la misma longitud, y por tanto el mismo padding:
+    longitud = mensajes.shape[1]
+    relleno = b'\x80' + (-longitud - 1 - bytes_longitud) % bloque * b'\x00' \
+        + (longitud * 8).to_bytes(bytes_longitud, 'big')
+    datos = np.empty((len(mensajes), longitud + len(relleno)), dtype=np.uint8)
+    datos[:, :longitud] = mensajes
+    datos[:, longitud:] = np.frombuffer(relleno, dtype=np.uint8)
+    # Pasamos a palabras Big Endian; cada fila de 'palabras' es una palabra de todos los mensajes (un "lane" por
+    # mensaje), lo que permite acceder a W[t] de forma contigua:
+    palabras = datos.view(">u4" if ancho == 32 else ">u8").astype(tipo).T.copy()
+    H = [np.full(len(mensajes), x, dtype=tipo) for x in H]
+    K = np.array(K, dtype=tipo)
+    for inicio in range(0, len(palabras), 16):
+        H = _comprime_lanes(H, K, palabras[inicio:inicio + 16], parametros)
+    return np.stack(H, axis=1)
+
+def _many(mensajes, variante):
+    """Retorna los digests de una lista de mensajes, calculados por lotes de mensajes de igual longitud
+
+    :param mensajes: lista de mensajes (bytes)
+    :param variante: nombre de la variante ("SHA-224", "SHA-256", "SHA-384" o "SHA-512")
+    :return: lista de digests (bytes), en el mismo orden que los mensajes
+    """
+    if np is None:
+        return [_digest(ms, variante) for ms in mensajes]
+    ancho, _, _, _, bytes_digest = _PARAMETROS[variante][:5]
+    # Agrupamos los mensajes por longitud:
+    grupos = {}
+    for i, ms in enumerate(mensajes):
+        grupos.setdefault(len(ms), []).append(i)
+    resul = [None] * len(mensajes)
+    for indices in grupos.values():
+        if len(indices) < MIN_LOTE:  # con pocos mensajes, compensa calcularlos uno a uno
+            for i in indices:
+                resul[i] = _digest(mensajes[i], variante)
+            continue
+        digests = _lanes([bytes(mensajes[i]) for i in indices], variante).astype(">u4" if ancho == 32 else ">u8")
+        bytes_hash = digests.shape[1] * digests.itemsize
+        salida = digests.tobytes()
+        for j, i in enumerate(indices):
+            resul[i] = salida[j * bytes_hash:j * bytes_hash + bytes_digest]
+    return resul
+
+def sha256_many(mensajes):
+    """Retorna los digests SHA-256 de una lista de mensajes, calculados a la vez con NumPy (si está disponible)
+
+    Los mensajes de la misma longitud se procesan juntos, cada uno en un "lane" de los arrays de NumPy. El resultado es
+    idéntico al de sha256(ms, "bytes") para cada mensaje.
+
+    :param mensajes: lista de mensajes (bytes)
+    :return: lista de digests (bytes), en el mismo orden que los mensajes
+    """
+    return _many(mensajes, "SHA-256")
+
+def sha256_lote(datos):
+    """Calcula los digests SHA-256 de un lote de mensajes de la misma longitud, sin salir de NumPy
+
+    Es la versión de sha256_many() para encadenar con otros cálculos vectorizados (p.e. hashing.hash160_many()): tanto
+    la entrada como la salida son arrays, con un mensaje por fila. Requiere NumPy.
+
+    :param datos: array uint8 de forma (número de mensajes, longitud)
+    :return: array uint8 de forma (número de mensajes, 32) con los digests
+    """
+    return _lanes(datos, "SHA-256").astype(">u4").view(np.uint8)
+
+def sha512_many(mensajes):
+    """Retorna los digests SHA-512 de una lista de mensajes, calculados a la vez con NumPy (si está disponible)
+
+    Ver sha256_many().
+
+    :param mensajes: lista de mensajes (bytes)
+    :return: lista de digests (bytes), en el mismo orden que los mensajes
+    """
+    return _many(mensajes, "SHA-512")
+
+# Generación de las tablas *********************************************************************************************
+
+def genera_tablas():
+    """Calcula las tablas H y K de las cuatro variantes a partir de los primeros números primos
+
+    Las constantes son las primeras cifras binarias de la parte fraccional de raíces cuadradas o cúbicas de primos. Se
+    calculan con aritmética entera exacta: los primeros 'b' bits de la parte fraccional de la raíz k-ésima de p son los
+    'b' bits más bajos de la raíz k-ésima entera de p * 2^(k*b), es decir, de la raíz con la coma desplazada 'b'
+    posiciones a la derecha (en binario).
+
+    :return: diccionario {variante: (H, K)}, con H y K tuplas de enteros
+    """
+    # Los 80 primeros números primos (no hace falta ningún archivo para esto):
+    primos_80 = []
+    n = 2
+    while len(primos_80) < 80:
+        if primos.es_primo(n):
+            primos_80.append(n)
+        n += 1
+
+    def fraccion(p, k, bits, desde=0):
+        """Retorna 'bits' bits de la parte fraccional de la raíz k-ésima de p, empezando en el bit 'desde'"""
+        raiz = utils.raiz_entera(p << (k * (desde + bits)), k)  # raíz con la coma desplazada desde+bits posiciones
+        return raiz & (2 ** bits - 1)  # descartamos la parte entera (y los primeros 'desde' bits fraccionales)
+
+    return {
+        # SHA-224 - h[0..7] - segundos 32 bits de la parte fraccional de las raíces cuadradas de los primos 9º a 16º;
+        # k[0..63] - primeros 32 bits de la parte fraccional de las raíces cúbicas de los primeros 64 primos:
+        "SHA-224": (tuple(fraccion(p, 2, 32, 32) for p in primos_80[8:16]),
+                    tuple(fraccion(p, 3, 32) for p in primos_80[:64])),
+        # SHA-256 - h[0..7] - primeros 32 bits de la parte fraccional de las raíces cuadradas de los 8 primeros primos:
+        "SHA-256": (tuple(fraccion(p, 2, 32) for p in primos_80[:8]),
+                    tuple(fraccion(p, 3, 32) for p in primos_80[:64])),
+        # SHA-384 - h[0..7] - primeros 64 bits de la parte fraccional de las raíces cuadradas de los primos 9º a 16º;
+        # k[0..79] - primeros 64 bits de la parte fraccional de las raíces cúbicas de los primeros 80 primos:
+        "SHA-384": (tuple(fraccion(p, 2, 64) for p in primos_80[8:16]),
+                    tuple(fraccion(p, 3, 64) for p in primos_80)),
+        # SHA-512 - h[0..7] - primeros 64 bits de la parte fraccional de las raíces cuadradas de los 8 primeros primos:
+        "SHA-512": (tuple(fraccion(p, 2, 64) for p in primos_80[:8]),
+                    tuple(fraccion(p, 3, 64) for p in primos_80))
+    }
+
+def verifica_tablas(tablas):
+    """Comprueba unas tablas con los ejemplos de FIPS 180-4 (lanza AssertionError si alguna no es correcta)
+
+    Comprueba los valores iniciales H[0] y la primera y última constante K publicados, y los digests de los ejemplos
+    de uno y dos bloques: al depender de todas las constantes, cualquier error en una de ellas cambiaría el digest.
+
+    :param tablas: diccionario {variante: (H, K)}, como el que retorna genera_tablas()
+    """
+    for variante, (h0, k0, kn, digests) in _FIPS.items():
+        H, K = tablas[variante]
+        parametros = _PARAMETROS[variante]
+        assert len(H) == 8 and len(K) == parametros[2], f"{variante}: tamaño de las tablas"
+        assert (H[0], K[0], K[-1]) == (h0, k0, kn), f"{variante}: constantes"
+        for ms, esperado in digests:
+            datos = _rellena(ms, parametros)
+            resul = H
+            for inicio in range(0, len(datos), parametros[1]):
+                resul = _comprime(resul, K, datos, inicio, parametros)
+            digest = struct.pack(">8I" if parametros[0] == 32 else ">8Q", *resul)[:parametros[4]]
+            assert digest.hex() == esperado, f"{variante}: digest de {ms}"
+
+def escribe_tablas(tablas):
+    """Guarda las tablas en el módulo 'sha2_constantes.py' y en 'datos/hash.json'
+
+    :param tablas: diccionario {variante: (H, K)}, como el que retorna genera_tablas()
+    """
+    lineas = [
+        "# Constantes H y K de los algoritmos SHA-2 (FIPS 180-4), en forma de tuplas de enteros.",
+        "#",
+        "# Archivo generado por sha2_hashing.menu_generatabs(); no editar a mano.",
+        "",
+        "TABLAS = {"
+    ]
+    for variante, (H, K) in tablas.items():
+        cifras = 8 if _PARAMETROS[variante][0] == 32 else 16
+        porlinea = 8 if cifras == 8 else 4
+        lineas.append(f'    "{variante}": (')
+        for nombre, tabla in (("H", H), ("K", K)):
+            lineas.append(f"        (  # {nombre}")
+            for i in range(0, len(tabla), porlinea):
+                lineas.append("            " + " ".join(f"0x{n:0{cifras}x}," for n in tabla[i:i + porlinea]))
+            lineas.append("        ),")
+        lineas.append("    ),")
+    lineas.append("}")
+    with open("sha2_constantes.py", "wt") as f:
+        f.write("\n".join(lineas) + "\n")
+    # Archivo JSON, con las constantes como strings hexadecimales:
+    hash_json = {}
+    for variante, (H, K) in tablas.items():
+        cifras = _PARAMETROS[variante][0] // 4
+        hash_json[variante] = {
+            "h": [utils.int2hex(n, cifras) for n in H],
+            "k": [utils.int2hex(n, cifras) for n in K]
+        }
+    with open("datos/hash.json", "wt") as f:
+        json.dump(hash_json, f, indent=4)
 
 # Funciones de las opciones de menú ************************************************************************************
 
 def menu_generatabs():
-    """Genera las tablas utilizadas por los algoritmos de hashing
+    """Genera las tablas utilizadas por los algoritmos de hashing, las verifica, y las guarda
 
-    Utiliza como entrada el archivo de números primos 'datos/primos.json'. Genera los archivo 'datos/hash.json'.
+    Genera el módulo 'sha2_constantes.py' (el que utilizan los algoritmos) y, por compatibilidad, 'datos/hash.json'.
     """
-    # Leemos tabla de números primos:
+    tablas = genera_tablas()
     try:
-        with open("datos/primos.json", "rt") as f:
-            primos = json.load(f)
-    except FileNotFoundError:
-        print("Problemas abriendo archivo de números primos.")
+        verifica_tablas(tablas)
+    except AssertionError as e:
+        print(f"Las tablas generadas no son correctas: {e}")
         return
-    hash_json = {'SHA-224': {}, 'SHA-256': {}, 'SHA-384': {}, 'SHA-512': {}}
-
-    # SHA-224 y SHA-256 ************************************************************************************************
-    # Enteros de 32 bits.
-    hash_json['SHA-224']['h'] = []
-    hash_json['SHA-224']['k'] = []
-    hash_json['SHA-256']['h'] = []
-    hash_json['SHA-256']['k'] = []
-    # SHA-224 - h[0..7] - segundos 32 bits de la parte fraccional de las raíces cuadradas de los primos 9º a 16º:
-    for i in range(8, 16):
-        n = decimal.Decimal(primos[i]).sqrt()  # raíz cuadrada del primo, usamos Decimal por precisión
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 64  # corremos la coma 64 posiciones a la derecha (en binario, no en decimal)
-        n = int(n)  # descartamos ahora la parte fraccional restante, obteniendo un entero de 64 bits
-        n &= 2 ** 32 - 1  # eliminamos los primeros 32 bits y nos quedamos con los segundos
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-224']['h'].append(n)
-    # SHA-256 - h[0..7] - primeros 32 bits de la parte fraccional de las raíces cuadradas de los primeros 8 primos:
-    for i in range(8):
-        n = primos[i] ** (1/2)  # raíz cuadrada del primo
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 32  # corremos la coma 32 posiciones a la derecha (en binario, no en decimal)
-        n = int(n)  # descartamos ahora la parte fraccional restante, obteniendo el entero de 32 bits que buscamos
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-256']['h'].append(n)
-    # SHA-224 y SHA-256 - k[0..63] - primeros 32 bits de parte fraccional de raíces cúbicas de los primeros 64 primos:
-    for i in range(64):
-        n = primos[i] ** (1/3)  # raíz cúbica del primo
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 32  # corremos la coma 32 posiciones a la derecha (en binario, no en decimal)
-        n = int (n)  # descartamos ahora la parte fraccional restante, obteniendo el entero de 32 bits que buscamos
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-224']['k'].append(n)
-        hash_json['SHA-256']['k'].append(n)
-
-    # SHA-224 y SHA-256 ************************************************************************************************
-    # Enteros de 64 bits.
-    hash_json['SHA-384']['h'] = []
-    hash_json['SHA-384']['k'] = []
-    hash_json['SHA-512']['h'] = []
-    hash_json['SHA-512']['k'] = []
-    # SHA-384 - h[0..7] - primeros 64 bits de la parte fraccional de las raíces cuadradas de los primos 9º a 16º:
-    for i in range(8, 16):
-        n = decimal.Decimal(primos[i]).sqrt()  # raíz cuadrada del primo, usamos Decimal por precisión
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 64  # corremos la coma 64 posiciones a la derecha (en binario, no en decimal)
-        n = int(n)  # descartamos ahora la parte fraccional restante, obteniendo el entero de 64 bits buscado
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-384']['h'].append(n)
-    # SHA-512 - h[0..7] - primeros 64 bits de la parte fraccional de las raíces cuadradas de los primeros 8 primos:
-    for i in range(8):
-        n = decimal.Decimal(primos[i]).sqrt()  # raíz cuadrada del primo, Decimal para precisión
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 64  # corremos la coma 64 posiciones a la derecha (en binario, no en decimal)
-        n = int(n)  # descartamos ahora la parte fraccional restante, obteniendo el entero de 64 bits que buscamos
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-512']['h'].append(n)
-    # SHA-384 y SHA-512 - k[0..79] - primeros 64 bits de parte fraccional de raíces cúbicas de los primeros 80 primos:
-    for i in range(80):
-        exponente = decimal.Decimal(1) / decimal.Decimal(3)
-        n = decimal.Decimal(primos[i]).__pow__(exponente)  # raíz cúbica primo, Decimal para precisión
-        n -= int(n)  # eliminamos la parte entera
-        n *= 2 ** 64  # corremos la coma 64 posiciones a la derecha (en binario, no en decimal)
-        n = int (n)  # descartamos ahora la parte fraccional restante, obteniendo el entero de 64 bits que buscamos
-        n = utils.int2hex(n, 8)  # pasamos el entero a un string: número hexadecimal de 8 cifras (4 bytes)
-        hash_json['SHA-384']['k'].append(n)
-        hash_json['SHA-512']['k'].append(n)
-
-    # Guardamos tablas:
-    with open("datos/hash.json", "wt") as f:
-        json.dump(hash_json, f, indent=4)
+    escribe_tablas(tablas)
+    # Las nuevas tablas se usarán a partir de ahora:
+    importlib.reload(sha2_constantes)
     print("Hecho.")
 
 def menu_sha2_string():
@@ -507,36 +596,51 @@ def menu_sha2_string():
 
 def menu_sha2_file():
     """Solicita nombre de archivo y calcula sus hashes SHA-2 (SHA-224, SHA-256, SHA-384 y SHA-512)"""
-    archivos = os.listdir(".")
-    arfiles = []
-    for archivo in archivos:
-        if os.path.isfile(archivo):
-            arfiles.append(archivo)
-    print("Archivos del directorio actual:")
-    for arfile in arfiles:
-        print(arfile)
-    arch = input("Archivo (ruta relativa o absoluta): ")
+    arch = hashing.input_archivo()
+    procesos = utils.input_int("Número de procesos (1-4, por defecto 1)", range(1, 5), 1)
+    # El archivo se lee una sola vez, y cada trozo se pasa a las cuatro variantes:
     try:
-        with open(arch, "rb") as f:
-            ms = f.read()
+        digests = hashing.digests_archivo(arch, ("sha224", "sha256", "sha384", "sha512"), procesos)
     except FileNotFoundError:
         print("Archivo no encontrado.")
         return
-    digest = sha224(ms, "hex")
-    print("SHA-224:\n   ", digest)
-    digest = sha256(ms, "hex")
-    print("SHA-256:\n   ", digest)
-    digest = sha384(ms, "hex")
-    print("SHA-384:\n   ", digest)
-    digest = sha512(ms, "hex")
-    print("SHA-512:\n   ", digest)
+    for algoritmo, digest in digests.items():
+        print(f"SHA-{algoritmo[3:]}:\n   ", digest)
+
+def menu_benchmark():
+    """Mide la velocidad de las cuatro variantes SHA-2 con mensajes cortos y con un mensaje de 1 MB"""
+    corto = b"Luke, yo soy tu padre"
+    largo = os.urandom(2 ** 20)
+    for nombre, funcion in (("SHA-224", sha224), ("SHA-256", sha256), ("SHA-384", sha384), ("SHA-512", sha512)):
+        inicio = time.perf_counter()
+        for _ in range(1000):
+            funcion(corto, "bytes")
+        t_corto = (time.perf_counter() - inicio) / 1000
+        inicio = time.perf_counter()
+        funcion(largo, "bytes")
+        t_largo = time.perf_counter() - inicio
+        print(f"{nombre}: {t_corto * 1e6:.1f} µs por mensaje corto; {1 / t_largo:.3f} MB/s con 1 MB")
+
+def menu_benchmark_lotes():
+    """Mide el coste por mensaje de sha256_many() y sha512_many() con lotes de 1 a 100.000 mensajes de 32 bytes"""
+    if np is None:
+        print("NumPy no está disponible: los lotes se calculan mensaje a mensaje.")
+    for nombre, funcion in (("SHA-256", sha256_many), ("SHA-512", sha512_many)):
+        for n in (1, 10, 100, 1000, 10000, 100000):
+            mensajes = [os.urandom(32) for _ in range(n)]
+            inicio = time.perf_counter()
+            funcion(mensajes)
+            t = (time.perf_counter() - inicio) / n
+            print(f"{nombre}, lote de {n} mensajes: {t * 1e6:.1f} µs por mensaje")
 
 # Menu *****************************************************************************************************************
 
 opciones_menu = (
     ("Genera tablas", menu_generatabs),
     ("Hashes SHA-2 de un string", menu_sha2_string),
-    ("Hashes SHA-2 de un archivo", menu_sha2_file)
+    ("Hashes SHA-2 de un archivo", menu_sha2_file),
+    ("Medir rendimiento", menu_benchmark),
+    ("Medir rendimiento por lotes", menu_benchmark_lotes)
 )
 
 # Programa *************************************************************************************************************
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# Funciones de teoría de números: algoritmo extendido de Euclides, inversos modulares (también por lotes), teorema
+# chino del resto y raíces cuadradas modulares. Las usan, directamente o a través de utils, los scripts de RSA,
+# curva elíptica y firma digital.
+
+import os
+import time
+import random
+import utils
+import primos
+
+# Variables globales ***************************************************************************************************
+
+# Datos precalculados de Tonelli-Shanks para cada módulo p ya usado en sqrt_mod():
+# p -> (Q, S, c) con p - 1 = Q * 2^S y c = z^Q, siendo z un no-residuo cuadrático; o None si p no es un primo impar:
+_TONELLI = {}
+
+# Funciones auxiliares *************************************************************************************************
+
+def euclid_ext(x, y):
+    """Calcula el mcd y los factores de Bezout de dos enteros mediante el algoritmo extendido de Euclides
+
+    Solo guarda los dos últimos valores de cada serie (restos y coeficientes), con lo que la memoria es constante.
+
+    :param x: primer entero
+    :param y: segundo entero
+    :return: máximo común divisor de los dos enteros, así como los coeficientes de Bezout (mcd, s, t)
+    """
+    # Buscaremos el mcd, así como los coeficientes s y t de la identidad de Bezout: mcd = s*x + t*y.
+    # En cada paso, r = s*x + t*y se cumple tanto para (r0, s0, t0) como para (r1, s1, t1):
+    r0, r1 = x, y
+    s0, s1 = 1, 0
+    t0, t1 = 0, 1
+    while r1:
+        q = r0 // r1
+        r0, r1 = r1, r0 - q * r1
+        s0, s1 = s1, s0 - q * s1
+        t0, t1 = t1, t0 - q * t1
+    # Si lo usamos para encontrar el inverso de a módulo n (1 = s*n + t*a), la respuesta es t0 (mod n), ya que t0
+    # podría ser negativo.
+    return r0, s0, t0
+
+def inverso_modn(x, n):
+    """Calcula el inverso multiplicativo módulo n del entero x
+
+    Utiliza pow(x, -1, n), que aplica el algoritmo extendido de Euclides internamente.
+
+    :param x: entero distinto de 0 (módulo n) del que calcular el inverso módulo n
+    :param n: módulo para el cálculo
+    :return: el inverso módulo n calculado, o None si no existe (x y n no son coprimos)
+    """
+    # El resultado será un número y tal que x*y ≡ 1 (mod n).
+    x = x % n
+    assert x != 0
+    try:
+        return pow(x, -1, n)
+    except ValueError:
+        # x solo tiene inverso módulo n si x y n son coprimos
+        return None
+
+def inversos_modn(valores, n):
+    """Calcula los inversos módulo n de una lista de enteros, con una sola inversión (truco de Montgomery)
+
+    Se calculan los productos acumulados c[i] = v[0]*...*v[i], y se invierte solo el último. Recorriendo la lista hacia
+    atrás, inv(v[i]) = inv(c[i]) * c[i-1], e inv(c[i-1]) = inv(c[i]) * v[i]. En total, 1 inversión y 3(k-1)
+    multiplicaciones para k valores.
+
+    :param valores: lista de enteros distintos de 0 (módulo n)
+    :param n: módulo para el cálculo
+    :return: lista con los inversos (None para los valores sin inverso), en el mismo orden
+    """
+    valores = [v % n for v in valores]
+    if not valores:
+        return []
+    acumulados = [valores[0]]
+    for v in valores[1:]:
+        acumulados.append(acumulados[-1] * v % n)
+    inv = inverso_modn(acumulados[-1], n) if acumulados[-1] else None
+    if inv is None:
+        # Algún valor no tiene inverso (y por tanto el producto tampoco); los invertimos uno a uno:
+        return [inverso_modn(v, n) if v else None for v in valores]
+    resul = [0] * len(valores)
+    for i in range(len(valores) - 1, 0, -1):
+        resul[i] = inv * acumulados[i - 1] % n
+        inv = inv * valores[i] % n
+    resul[0] = inv
+    return resul
+
+def tcr(restos, modulos):
+    """Resuelve un sistema de congruencias x ≡ restos[i] (mod modulos[i]) (teorema chino del resto)
+
+    Los módulos no tienen por qué ser coprimos: las congruencias se combinan de dos en dos, y el sistema tiene solución
+    si cada par de restos coincide módulo el mcd de sus módulos.
+
+    :param restos: lista de restos (int)
+    :param modulos: lista de módulos (int positivos), de la misma longitud
+    :return: tupla (x, m), con la solución x (0 <= x < m) y m el mcm de los módulos; o None si no hay solución
+    """
+    x, m = 0, 1
+    for a, n in zip(restos, modulos):
+        # Buscamos x' = x + k*m tal que x' ≡ a (mod n), es decir, k*m ≡ a - x (mod n):
+        g, _, _ = euclid_ext(m, n)
+        if (a - x) % g:
+            return None
+        n_g = n // g
+        k = (a - x) // g * inverso_modn(m // g, n_g) % n_g if n_g > 1 else 0
+        x += k * m
+        m *= n_g
+        x %= m
+    return x, m
+
+def jacobi(a, n):
+    """Calcula el símbolo de Jacobi (a/n); si n es primo, coincide con el símbolo de Legendre
+
+    Para n primo, indica si a es un residuo cuadrático módulo n (1), si no lo es (-1), o si es múltiplo de n (0). Se
+    calcula mediante la ley de reciprocidad cuadrática, sin exponenciaciones (a diferencia del criterio de Euler).
+
+    :param a: entero
+    :param n: entero impar positivo
+    :return: 1, -1 o 0
+    """
+    assert n > 0 and n & 1
+    a %= n
+    resul = 1
+    while a:
+        # Sacamos los factores 2 de a: (2/n) = -1 si n ≡ 3, 5 (mod 8):
+        while not a & 1:
+            a >>= 1
+            if n & 7 in (3, 5):
+                resul = -resul
+        # Reciprocidad: (a/n) = (n/a), cambiando el signo si a ≡ n ≡ 3 (mod 4):
+        a, n = n, a
+        if a & 3 == 3 and n & 3 == 3:
+            resul = -resul
+        a %= n
+    return resul if n == 1 else 0
+
+def _datos_tonelli(p):
+    """Retorna los datos precalculados de Tonelli-Shanks para el módulo p, calculándolos la primera vez
+
+    :param p: módulo
+    :return: tupla (Q, S, c) (ver _TONELLI), o None si p no es un primo impar
+    """
+    if p not in _TONELLI:
+        if p <= 2 or not primos.es_primo_mr(p, 10):
+            _TONELLI[p] = None
+        else:
+            # Calculamos Q y S tal que p-1 = Q * 2^S:
+            Q = p - 1
+            S = 0
+            while not Q & 1:
+                Q >>= 1
+                S += 1
+            # Buscamos un entero z que no sea un residuo cuadrático (o sea, que no tenga raíz cuadrada módulo p):
+            z = 2
+            while jacobi(z, p) != -1:
+                z += 1
+            _TONELLI[p] = (Q, S, pow(z, Q, p))
+    return _TONELLI[p]
+
+def sqrt_mod(n, p):
+    """Calcula la raíz cuadrada del número n, módulo p, usando el algoritmo Tonelli–Shanks
+
+    La comprobación de primalidad de p y la búsqueda de un no-residuo se hacen solo la primera vez para cada p (ver
+    _TONELLI). Si p ≡ 3 (mod 4) (como en secp256k1), la raíz es directamente n^((p+1)/4), con una sola exponenciación.
+
+    :param n: número del que calcular la raíz cuadrada (si no es mod p, se le aplicará al principio mod p)
+    :param p: módulo (debe ser primo, mayor que 2)
+    :return: las dos raíces (r1, r2), (0, None) si n=0, o (None, None) si no hay solución
+    """
+    datos = _datos_tonelli(p)
+    if datos is None:
+        return None, None
+    n %= p
+    if n == 0:
+        return 0, None
+    if p & 3 == 3:
+        r = pow(n, (p + 1) >> 2, p)
+        if r * r % p != n:
+            return None, None
+        return r, p - r
+    # Tiene solución solo si n es un residuo cuadrático:
+    if jacobi(n, p) != 1:
+        return None, None
+    M, c = datos[1], datos[2]
+    t = pow(n, datos[0], p)
+    R = pow(n, (datos[0] + 1) // 2, p)
+    while t != 1:
+        # Buscamos el menor i tal que t^(2^i) = 1, elevando al cuadrado sucesivamente:
+        i = 0
+        t2 = t
+        while t2 != 1:
+            t2 = t2 * t2 % p
+            i += 1
+        b = pow(c, 1 << (M - i - 1), p)
+        M = i
+        c = b * b % p
+        t = t * c % p
+        R = R * b % p
+    return R, p - R
+
+# Funciones de las opciones de menú ************************************************************************************
+
+def menu_inverso():
+    """Solicita un entero y un módulo, y calcula el inverso"""
+    x = utils.input_int("Entero")
+    n = utils.input_int("Módulo")
+    inv = inverso_modn(x, n) if x % n else None
+    if inv is None:
+        print(f"{x} no tiene inverso módulo {n}.")
+    else:
+        print(f"Inverso de {x} módulo {n}: {inv}")
+
+def menu_tcr():
+    """Solicita un sistema de congruencias y lo resuelve con el teorema chino del resto"""
+    restos = []
+    modulos = []
+    print("Introduce las congruencias x ≡ a (mod n); deja el resto vacío para terminar.")
+    while (a := input(f"Resto a{len(restos) + 1}: ")).strip():
+        restos.append(int(a))
+        modulos.append(utils.input_int(f"Módulo n{len(modulos) + 1}"))
+    solucion = tcr(restos, modulos)
+    if solucion is None:
+        print("El sistema no tiene solución.")
+    else:
+        print(f"x ≡ {solucion[0]} (mod {solucion[1]})")
+
+def menu_benchmark():
+    """Compara el tiempo de invertir 10.000 enteros de 256 bits uno a uno y por lotes"""
+    n = 2 ** 256 - 2 ** 32 - 977  # módulo primo de secp256k1
+    valores = [int.from_bytes(os.urandom(32), "big") % (n - 1) + 1 for _ in range(10000)]
+    inicio = time.perf_counter()
+    uno_a_uno = [inverso_modn(v, n) for v in valores]
+    t_uno = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    lote = inversos_modn(valores, n)
+    t_lote = time.perf_counter() - inicio
+    assert lote == uno_a_uno
+    i = random.randrange(len(valores))
+    assert valores[i] * lote[i] % n == 1
+    print(f"Uno a uno: {t_uno * 1e6 / len(valores):.2f} µs por inverso")
+    print(f"Por lotes: {t_lote * 1e6 / len(valores):.2f} µs por inverso")
+
+# Menu *****************************************************************************************************************
+
+opciones_menu = (
+    ("Inverso módulo n", menu_inverso),
+    ("Teorema chino del resto", menu_tcr),
+    ("Medir inversión por lotes", menu_benchmark)
+)
+
+# Programa *************************************************************************************************************
+
+if __name__ == '__main__':  # no ejecutaremos menú si el archivo ha sido importado
+    # Bucle principal:
+    utils.menu(opciones_menu)
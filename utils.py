@@ -2,9 +2,17 @@
 
 # Funciones útiles para otros scripts.
 
-import random
-import primos
-import sha2_hashing
+import collections
+import multiprocessing
+import hashing
+import teoria_numeros
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él, xor() usa siempre enteros grandes
+    np = None
+
+# Longitud a partir de la cual xor() usa NumPy (si está disponible), en bytes:
+XOR_NUMPY = 4096
 
 # Menú principal *******************************************************************************************************
 
@@ -110,100 +118,54 @@ def mcm(x, y):
 def euclid_ext(x, y):
     """Calcula el mcd y los factores de Bezout de dos enteros mediante el algoritmo extendido de Euclides
 
+    Ver teoria_numeros.euclid_ext().
+
     :param x: primer entero
     :param y: segundo entero
     :return: máximo común divisor de los dos enteros, así como los coeficientes de Bezout (mcd, s, t)
     """
-    # Buscaremos el mcd, así como los coeficientes s y t de la identidad de Bezout: mcd = s*x + t*y para algún x, y.
-    # Para ello usaremos 4 series de datos:
-    q = [None, None]  # cocientes, q0 y q1 no se usan
-    r = [x, y]  # restos
-    s = [1, 0]  # coeficientes s
-    t = [0, 1]  # coeficientes t
-    while r[-1]:  # mientras el último elemento de r no sea 0
-        new_q = r[-2] // r[-1]
-        new_r = r[-2] - new_q * r[-1]
-        new_s = s[-2] - new_q * s[-1]
-        new_t = t[-2] - new_q * t[-1]
-        q.append(new_q)
-        r.append(new_r)
-        s.append(new_s)
-        t.append(new_t)
-    # Ya tenemos el resultado. Si lo usamos para encontrar el inverso módulo n, es decir, si buscamos
-    # un número t tal que: ta ≡ 1 (mod n), mediante 1 = sn + ta, la respuesta es t[-2] (mod n). Al llamar a
-    # esta función debemos tener en cuenta que si buscamos el inverso multiplicativo, tendremos que aplicarle
-    # (módulo x) a ese t[-2], ya que este podría ser negativo.
-    return r[-2], s[-2], t[-2]
+    return teoria_numeros.euclid_ext(x, y)
 
 def inverso_modn(x, n):
     """Calcula el inverso multiplicativo módulo n del entero x
 
-    Utiliza el algoritmo de Euclides extendido, euclid_ext().
+    Ver teoria_numeros.inverso_modn() (y teoria_numeros.inversos_modn() para invertir muchos enteros a la vez).
 
     :param x: entero distinto de 0 del que calcular el inverso módulo n
     :param n: módulo para el cálculo
     :return: el inverso módulo n calculado
     """
-    # El resultado será un número y tal que x*y ≡ 1 (mod n).
-    # Aplicamos primero módulo n a la entrada:
-    x = x % n
-    assert x != 0
-    inv = euclid_ext(n, x)[2] % n  # aplicamos %n porque el resultado retornado puede ser negativo
-    try:
-        assert (x * inv) % n == 1
-    except AssertionError:
-        # x solo tiene inverso módulo n si x y n son coprimos
-        return None
-    return inv
+    return teoria_numeros.inverso_modn(x, n)
+
+def raiz_entera(n, k):
+    """Calcula la raíz k-ésima entera de n, es decir, el mayor entero r tal que r^k <= n (método de Newton)
+
+    Es exacta para enteros de cualquier tamaño, a diferencia de n ** (1/k), que trabaja con floats.
+
+    :param n: entero no negativo
+    :param k: índice de la raíz (entero mayor que 0)
+    :return: la raíz entera
+    """
+    if n < 2:
+        return n
+    # Empezamos por una aproximación por exceso, y vamos bajando hasta que deje de decrecer:
+    x = 1 << ((n.bit_length() + k - 1) // k)
+    while True:
+        y = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
 
 def sqrt_mod(n, p):
     """Calcula la raíz cuadrada del número n, módulo p, usando el algoritmo Tonelli–Shanks
 
+    Ver teoria_numeros.sqrt_mod().
+
     :param n: número del que calcular la raíz cuadrada (si no es mod p, se le aplicará al principio mod p)
     :param p: módulo (debe ser primo, mayor que 2)
     :return: las dos raíces (r1, r2), (0, None) si n=0, o (None, None) si no hay solución
     """
-    if n == 0:
-        return 0, None
-    n = n % p
-    if not primos.es_primo_mr(p, 10) or p <= 2:
-        return None, None
-    test = pow(n, (p - 1) // 2, p)    # tiene solución si da 1; si da -1 (o sea m-1) no (criterio de Euler)
-    if test == p - 1:
-        return None, None
-    assert test == 1    # si no era -1, tiene que ser 1 (tiene solución)
-    # Hallemos la solución. Primero calculamos Q y S tal que p-1 = Q * 2^S:
-    Q = (p - 1) // 2
-    S = 1
-    while Q % 2 == 0:
-        Q //= 2
-        S += 1
-    # Buscamos un entero z que no sea un residuo cuadrático (o sea, que no tenga raíz cuadrada módulo p):
-    test = 1
-    while test != p - 1:
-        z = random.randint(2, p - 1)
-        test = pow(z, (p - 1) // 2, p)    # criterio de Euler nuevamente
-    M = S
-    c = pow(z, Q, p)
-    t = pow(n, Q, p)
-    R = pow(n, (Q + 1) // 2, p)
-    while True:
-        if t == 0:
-            r = 0
-            break
-        if t == 1:
-            r = R
-            break
-        for i in range(1, M):
-            if pow(t, 2 ** i, p) == 1:
-                break
-        assert pow(t, 2 ** i, p) == 1
-        b = pow(c, 2 ** (M - i - 1), p)
-        M = i
-        c = (b ** 2) % p
-        t = (t * b ** 2) % p
-        R = (R * b) % p
-    return r, p - r
+    return teoria_numeros.sqrt_mod(n, p)
 
 # Bytes y enteros ******************************************************************************************************
 
@@ -252,35 +214,43 @@ def int2bin(entero, ancho, prefijo="0b"):
 def xor(b1, b2):
     """Calcula el xor de dos secuencias de bytes y lo retorna, también como bytes
 
+    El xor se aplica a las secuencias completas de una vez: convertidas en enteros grandes o, si son largas y NumPy
+    está disponible, con numpy.bitwise_xor().
+
     :param b1: primera secuencia bytes
     :param b2: segunda secuencia bytes
     :return: resultado, también bytes
     """
     # Tanto b1 como b2 deben tener la misma longitud en bytes; el resultado también lo tendrá
     assert(len(b1) == len(b2))
-    resul = b''
-    for i in range(len(b1)):
-        int1 = b1[i]
-        int2 = b2[i]
-        resul += (int1 ^ int2).to_bytes(1, "big")
-    return resul
+    if np is not None and len(b1) >= XOR_NUMPY:
+        return np.bitwise_xor(np.frombuffer(b1, dtype=np.uint8), np.frombuffer(b2, dtype=np.uint8)).tobytes()
+    return (int.from_bytes(b1, "big") ^ int.from_bytes(b2, "big")).to_bytes(len(b1), "big")
+
+def xor_inplace(destino, b):
+    """Aplica el xor de una secuencia de bytes sobre otra, modificándola (destino ^= b)
 
-def int2bytes(entero, bigendian=True):
-    """Convierte un entero a bytes, sin tener que indicar longitud
+    :param destino: secuencia a modificar (bytearray, o cualquier buffer modificable)
+    :param b: segunda secuencia bytes, de la misma longitud
+    """
+    assert(len(destino) == len(b))
+    if np is not None and len(b) >= XOR_NUMPY:
+        vista = np.frombuffer(destino, dtype=np.uint8)
+        np.bitwise_xor(vista, np.frombuffer(b, dtype=np.uint8), out=vista)
+    else:
+        destino[:] = xor(destino, b)
+
+def int2bytes(entero, bigendian=True, ancho=None):
+    """Convierte un entero a bytes, sin tener que indicar longitud (o con la longitud indicada)
 
     :param entero: entero a convertir
     :param bigendian: True indica Big Endian; False Little Endian
+    :param ancho: número de bytes del resultado; si es None, los mínimos necesarios (0 si el entero es 0)
     :return: secuencia bytes resultante
     """
-    resul = b""
-    while entero:
-        nextbyte = (entero & 0xff).to_bytes(1, "big")
-        if bigendian:
-            resul = nextbyte + resul
-        else:
-            resul += nextbyte
-        entero >>= 8
-    return resul
+    if ancho is None:
+        ancho = (entero.bit_length() + 7) // 8
+    return entero.to_bytes(ancho, "big" if bigendian else "little")
 
 def bytes_reverse(b):
     """Retorna una secuencia de bytes en el orden inverso
@@ -302,42 +272,95 @@ def int_reverse_bytes(i, n):
 
 # Base-64 y Base-58 ****************************************************************************************************
 
+# Alfabeto Base64, y valor de cada byte (256 entradas; 64 para los que no pertenecen al alfabeto):
+_ALFABETO64 = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_VALORES64 = bytes(_ALFABETO64.find(bytes([b])) % 65 for b in range(256))
+
+# Tablas de traducción byte a byte (256 entradas) con los desplazamientos de bits de la codificación. Cada 3 bytes
+# a, b, c dan 4 cifras de 6 bits: a >> 2, (a & 3) << 4 | b >> 4, (b & 15) << 2 | c >> 6 y c & 63:
+_CIFRA64 = bytes(_ALFABETO64[i & 63] for i in range(256))  # valor (6 bits bajos) -> carácter
+_SHR2, _SHR4, _SHR6 = (bytes(i >> n for i in range(256)) for n in (2, 4, 6))
+_SHL2, _SHL4, _SHL6 = (bytes((i << n) & 0xff for i in range(256)) for n in (2, 4, 6))
+
+# Tamaño de los trozos en que se leen los archivos a codificar (múltiplo de 3 bytes) o decodificar (de 4):
+TAM_TROZO_BASE64 = 3 * 4 * 2 ** 14
+
+def _or_bytes(x, y):
+    """Retorna el OR byte a byte de dos secuencias de la misma longitud (mediante enteros grandes, en tiempo lineal)
+
+    :param x: primera secuencia (bytes)
+    :param y: segunda secuencia (bytes)
+    :return: secuencia resultante (bytes)
+    """
+    return (int.from_bytes(x, "big") | int.from_bytes(y, "big")).to_bytes(len(x), "big")
+
+def _codifica64(datos):
+    """Codifica en Base64 una secuencia de bytes de longitud múltiplo de 3, sin padding
+
+    En lugar de recorrer los bytes uno a uno, se separan los bytes a, b, c de todos los grupos (con slices), se
+    desplazan sus bits con tablas de traducción y se combinan con _or_bytes(); todo ello en tiempo lineal.
+
+    :param datos: bytes a codificar (longitud múltiplo de 3)
+    :return: secuencia resultante (bytes)
+    """
+    a, b, c = datos[0::3], datos[1::3], datos[2::3]
+    resul = bytearray(len(datos) // 3 * 4)
+    resul[0::4] = a.translate(_SHR2)
+    resul[1::4] = _or_bytes(a.translate(_SHL4), b.translate(_SHR4))
+    resul[2::4] = _or_bytes(b.translate(_SHL2), c.translate(_SHR6))
+    resul[3::4] = c
+    return resul.translate(_CIFRA64)
+
+def _decodifica64(cifras):
+    """Decodifica una secuencia Base64 de longitud múltiplo de 4, sin padding
+
+    Es el proceso inverso de _codifica64(): primero se traducen los caracteres a sus valores de 6 bits.
+
+    :param cifras: secuencia a decodificar (bytes; longitud múltiplo de 4)
+    :return: bytes decodificados
+    """
+    if cifras.translate(None, _ALFABETO64):
+        raise ValueError("Carácter no válido en Base64")
+    valores = cifras.translate(_VALORES64)
+    s0, s1, s2, s3 = valores[0::4], valores[1::4], valores[2::4], valores[3::4]
+    resul = bytearray(len(cifras) // 4 * 3)
+    resul[0::3] = _or_bytes(s0.translate(_SHL2), s1.translate(_SHR4))
+    resul[1::3] = _or_bytes(s1.translate(_SHL4), s2.translate(_SHR2))
+    resul[2::3] = _or_bytes(s2.translate(_SHL6), s3)
+    return bytes(resul)
+
+def _codifica64_final(datos):
+    """Codifica en Base64 una secuencia de bytes cualquiera, con el padding "=" final si es necesario
+
+    :param datos: bytes a codificar
+    :return: secuencia resultante (bytes)
+    """
+    # Con 1 o 2 bytes sobrantes, rellenamos con ceros hasta el grupo de 3 y cambiamos las cifras sobrantes por "=":
+    padding = -len(datos) % 3
+    resul = _codifica64(bytes(datos) + padding * b"\x00")
+    return resul[:len(resul) - padding] + padding * b"="
+
+def _decodifica64_final(cifras):
+    """Decodifica una secuencia Base64 de longitud múltiplo de 4, teniendo en cuenta el padding "=" final
+
+    :param cifras: secuencia a decodificar (bytes; longitud múltiplo de 4)
+    :return: bytes decodificados
+    """
+    padding = len(cifras) - len(cifras.rstrip(b"="))
+    if padding > 2:
+        raise ValueError("Padding no válido en Base64")
+    resul = _decodifica64(cifras[:len(cifras) - padding] + padding * b"A")  # "A" es el valor 0
+    return resul[:len(resul) - padding]
+
 def to_base64(entero):
     """Convierte un entero o secuencia de bytes en una secuencia de bytes codificada en base64
 
     :param entero: entero o bytes a convertir
     :return: secuencia resultante
     """
-    tabla = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
     if isinstance(entero, int):
         entero = int2bytes(entero)
-    # El entero ya es una secuencia de bytes.
-    resul = b""
-    while len(entero):
-        if len(entero) >= 3:  # cada 3 bytes de entrada serán 4 bytes de 6 bits en la salida
-            fragmento = int.from_bytes(entero[:3], "big")
-            padding = b""
-            entero = entero[3:]
-            outbytes = 4
-        elif len(entero) == 2:  # con 2 bytes de entrada serán 3 bytes de 6 bits en la salida, y padding "="
-            fragmento = int.from_bytes(entero, "big")
-            fragmento <<= 2  # 2*8+2=3*6
-            padding = b"="
-            entero = b""
-            outbytes = 3
-        elif len(entero) == 1:  # con 1 byte de entrada serán 2 bytes de 6 bits en la salida, y padding "="
-            fragmento = int.from_bytes(entero, "big")
-            fragmento <<= 4  # 1*8+4=2*6
-            padding = b"=="
-            entero = b""
-            outbytes = 2
-        # Construimos el nuevo fragmento
-        newchunk = b""
-        for i in range(outbytes):
-            newchunk = tabla[fragmento & 0x3f].to_bytes(1, "big") + newchunk
-            fragmento >>= 6
-        resul += newchunk + padding
-    return resul
+    return _codifica64_final(entero)
 
 def from_base64(ms, formato="hex"):
     """Decodifica una secuencia de bytes o string (utf-8) en base 64 a entero
@@ -346,43 +369,202 @@ def from_base64(ms, formato="hex"):
     :param formato: formato de salida "int" (entero), "hex" (string) o "bytes" (bytes)
     :return: el mensaje decodificado
     """
-    tabla = b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
     if len(ms) % 4 != 0:  # un mensaje base64 tiene siempre una longitud múltiplo de 4 caracteres
         return None
     if isinstance(ms, str):
         ms = ms.encode("utf-8")
-    # Ya tenemos el mensaje ms en una secuencia bytes; vamos a pasar a índices de la tabla:
-    aux = ms
-    ms = b""
-    for b in aux:
-        if b == 61:  # código de b"="
-            ms += b"="
-        else:
-            ms += tabla.find(b).to_bytes(1, "big")
-    # Ya están pasados a índices los bytes; procedamos a la decodificación:
-    resul = b""
-    while len(ms):
-        fragmento = ms[:4]
-        ms = ms[4:]
-        if fragmento.endswith(b"=="):  # hay 1 byte
-            byte1 = ((fragmento[0] << 2) | (fragmento[1] >> 4)).to_bytes(1, "big")
-            fragmento = byte1
-        elif fragmento.endswith(b"="):  # hay 2 bytes
-            byte1 = ((fragmento[0] << 2) | (fragmento[1] >> 4)).to_bytes(1, "big")
-            byte2 = ((fragmento[1] << 4) & 0xff | (fragmento[2] >> 2)).to_bytes(1, "big")
-            fragmento = byte1 + byte2
-        else:  # hay 3 bytes
-            byte1 = ((fragmento[0] << 2) | (fragmento[1] >> 4)).to_bytes(1, "big")
-            byte2 = ((fragmento[1] << 4) & 0xff | (fragmento[2] >> 2)).to_bytes(1, "big")
-            byte3 = ((fragmento[2] << 6) & 0xff | fragmento[3]).to_bytes(1, "big")
-            fragmento = byte1 + byte2 + byte3
-        resul += fragmento
+    resul = _decodifica64_final(bytes(ms))
     if formato == "bytes":
         return resul
     if formato == "int":
         return int.from_bytes(resul, "big")
     return hex(int.from_bytes(resul, "big"))[2:]
 
+class CodificadorBase64:
+    """Codificador Base64 incremental, para codificar un mensaje por trozos con memoria constante
+
+    Cada llamada a update() retorna la codificación de los grupos de 3 bytes completos recibidos hasta el momento; los
+    bytes sobrantes (0 a 2) se guardan para la siguiente. final() codifica lo que quede, con el padding.
+    """
+
+    def __init__(self):
+        """Inicializa el codificador, sin bytes pendientes"""
+        self._pendiente = b""
+
+    def update(self, datos):
+        """Añade un trozo al mensaje
+
+        :param datos: trozo del mensaje (bytes)
+        :return: codificación de los grupos completos (bytes)
+        """
+        datos = self._pendiente + bytes(datos)
+        fin = len(datos) - len(datos) % 3
+        self._pendiente = datos[fin:]
+        return _codifica64(datos[:fin])
+
+    def final(self):
+        """Codifica los bytes pendientes, con el padding necesario, y reinicia el codificador
+
+        :return: la última parte de la codificación (bytes)
+        """
+        resul = _codifica64_final(self._pendiente)
+        self._pendiente = b""
+        return resul
+
+class DecodificadorBase64:
+    """Decodificador Base64 incremental, para decodificar un mensaje por trozos con memoria constante
+
+    Cada llamada a update() retorna los bytes de los grupos de 4 caracteres completos recibidos hasta el momento (se
+    ignoran los saltos de línea y espacios); el resto se guarda para la siguiente. final() comprueba que no sobre nada.
+    """
+
+    def __init__(self):
+        """Inicializa el decodificador, sin caracteres pendientes"""
+        self._pendiente = b""
+        self._terminado = False  # True tras un grupo con padding, que debe ser el último
+
+    def update(self, cifras):
+        """Añade un trozo del mensaje codificado
+
+        :param cifras: trozo del mensaje codificado (bytes o string)
+        :return: bytes decodificados de los grupos completos
+        """
+        if isinstance(cifras, str):
+            cifras = cifras.encode("utf-8")
+        cifras = self._pendiente + bytes(cifras).translate(None, b" \t\r\n")
+        fin = len(cifras) - len(cifras) % 4
+        self._pendiente = cifras[fin:]
+        if not fin:
+            return b""
+        if self._terminado or b"=" in cifras[:fin - 4]:
+            raise ValueError("Padding no válido en Base64")
+        self._terminado = cifras[fin - 1] == 61  # código de b"="
+        return _decodifica64_final(cifras[:fin])
+
+    def final(self):
+        """Comprueba que no queden caracteres pendientes, y reinicia el decodificador
+
+        :return: b"" (por simetría con CodificadorBase64)
+        """
+        if self._pendiente:
+            raise ValueError("Longitud no válida en Base64")
+        self._terminado = False
+        return b""
+
+def base64_archivo(origen, destino, decodificar=False):
+    """Codifica (o decodifica) en Base64 un archivo de cualquier tamaño, por trozos, con memoria constante
+
+    :param origen: ruta del archivo a leer
+    :param destino: ruta del archivo a escribir
+    :param decodificar: si es True, decodifica; si es False, codifica (bool)
+    """
+    procesador = DecodificadorBase64() if decodificar else CodificadorBase64()
+    with open(origen, "rb") as entrada, open(destino, "wb") as salida:
+        while trozo := entrada.read(TAM_TROZO_BASE64):
+            salida.write(procesador.update(trozo))
+        salida.write(procesador.final())
+
+# Alfabeto Base58, y valor de cada byte (256 entradas; 58 para los que no pertenecen al alfabeto):
+_ALFABETO58 = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_VALORES58 = bytes(_ALFABETO58.find(bytes([b])) % 59 for b in range(256))
+
+# Pares de cifras Base58 de los valores 0..58^2-1:
+_PARES58 = [bytes((_ALFABETO58[i // 58], _ALFABETO58[i % 58])) for i in range(58 * 58)]
+
+# Las conversiones entre entero y Base58 se hacen por trozos de _TROZO58 cifras (58^10 < 2^64, con lo que dentro de
+# un trozo todos los enteros son pequeños). Los trozos se combinan mediante "divide y vencerás", con las potencias
+# _POTENCIAS58[i] = 58^(_TROZO58 * 2^i), que se van calculando según se necesitan:
+_TROZO58 = 10
+_POTENCIAS58 = [58 ** _TROZO58]
+
+def _potencia58(nivel):
+    """Retorna 58^(_TROZO58 * 2^nivel), calculándola si aún no está en _POTENCIAS58
+
+    :param nivel: nivel de la potencia (int)
+    :return: la potencia (int)
+    """
+    while len(_POTENCIAS58) <= nivel:
+        _POTENCIAS58.append(_POTENCIAS58[-1] ** 2)
+    return _POTENCIAS58[nivel]
+
+def _cifras58(entero, nivel):
+    """Retorna las cifras Base58 de un entero menor que _potencia58(nivel), rellenando a la izquierda con ceros ("1")
+
+    El entero se divide por la mitad de la potencia y cada mitad se convierte por separado (divide y vencerás), de forma
+    que las divisiones de enteros grandes son pocas y equilibradas.
+
+    :param entero: entero a convertir
+    :param nivel: nivel de la potencia; el resultado tendrá exactamente _TROZO58 * 2^nivel cifras
+    :return: cifras resultantes (bytearray)
+    """
+    if not entero:
+        return bytearray(b"1" * (_TROZO58 << nivel))
+    if nivel == 0:
+        # Dentro del trozo, convertimos de dos en dos cifras (58^2 = 3364):
+        pares = []
+        for _ in range(_TROZO58 // 2):
+            entero, resto = divmod(entero, 3364)
+            pares.append(_PARES58[resto])
+        pares.reverse()
+        return bytearray(b"".join(pares))
+    alto, bajo = divmod(entero, _potencia58(nivel - 1))
+    return _cifras58(alto, nivel - 1) + _cifras58(bajo, nivel - 1)
+
+def _valor58(cifras):
+    """Retorna el entero representado por unas cifras Base58 (divide y vencerás, al revés que _cifras58())
+
+    :param cifras: cifras Base58, ya validadas (bytes)
+    :return: el entero (int)
+    """
+    if len(cifras) <= _TROZO58:
+        resul = 0
+        for c in cifras:
+            resul = resul * 58 + _VALORES58[c]
+        return resul
+    # Separamos las cifras bajas en un bloque de _TROZO58 * 2^nivel cifras, el mayor que deja alguna cifra alta:
+    nivel = ((len(cifras) - 1) // _TROZO58).bit_length() - 1
+    corte = len(cifras) - _TROZO58 * 2 ** nivel
+    return _valor58(cifras[:corte]) * _potencia58(nivel) + _valor58(cifras[corte:])
+
+def _checksums58(mensajes):
+    """Retorna los checksums Base58Check (4 primeros bytes del doble SHA-256) de una lista de mensajes
+
+    :param mensajes: lista de mensajes (bytes)
+    :return: lista de checksums (bytes)
+    """
+    if len(mensajes) == 1:
+        return [hashing.hash256(mensajes[0])[:4]]
+    return [digest[:4] for digest in hashing.sha256_many(hashing.sha256_many(mensajes))]
+
+def _codifica58(datos):
+    """Codifica una secuencia de bytes en Base58
+
+    :param datos: bytes a codificar
+    :return: secuencia resultante (bytes)
+    """
+    # Los leading zeroes se deben traducir al final como 1's:
+    ceros = len(datos) - len(datos.lstrip(b"\x00"))
+    entero = int.from_bytes(datos, "big")
+    if not entero:
+        return ceros * b"1"
+    nivel = 0
+    while entero >= _potencia58(nivel):
+        nivel += 1
+    return ceros * b"1" + bytes(_cifras58(entero, nivel).lstrip(b"1"))
+
+def _decodifica58(cifras):
+    """Decodifica una secuencia de bytes en Base58
+
+    :param cifras: secuencia a decodificar (bytes)
+    :return: bytes decodificados, incluidos los ceros iniciales (bytes)
+    """
+    if cifras.translate(None, _ALFABETO58):
+        raise ValueError("Carácter no válido en Base58")
+    # Cada '1' inicial es un byte cero:
+    ceros = len(cifras) - len(cifras.lstrip(b"1"))
+    entero = _valor58(cifras)
+    return ceros * b"\x00" + entero.to_bytes((entero.bit_length() + 7) // 8, "big")
+
 def to_base58(entero, formato="bytes", check=False):
     """Convierte un entero o secuencia de bytes en una secuencia de bytes codificada en base58
 
@@ -392,54 +574,84 @@ def to_base58(entero, formato="bytes", check=False):
     :param check: si es True, aplica la versión con checksum, llamada Base58Check (bool)
     :return: secuencia resultante (bytes o str)
     """
-    tabla = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
-    prefix = b""
-    # Si es la versión check, lo debemos tener primero en bytes:
+    return to_base58_many([entero], formato, check)[0]
+
+def to_base58_many(valores, formato="bytes", check=False):
+    """Convierte una lista de enteros o secuencias de bytes a base58
+
+    Con check=True, los checksums de todos los valores se calculan a la vez (hashing.sha256_many()).
+
+    :param valores: lista de enteros o bytes a convertir
+    :param formato: indica el formato de salida: "str" o "bytes"
+    :param check: si es True, aplica la versión con checksum, llamada Base58Check (bool)
+    :return: lista de secuencias resultantes (bytes o str), en el mismo orden
+    """
+    datos = [int2bytes(v) if isinstance(v, int) else bytes(v) for v in valores]
     if check:
-        if isinstance(entero, int):
-            entero = int2bytes(entero)
-        checksum = sha2_hashing.sha256(sha2_hashing.sha256(entero, formato="bytes"), formato="bytes")[:4]
-        entero += checksum
-    if isinstance(entero, bytes):
-        # Los leading zeroes se deben traducir al final como 1's:
-        i = 0
-        while entero[i] == 0:
-            prefix += b"1"
-            i += 1
-        # Convertimos los bytes a entero:
-        entero = int.from_bytes(entero, "big")
-    # Ya tenemos el entero como tal, y el prefijo de unos que aplicaremos al final. Empecemos la codificación:
-    resul = b""
-    while entero:
-        resul = tabla[entero % 58].to_bytes(1, "big") + resul
-        entero //= 58
-    resul = prefix + resul
+        datos = [d + checksum for d, checksum in zip(datos, _checksums58(datos))]
+    resul = [_codifica58(d) for d in datos]
     if formato == "str":
-        return resul.decode("utf-8")
+        return [r.decode("utf-8") for r in resul]
     return resul
 
 def from_base58(ent_bytes, formato="int", check=False):
     """Convierte una secuencia de bytes codificada en base58 en un entero
 
-    Base58 se hizo para generar direcciones Bitcoin, eliminando los caracteres "+/lI0O" de base64.
-    :param ent_bytes: secuencia de bytes a decodificar (bytes)
+    Base58 se hizo para generar direcciones Bitcoin, eliminando los caracteres "+/lI0O" de base64. Cada '1' inicial
+    corresponde a un byte cero, que se conserva en las salidas "bytes" y "hex".
+    :param ent_bytes: secuencia de bytes a decodificar (bytes o str)
     :param formato: formato de salida "int" (entero), "bytes" (bytes) o "hex" (string)
     :param check: si es True, tras descodificar eliminaremos los 4 últimos bytes (32 bits) del checksum (bool)
     :return: el mensaje decodificado
+    :raises ValueError: si hay algún carácter no válido, o (con check=True) el checksum no coincide
+    """
+    return from_base58_many([ent_bytes], formato, check)[0]
+
+def from_base58_many(secuencias, formato="int", check=False):
+    """Decodifica una lista de secuencias codificadas en base58
+
+    Con check=True, los checksums de todas las secuencias se calculan a la vez (hashing.sha256_many()).
+
+    :param secuencias: lista de secuencias a decodificar (bytes o str)
+    :param formato: formato de salida "int" (entero), "bytes" (bytes) o "hex" (string)
+    :param check: si es True, tras descodificar eliminaremos los 4 últimos bytes (32 bits) del checksum (bool)
+    :return: lista de mensajes decodificados, en el mismo orden
+    :raises ValueError: si hay algún carácter no válido, o (con check=True) algún checksum no coincide
     """
-    tabla = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
-    resul = 0
-    for b in ent_bytes:
-        numero = tabla.find(b)
-        resul = resul * 58 + numero
+    datos = [_decodifica58(s.encode("utf-8") if isinstance(s, str) else bytes(s)) for s in secuencias]
     # Si es la versión check, tras la decodificación chequeamos los 32 últimos bits y los eliminamos del resultado:
     if check:
-        checksum1 = (resul & 0xffffffff).to_bytes(4, "big")
-        resul >>= 32
-        checksum2 = sha2_hashing.sha256(sha2_hashing.sha256(int2bytes(resul), "bytes"), "bytes")[:4]
-        assert checksum1 == checksum2, "El checksum no coincide"
+        for d, checksum in zip(datos, _checksums58([d[:-4] for d in datos])):
+            if d[-4:] != checksum:
+                raise ValueError("El checksum no coincide")
+        datos = [d[:-4] for d in datos]
     if formato == "int":
-        return resul
+        return [int.from_bytes(d, "big") for d in datos]
     if formato == "bytes":
-        return int2bytes(resul)
-    return hex(resul)[2:]
+        return datos
+    return [d.hex() for d in datos]
+
+# Procesamiento en paralelo ********************************************************************************************
+
+def procesa_ordenado(funcion, elementos, procesos):
+    """Aplica una función a cada elemento, y retorna los resultados en orden, a medida que se calculan
+
+    Con procesos > 1, los elementos se reparten entre un pool de procesos, con como mucho 2 elementos por proceso en
+    curso, de forma que la memoria no depende del número de elementos (que puede ser un generador muy largo).
+
+    :param funcion: función a aplicar (a nivel de módulo, para poder enviarla a los procesos)
+    :param elementos: iterable de argumentos de la función
+    :param procesos: número de procesos (1 para calcular todo en el proceso actual)
+    :return: generador con los resultados
+    """
+    if procesos <= 1:
+        yield from map(funcion, elementos)
+        return
+    with multiprocessing.Pool(procesos) as pool:
+        pendientes = collections.deque()
+        for elemento in elementos:
+            pendientes.append(pool.apply_async(funcion, (elemento,)))
+            if len(pendientes) >= 2 * procesos:
+                yield pendientes.popleft().get()
+        while pendientes:
+            yield pendientes.popleft().get()